@@ -1,9 +1,7 @@
-import json
 import os
-import asyncio
 
 from flask import Flask, render_template, request, redirect, url_for, jsonify, flash
-from sqlalchemy import func
+from sqlalchemy import and_, case, func, select
 from db import (
     init_db,
     get_db_session,
@@ -12,8 +10,8 @@ from db import (
     Daily,
     SingleCard,
     SingleCardPrice,
-    SingleCardOffer,
     SingleCardDaily,
+    CardLatest,
     PSA10Price,
     PSA10Offer,
     BookkeepingEntry,
@@ -21,13 +19,35 @@ from db import (
 )
 from scraper import (
     schedule_hourly,
-    compute_trend,
     compute_single_trend,
-    is_heads_up,
     scrape_once,
     scrape_single_cards,
+    BROWSER,
+)
+from tracker_utils.deal_cache import DEAL_CACHE
+from tracker_utils.deal_finder import get_market_sentiment
+from tracker_utils.seller_bundles import (
+    SHIPPING,
+    TOP_K,
+    cached as bundle_cache,
+    filter_options,
+    top_sellers,
+    wishlist_cover,
+)
+from tracker_utils.series import MAX_POINTS as SERIES_MAX_POINTS, price_series
+from tracker_utils.series_codec import encode as encode_chart, negotiate as chart_format
+from tracker_utils.market_stats import card_histories, product_index, psa10_histories, single_trends
+from latest_snapshot import card_snapshot, card_snapshots
+from scraper_status import STATUS as SCRAPER_STATUS
+from response_cache import (
+    RESPONSE_CACHE,
+    cached_response,
+    card_series_version,
+    card_version,
+    latest_version,
+    product_series_version,
+    product_version,
 )
-from tracker_utils.deal_finder import calculate_deals, get_market_sentiment
 from tracker_utils.invoice_parser import parse_cardmarket_invoice
 import tracker_flask
 from tracker_flask import tracker_bp, init_tracker_scheduler, save_uploaded_image
@@ -56,12 +76,17 @@ app.register_blueprint(tracker_bp)
 tracker_scheduler = init_tracker_scheduler()
 
 
+def _page(version):
+    """``version`` plus the scraper status banner every page shows."""
+    return lambda s, **kw: (version(s, **kw), SCRAPER_STATUS.health()["version"])
+
 
 @app.route("/cardwatch/psa10")
 def psa10_list():
     return render_template("psa10_list.html")
 
 @app.route("/cardwatch/psa10/<int:cid>")
+@cached_response(_page(card_version))
 def psa10_details(cid):
     with get_db_session() as session:
         card = session.get(SingleCard, cid)
@@ -82,6 +107,7 @@ def psa10_details(cid):
     return render_template("psa10_details.html", card=card, offers=offers, chart_data=chart_data)
 
 @app.route("/api/psa10")
+@cached_response(latest_version)
 def api_psa10_data():
     sort = request.args.get("sort", "name")
     order = request.args.get("order", "asc")
@@ -91,7 +117,21 @@ def api_psa10_data():
     language = request.args.get("language", "All")
 
     with get_db_session() as session:
-        query = session.query(SingleCard).filter(SingleCard.category == 'Liked')
+        def snapshot_low(column, price_model):
+            # Cards without a snapshot yet read their newest price directly.
+            newest = (select(price_model.low).where(price_model.card_id == SingleCard.id)
+                      .order_by(price_model.ts.desc()).limit(1).scalar_subquery())
+            return case((CardLatest.card_id.is_(None), newest), else_=column)
+
+        raw_low = snapshot_low(CardLatest.low, SingleCardPrice)
+        psa10_low = snapshot_low(CardLatest.psa10_low, PSA10Price)
+        ratio = case((and_(psa10_low != 0, raw_low > 0), psa10_low / raw_low))
+        query = (
+            session.query(SingleCard.id, SingleCard.name, SingleCard.image_url, SingleCard.url,
+                          psa10_low.label("psa10_low"), raw_low.label("raw_low"), ratio.label("ratio"))
+            .outerjoin(CardLatest, CardLatest.card_id == SingleCard.id)
+            .filter(SingleCard.category == 'Liked')
+        )
 
         if search:
             query = query.filter(SingleCard.name.ilike(f"%{search}%"))
@@ -100,51 +140,30 @@ def api_psa10_data():
             query = query.filter(SingleCard.language == language)
 
         total = query.count()
-        cards = query.all() # Fetch all to manual sort/filter since joins are complex with aggregations
-        
-        # Manual processing to get latest prices
-        data = []
-        for c in cards:
-            # Latest PSA10
-            psa10_entry = session.query(PSA10Price).filter_by(card_id=c.id).order_by(PSA10Price.ts.desc()).first()
-            psa10_low = psa10_entry.low if psa10_entry else None
-            
-            # Latest Raw
-            raw_entry = session.query(SingleCardPrice).filter_by(card_id=c.id).order_by(SingleCardPrice.ts.desc()).first()
-            raw_low = raw_entry.low if raw_entry else None
-            
-            # PSA10 History (sparkline)
-            history = session.query(PSA10Price.low).filter_by(card_id=c.id).order_by(PSA10Price.ts.desc()).limit(30).all()
-            sparkline = [h[0] for h in history][::-1] if history else []
-
-            # Calculate Ratio
-            ratio = None
-            if psa10_low and raw_low and raw_low > 0:
-                ratio = psa10_low / raw_low
-
-            data.append({
-                "id": c.id,
-                "name": c.name,
-                "image_url": c.image_url,
-                "psa10_low": psa10_low,
-                "raw_low": raw_low,
-                "ratio": ratio,
-                "psa10_history": sparkline,
-                "url": c.url
-            })
-            
-        # Sorting
-        reverse = (order == "desc")
-        def sort_key(x):
-            val = x.get(sort)
-            if val is None:
-                return -999999 if reverse else 999999
-            return val
-
-        data.sort(key=sort_key, reverse=reverse)
-        
-        # Pagination
-        sliced = data[offset : offset + limit]
+
+        # Sorting (missing values last either way) and paging in SQL
+        sort_cols = {"id": SingleCard.id, "name": SingleCard.name, "url": SingleCard.url,
+                     "psa10_low": psa10_low, "raw_low": raw_low, "ratio": ratio}
+        col = sort_cols.get(sort)
+        if col is not None:
+            query = query.order_by(col.is_(None), col.desc() if order == "desc" else col.asc())
+        page = query.order_by(SingleCard.id).offset(offset).limit(limit).all()
+
+        # PSA10 sparklines for this page only
+        histories = psa10_histories(session, [r.id for r in page], points=30)
+        sliced = [
+            {
+                "id": r.id,
+                "name": r.name,
+                "image_url": r.image_url,
+                "psa10_low": r.psa10_low,
+                "raw_low": r.raw_low,
+                "ratio": r.ratio,
+                "psa10_history": histories.get(r.id, []),
+                "url": r.url,
+            }
+            for r in page
+        ]
 
     return jsonify({"total": total, "rows": sliced})
 
@@ -156,111 +175,59 @@ def home():
 
 @app.context_processor
 def inject_scraper_status():
-    status_file = "scraper_status.json"
-    status_data = {}
-    if os.path.exists(status_file):
-        try:
-            with open(status_file, "r") as f:
-                status_data = json.load(f)
-        except Exception:
-            pass
-    return dict(scraper_status=status_data)
+    return dict(scraper_status=SCRAPER_STATUS.health())
+
+
+@app.route("/cardwatch/api/scraper/status")
+def api_scraper_status():
+    return jsonify({"health": SCRAPER_STATUS.health(), "run": SCRAPER_STATUS.progress(),
+                    "runs": SCRAPER_STATUS.runs()})
 
 @app.route("/cardwatch")
 @app.route("/cardwatch/")
 def index():
     with get_db_session() as s:
-        products = s.query(Product).order_by(Product.name).all()
-        model = []
-        now = datetime.utcnow()
-        for p in products:
-            trend = compute_trend(s, p.id)
-            heads, now_low, avg7 = is_heads_up(s, p.id)
-
-            # current (latest) and first (oldest) recorded prices
-            latest = (s.query(Price)
-                      .filter_by(product_id=p.id)
-                      .order_by(Price.ts.desc())
-                      .first())
-            first  = (s.query(Price)
-                      .filter_by(product_id=p.id)
-                      .order_by(Price.ts.asc())
-                      .first())
-
-            # past prices for percent changes
-            def get_past(delta):
-                return (s.query(Price)
-                        .filter(Price.product_id == p.id,
-                                Price.ts <= now - delta)
-                        .order_by(Price.ts.desc())
-                        .first())
-
-            past24 = get_past(timedelta(hours=24))
-            past7  = get_past(timedelta(days=7))
-            past30 = get_past(timedelta(days=30))
-
-            def pct(cur, prev):
-                if cur is None or prev is None or prev == 0:
-                    return None
-                return (cur - prev) / prev * 100.0
-
-            current_low = latest.low if latest else None
-
-            model.append({
-                "id": p.id,
-                "name": p.name,
-                "country": p.country,
-                "url": p.url,
-                "enabled": bool(p.is_enabled),
-
-                "trend": trend,
-                "heads": heads,
-                "avg7": avg7,
-
-                "current_low": current_low,
-                "first_low": first.low if first else None,
-                "pct24": pct(current_low, past24.low if past24 else None),
-                "pct7":  pct(current_low, past7.low if past7 else None),
-                "pct30": pct(current_low, past30.low if past30 else None),
-                "supply": latest.supply if latest else None,
-
-                "last_ts": latest.ts.strftime("%Y-%m-%d %H:%M") if latest else None,
-            })
+        model = product_index(s)
         return render_template("index.html", products=model)
 
 
 
-def calculate_card_stats(session, card):
+def calculate_card_stats(session, card, latest=None):
+    """Row for the singles table; ``latest`` is the card's ``CardLatest`` if already loaded."""
     now = datetime.utcnow()
-    latest = (
-        session.query(SingleCardPrice)
-        .filter_by(card_id=card.id)
-        .order_by(SingleCardPrice.ts.desc())
-        .first()
-    )
-    first = (
-        session.query(SingleCardPrice)
-        .filter_by(card_id=card.id)
+    if latest is None:
+        latest = card_snapshot(session, card.id)
+
+    # Fetch last 30 days history for sparkline
+    history_query = (
+        session.query(SingleCardPrice.low)
+        .filter(SingleCardPrice.card_id == card.id)
+        .filter(SingleCardPrice.ts >= now - timedelta(days=30))
         .filter(SingleCardPrice.low.isnot(None))
         .order_by(SingleCardPrice.ts.asc())
-        .first()
+        .all()
     )
+    history_values = [r.low for r in history_query]
+    trend = compute_single_trend(session, card.id)
+    return _card_stats_row(card, latest, history_values, trend)
 
-    def get_past(delta):
-        return (
-            session.query(SingleCardPrice)
-            .filter(
-                SingleCardPrice.card_id == card.id,
-                SingleCardPrice.ts <= now - delta,
-            )
-            .order_by(SingleCardPrice.ts.desc())
-            .first()
-        )
-
-    past7 = get_past(timedelta(days=7))
-    past30 = get_past(timedelta(days=30))
-    past90 = get_past(timedelta(days=90))
 
+def calculate_card_stats_many(session, card_ids):
+    """``calculate_card_stats`` for many cards (in ``card_ids`` order) with a
+    fixed number of queries: cards, snapshots, 30-day histories and trends."""
+    now = datetime.utcnow()
+    cards = {c.id: c for c in session.query(SingleCard).filter(SingleCard.id.in_(card_ids))}
+    ids = [cid for cid in card_ids if cid in cards]
+    snaps = card_snapshots(session, ids, fill=True)
+    histories = card_histories(session, ids, since=now - timedelta(days=30))
+    trends = single_trends(session, ids)
+    return [
+        _card_stats_row(cards[cid], snaps.get(cid), histories.get(cid, []), trends.get(cid, "flat"))
+        for cid in ids
+    ]
+
+
+def _card_stats_row(card, latest, history_values, trend):
     def pct(cur, prev):
         if cur is None or prev is None or prev == 0:
             return None
@@ -271,9 +238,10 @@ def calculate_card_stats(session, card):
     avg5 = latest.avg5 if latest else None
 
     # Indicators
+    supply_7d = latest.supply_7d if latest else None
     supply_drop = False
-    if current_supply is not None and past7 and past7.supply:
-        if current_supply < past7.supply * 0.9:
+    if current_supply is not None and supply_7d:
+        if current_supply < supply_7d * 0.9:
             supply_drop = True
     
     price_outlier = False
@@ -281,28 +249,13 @@ def calculate_card_stats(session, card):
         if current_low < avg5 * 0.7:
             price_outlier = True
 
-    # Fetch last 30 days history for sparkline
-    # Limit to reasonable number of points (e.g. latest 100) to keep table payload light
-    history_query = (
-        session.query(SingleCardPrice.low)
-        .filter(SingleCardPrice.card_id == card.id)
-        .filter(SingleCardPrice.ts >= now - timedelta(days=30))
-        .filter(SingleCardPrice.low.isnot(None))
-        .order_by(SingleCardPrice.ts.asc())
-        .all()
-    )
-    # Basic downsampling if too many points (simple skip)
-    # Basic downsampling if too many points (simple skip)
-    history_values = [r.low for r in history_query]
-    
     # Sentiment Badge Logic
-    trend = compute_single_trend(session, card.id)
     sentiment_badge = "Stagnant"
     supply_trend_up = False
     
     # Check simple supply trend (current vs 7 days ago approx)
-    if current_supply is not None and past7 and past7.supply:
-        if current_supply > past7.supply * 1.05:
+    if current_supply is not None and supply_7d:
+        if current_supply > supply_7d * 1.05:
             supply_trend_up = True
 
     if trend == "up" and supply_drop:
@@ -323,10 +276,10 @@ def calculate_card_stats(session, card):
         "avg7_price": latest.avg7_price if latest else None,
         "avg1_price": latest.avg1_price if latest else None,
         "current_low": current_low,
-        "pct30": pct(current_low, past30.low if past30 else None),
-        "pct90": pct(current_low, past90.low if past90 else None),
-        "pct_all": pct(current_low, first.low if first else None),
-        "last_ts": latest.ts.strftime("%Y-%m-%d %H:%M") if latest else None,
+        "pct30": pct(current_low, latest.low_30d if latest else None),
+        "pct90": pct(current_low, latest.low_90d if latest else None),
+        "pct_all": pct(current_low, latest.first_low if latest else None),
+        "last_ts": latest.ts.strftime("%Y-%m-%d %H:%M") if latest and latest.ts else None,
         "supply": current_supply,
         "supply_drop": supply_drop,
         "price_outlier": price_outlier,
@@ -365,25 +318,38 @@ def deals():
         language = "English"
     
     with get_db_session() as s:
-        # Get ALL matching deals (sorted)
-        all_deals = calculate_deals(s, include_promos=show_promos, language=language, include_packs=show_packs)
-    
-    # Pagination Logic
-    total_deals = len(all_deals)
-    total_pages = (total_deals + per_page - 1) // per_page
-    
-    # Slice
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_deals = all_deals[start:end]
-    
+        # Get ALL matching deals (sorted), from the ranking cache
+        all_deals = DEAL_CACHE.ranked(s, include_promos=show_promos, language=language, include_packs=show_packs)
+
+        # Pagination Logic
+        total_deals = len(all_deals)
+        total_pages = (total_deals + per_page - 1) // per_page
+
+        # Slice (loads the page's cards and offers, so inside the session).
+        # A cursor continues right after the last deal of the previous page,
+        # even when the ranking was refreshed in between.
+        cursor = request.args.get("cursor")
+        start = all_deals.after(cursor) if cursor else (page - 1) * per_page
+        if cursor:
+            page = start // per_page + 1
+        end = start + per_page
+        paginated_deals = all_deals[start:end]
+        next_cursor = all_deals.cursor(end - 1) if end < total_deals else None
+
     return render_template("deals.html", 
                            deals=paginated_deals, 
                            show_promos=show_promos, 
                            language=language, 
                            show_packs=show_packs,
                            page=page,
-                           total_pages=total_pages)
+                           total_pages=total_pages,
+                           next_cursor=next_cursor,
+                           cache=DEAL_CACHE.stats())
+
+
+@app.route("/cardwatch/api/deals/cache")
+def api_deals_cache():
+    return jsonify(DEAL_CACHE.stats())
 
 @app.route("/cardwatch/single/<int:cid>/category", methods=["POST"])
 def update_single_category(cid):
@@ -401,6 +367,11 @@ def update_single_category(cid):
          return jsonify({"success": True})
 
 
+@app.route("/cardwatch/api/responses/cache")
+def api_response_cache():
+    return jsonify(RESPONSE_CACHE.stats())
+
+
 @app.route("/cardwatch/singles/delete/<int:cid>", methods=["POST"])
 def delete_single(cid):
     with get_db_session() as s:
@@ -426,6 +397,7 @@ def delete_single(cid):
 
 
 @app.route("/cardwatch/api/singles/sets")
+@cached_response(latest_version)
 def api_singles_sets():
     with get_db_session() as s:
         # Get distinct sets, exclude None
@@ -440,6 +412,7 @@ def api_singles_sets():
 
 
 @app.route("/cardwatch/api/singles/list")
+@cached_response(latest_version)
 def api_singles_list():
     offset = int(request.args.get("offset", 0))
     limit = int(request.args.get("limit", 10))
@@ -483,25 +456,12 @@ def api_singles_list():
             # logic: "All Categories" means "All visible categories" (not ignored ones)
             query = query.filter((SingleCard.category != 'Ignore') | (SingleCard.category.is_(None)))
         
-        # Price Filtering Subquery
-        from sqlalchemy import text
-        
-        # Price Subquery for filtering/sorting
-        # Re-using the logic from sorting to get the latest price/supply
-        # Creating a reusable subquery factory or just defining it cleanly here
-        
-        if min_price is not None or max_price is not None:
-             price_subq = (
-                 s.query(SingleCardPrice.low)
-                 .filter(SingleCardPrice.card_id == SingleCard.id)
-                 .order_by(SingleCardPrice.ts.desc())
-                 .limit(1)
-                 .scalar_subquery()
-             )
-             if min_price is not None:
-                 query = query.filter(price_subq >= min_price)
-             if max_price is not None:
-                 query = query.filter(price_subq <= max_price)
+        # Latest prices come from the per-card snapshot, one row per card.
+        query = query.outerjoin(CardLatest, CardLatest.card_id == SingleCard.id)
+        if min_price is not None:
+            query = query.filter(CardLatest.low >= min_price)
+        if max_price is not None:
+            query = query.filter(CardLatest.low <= max_price)
 
         # Sorting
         if sort_field == "name":
@@ -511,46 +471,14 @@ def api_singles_list():
             col = SingleCard.language
             query = query.order_by(col.asc() if sort_order == "asc" else col.desc())
         elif sort_field == "current":
-             subq = (
-                 s.query(SingleCardPrice.low)
-                 .filter(SingleCardPrice.card_id == SingleCard.id)
-                 .order_by(SingleCardPrice.ts.desc())
-                 .limit(1)
-                 .scalar_subquery()
-             )
-             query = query.order_by(subq.asc() if sort_order == "asc" else subq.desc())
+             col = CardLatest.low
+             query = query.order_by(col.asc() if sort_order == "asc" else col.desc())
         elif sort_field == "supply":
-             subq = (
-                 s.query(SingleCardPrice.supply)
-                 .filter(SingleCardPrice.card_id == SingleCard.id)
-                 .order_by(SingleCardPrice.ts.desc())
-                 .limit(1)
-                 .scalar_subquery()
-             )
-             query = query.order_by(subq.asc() if sort_order == "asc" else subq.desc())
+             col = CardLatest.supply
+             query = query.order_by(col.asc() if sort_order == "asc" else col.desc())
         elif sort_field == "pct_all":
-             # Subquery for current price (latest)
-             current_subq = (
-                 s.query(SingleCardPrice.low)
-                 .filter(SingleCardPrice.card_id == SingleCard.id)
-                 .order_by(SingleCardPrice.ts.desc())
-                 .limit(1)
-                 .scalar_subquery()
-             )
-             # Subquery for first price (oldest with non-null low)
-             first_subq = (
-                 s.query(SingleCardPrice.low)
-                 .filter(SingleCardPrice.card_id == SingleCard.id)
-                 .filter(SingleCardPrice.low.isnot(None))
-                 .order_by(SingleCardPrice.ts.asc())
-                 .limit(1)
-                 .scalar_subquery()
-             )
-             
              # (current - first) / first
-             # Handle division by zero or nulls gracefully if needed, though SQL comparison rules might handle nulls
-             diff = (current_subq - first_subq) / first_subq
-             
+             diff = (CardLatest.low - CardLatest.first_low) / CardLatest.first_low
              query = query.order_by(diff.asc() if sort_order == "asc" else diff.desc())
         else:
             # Default fallback sort
@@ -559,17 +487,14 @@ def api_singles_list():
         total = query.count()
         cards = query.offset(offset).limit(limit).all()
 
-        rows = []
-        for c in cards:
-            stats = calculate_card_stats(s, c)
-            # Flatten stats into row structure expected by table
-            rows.append(stats)
+        rows = calculate_card_stats_many(s, [c.id for c in cards])
 
         return jsonify({"total": total, "rows": rows})
 
 
 
 @app.route("/cardwatch/single/<int:cid>")
+@cached_response(_page(card_version))
 def single_card(cid):
     with get_db_session() as s:
         card = s.get(SingleCard, cid)
@@ -595,126 +520,43 @@ def seller_bundles():
         f_min_cards = int(request.args.get("min_cards", 0))
     except (ValueError, TypeError):
         f_min_cards = 0
+    try:
+        f_top = max(1, int(request.args.get("top", TOP_K)))
+    except (ValueError, TypeError):
+        f_top = TOP_K
+    # Optional: cheapest set of sellers for the "Liked" cards
+    f_cover = request.args.get("cover") == "true"
+    try:
+        f_shipping = float(request.args.get("shipping", SHIPPING))
+    except (ValueError, TypeError):
+        f_shipping = SHIPPING
 
     with get_db_session() as s:
-        # Base query
-        query = (
-            s.query(SingleCardOffer)
-            .join(SingleCard)
-            .filter(SingleCard.is_enabled == 1)
-        )
-
-        # Apply filters
-        if f_lang != "All":
-            query = query.filter(SingleCard.language == f_lang)
-        
-        if f_country != "All":
-            query = query.filter(SingleCardOffer.country == f_country)
-
-        offers = query.all()
-
-        # Get available options for dropdowns (global, unfiltered list mainly, or filtered? usually global for filters)
-        # Actually standard UX is to show all available options
-        all_languages = [r[0] for r in s.query(SingleCard.language).distinct().order_by(SingleCard.language).all() if r[0]]
-        all_countries = [r[0] for r in s.query(SingleCardOffer.country).distinct().order_by(SingleCardOffer.country).all() if r[0]]
-
-        if not offers:
-            return render_template("seller_bundles.html", 
-                                   sellers=[], 
-                                   all_languages=all_languages, 
-                                   all_countries=all_countries,
-                                   f_lang=f_lang,
-                                   f_country=f_country,
-                                   f_min_cards=f_min_cards)
-
-        # For "cheapest" calculation, we should probably consider the global cheapest for that card,
-        # OR the cheapest within the filtered set?
-        # Usually "cheapest" means "market price", so global lowest is better reference.
-        # Let's fetch global cheapest for involved cards to be fair.
-        # But to avoid N+1, let's just fetch all enabled cards again or rely on what we have.
-        # Actually, let's use the query logic from before but careful about what "cheapest" means.
-        # If I filter by "Japan", do I compare against "Japan" cheapest or "Global" cheapest?
-        # The prompt says: "within 20% of the lowest price for each card."
-        # Usually that implies global lowest.
-        
-        # Implementation: Fetch ALL offers for the relevant cards to determine global lowest,
-        # THEN filter the offers we want to display.
-        # But that might be heavy. 
-        # For now, let's stick to calculating cheapest based on what we fetched, 
-        # BUT if we filter by country, "lowest price" might become "lowest price in that country".
-        # If the user wants to see if a bundle is good deal globally, comparing to local only might be misleading.
-        # However, checking "global cheapest" requires querying all offers for these cards.
-        
-        # Let's do a separate query for "global cheapest" for the cards present in our filtered offers.
-        card_ids = set(o.card_id for o in offers)
-        
-        # Get global cheapest for these cards
-        global_cheapest_rows = (
-             s.query(SingleCardOffer.card_id, func.min(SingleCardOffer.price))
-             .filter(SingleCardOffer.card_id.in_(card_ids))
-             .filter(SingleCardOffer.price.isnot(None))
-             .group_by(SingleCardOffer.card_id)
-             .all()
-        )
-        cheapest_map = {row[0]: row[1] for row in global_cheapest_rows}
-
-        cards = s.query(SingleCard).filter(SingleCard.id.in_(card_ids)).all()
-        card_lookup = {c.id: c for c in cards}
-
-        seller_map = {}
-        for offer in offers:
-            baseline = cheapest_map.get(offer.card_id)
-            if baseline is None or offer.price is None:
-                continue
-            
-            # 20% rule
-            if offer.price > baseline * 1.2:
-                continue
-
-            key = (offer.seller_name, offer.country)
-            entry = seller_map.setdefault(
-                key,
-                {
-                    "seller": offer.seller_name,
-                    "country": offer.country,
-                    "cards": [],
-                    "total_upcharge": 0.0,
-                    "bundle_total": 0.0,
-                    "cheapest_total": 0.0,
-                },
-            )
-
-            upcharge = offer.price - baseline
-            entry["cards"].append(
-                {
-                    "card": card_lookup.get(offer.card_id),
-                    "price": offer.price,
-                    "baseline": baseline,
-                    "upcharge": upcharge,
-                }
-            )
-            entry["total_upcharge"] += upcharge
-            entry["bundle_total"] += offer.price
-            entry["cheapest_total"] += baseline
-
-        # Filter by min_cards
-        sellers = [
-            s for s in seller_map.values() 
-            if s["total_upcharge"] <= 20.0 and len(s["cards"]) >= f_min_cards
-        ]
-        sellers.sort(
-            key=lambda s: (-len(s["cards"]), s["total_upcharge"], s["bundle_total"])
-        )
+        # Aggregated in SQL, cached per filter combination until new scrape data
+        all_languages, all_countries = bundle_cache(s, ("options",), lambda: filter_options(s))
+        sellers = bundle_cache(s, ("sellers", f_lang, f_country, f_min_cards, f_top),
+                               lambda: top_sellers(s, f_lang, f_country, f_min_cards, f_top))
+        cover = None
+        if f_cover:
+            def liked_cover():
+                liked = [cid for (cid,) in s.query(SingleCard.id).filter(SingleCard.category == 'Liked')]
+                return wishlist_cover(s, liked, f_lang, f_country, f_shipping)
+            cover = bundle_cache(s, ("cover", f_lang, f_country, f_shipping), liked_cover)
 
         return render_template("seller_bundles.html", 
                                sellers=sellers,
+                               cover=cover,
                                all_languages=all_languages, 
                                all_countries=all_countries,
                                f_lang=f_lang,
                                f_country=f_country,
-                               f_min_cards=f_min_cards)
+                               f_min_cards=f_min_cards,
+                               f_top=f_top,
+                               f_cover=f_cover,
+                               f_shipping=f_shipping)
 
 @app.route("/cardwatch/product/<int:pid>")
+@cached_response(_page(product_version))
 def product(pid):
     with get_db_session() as s:
         p = s.get(Product, pid)
@@ -723,51 +565,74 @@ def product(pid):
         return render_template("product.html", product=p)
 
 
+def _chart_response(fmt, names, points):
+    """``points`` (tuples, time first) as a list of objects keyed by
+    ``names`` (``json``), or a columnar body (see ``series_codec``)."""
+    if fmt == "json":
+        resp = jsonify([{names[0]: p[0].isoformat(), **dict(zip(names[1:], p[1:]))} for p in points])
+    else:
+        body, mimetype, encoding = encode_chart(fmt, names, points, request.accept_encodings)
+        resp = app.response_class(body, mimetype=mimetype)
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+    resp.vary.update(("Accept", "Accept-Encoding"))
+    return resp
+
+
+def _series_response(price_model, daily_model, key, ref_id):
+    """``?from=&to=`` (ISO dates or datetimes, ``to`` exclusive),
+    ``?max_points=`` and ``?format=``; the resolution served is in
+    ``X-Series-Resolution``."""
+    try:
+        start = datetime.fromisoformat(request.args["from"]) if request.args.get("from") else None
+        end = datetime.fromisoformat(request.args["to"]) if request.args.get("to") else None
+        max_points = int(request.args.get("max_points", SERIES_MAX_POINTS))
+        fmt = chart_format(request.args.get("format"), request.accept_mimetypes)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    with get_db_session() as s:
+        resolution, points = price_series(s, price_model, daily_model, key, ref_id, start, end, max_points)
+    resp = _chart_response(fmt, ("t", "low", "avg5"), points)
+    resp.headers["X-Series-Resolution"] = resolution
+    return resp
+
+
+def _daily_response(daily_model, key, ref_id):
+    try:
+        fmt = chart_format(request.args.get("format"), request.accept_mimetypes)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    with get_db_session() as s:
+        points = (
+            s.query(daily_model.day, daily_model.low, daily_model.avg)
+            .filter(getattr(daily_model, key) == ref_id)
+            .order_by(daily_model.day)
+            .all()
+        )
+    return _chart_response(fmt, ("d", "low", "avg"), points)
+
+
 @app.route("/cardwatch/api/product/<int:pid>/series")
+@cached_response(product_series_version)
 def api_series(pid):
-    with get_db_session() as s:
-        points = s.query(Price).filter_by(product_id=pid).order_by(Price.ts).all()
-        return jsonify([{"t": pr.ts.isoformat(), "low": pr.low, "avg5": pr.avg5} for pr in points])
+    return _series_response(Price, Daily, "product_id", pid)
 
 @app.route("/cardwatch/api/product/<int:pid>/daily")
+@cached_response(product_series_version)
 def api_daily(pid):
-    with get_db_session() as s:
-        points = s.query(Daily).filter_by(product_id=pid).order_by(Daily.day).all()
-        return jsonify([{"d": d.day.isoformat(), "low": d.low, "avg": d.avg} for d in points])
+    return _daily_response(Daily, "product_id", pid)
 
 
 @app.route("/cardwatch/api/single/<int:cid>/series")
+@cached_response(card_series_version)
 def api_single_series(cid):
-    with get_db_session() as s:
-        points = (
-            s.query(SingleCardPrice)
-            .filter_by(card_id=cid)
-            .order_by(SingleCardPrice.ts)
-            .all()
-        )
-        return jsonify(
-            [
-                {"t": pr.ts.isoformat(), "low": pr.low, "avg5": pr.avg5}
-                for pr in points
-            ]
-        )
+    return _series_response(SingleCardPrice, SingleCardDaily, "card_id", cid)
 
 
 @app.route("/cardwatch/api/single/<int:cid>/daily")
+@cached_response(card_series_version)
 def api_single_daily(cid):
-    with get_db_session() as s:
-        points = (
-            s.query(SingleCardDaily)
-            .filter_by(card_id=cid)
-            .order_by(SingleCardDaily.day)
-            .all()
-        )
-        return jsonify(
-            [
-                {"d": d.day.isoformat(), "low": d.low, "avg": d.avg}
-                for d in points
-            ]
-        )
+    return _daily_response(SingleCardDaily, "card_id", cid)
 
 @app.route("/cardwatch/add", methods=["POST"])
 def add():
@@ -789,7 +654,7 @@ def add():
         flash(f"Error: {e}")
     if pid:
         try:
-            asyncio.run(scrape_once([pid]))
+            BROWSER.run(scrape_once([pid]))
         except Exception as e:
             print(f"[app] Error scraping new product {pid}: {e}")
     return redirect(url_for("index"))
@@ -839,7 +704,7 @@ def add_single():
 
     if cid:
         try:
-            asyncio.run(scrape_single_cards([cid]))
+            BROWSER.run(scrape_single_cards([cid]))
         except Exception as e:
             print(f"[app] Error scraping new single card {cid}: {e}")
     return redirect(url_for("singles"))
@@ -0,0 +1,35 @@
+"""Rebuild daily rollups from raw prices.
+
+Usage:
+    python backfill_daily.py [--kind sealed|single|all] [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--id N ...]
+
+Days are the half-open range ``[start, end)``; either bound may be omitted.
+Each kind is one ``DELETE`` plus one ``INSERT ... SELECT ... GROUP BY``.
+"""
+import argparse
+import sys
+from datetime import date
+
+from db import get_db_session, backfill_daily, backfill_single_daily
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild daily / single_card_daily from prices")
+    parser.add_argument("--kind", choices=("sealed", "single", "all"), default="all")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day (inclusive)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day (exclusive)")
+    parser.add_argument("--id", type=int, action="append", dest="ids", help="product/card id (repeatable)")
+    args = parser.parse_args(argv)
+
+    with get_db_session() as session:
+        if args.kind in ("sealed", "all"):
+            backfill_daily(session, args.start, args.end, args.ids)
+        if args.kind in ("single", "all"):
+            backfill_single_daily(session, args.start, args.end, args.ids)
+        session.commit()
+    print(f"Rebuilt {args.kind} daily rows for [{args.start or '-'}, {args.end or '-'})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
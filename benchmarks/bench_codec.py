@@ -0,0 +1,73 @@
+"""Encode time and size of a chart series: the default JSON list of objects
+vs. the ``columns`` and ``binary`` encodings of ``series_codec``, plain and
+compressed.
+
+Usage: python benchmarks/bench_codec.py [points...]   (default: 50000)
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from tracker_utils.series_codec import brotli_available, encode_binary, encode_columns  # noqa: E402
+
+NAMES = ("t", "low", "avg5")
+
+
+def points(n):
+    rng = random.Random(1)
+    start, price = datetime(2020, 1, 1), 100.0
+    rows = []
+    for i in range(n):
+        price = max(1.0, price * rng.uniform(0.97, 1.03))
+        rows.append((start + timedelta(hours=4 * i), round(price, 2), round(price * rng.uniform(1, 1.2), 2)))
+    return rows
+
+
+def as_objects(rows):
+    """What the endpoints send by default (jsonify of a list of dicts)."""
+    return json.dumps([{"t": t.isoformat(), "low": low, "avg5": avg5} for t, low, avg5 in rows],
+                      separators=(",", ":")).encode()
+
+
+def timed(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return out, best
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [50000]
+    encoders = [
+        ("json objects", as_objects),
+        ("columns json", lambda rows: encode_columns(NAMES, rows)),
+        ("binary", lambda rows: encode_binary(NAMES, rows)),
+    ]
+    compressors = [("gzip", lambda b: gzip.compress(b, compresslevel=6))]
+    if brotli_available():
+        import brotli
+        compressors.append(("br", lambda b: brotli.compress(b, quality=5)))
+    header = f"{'points':>7}  {'encoding':<13}  {'encode ms':>9}  {'bytes':>9}"
+    header += "".join(f"  {name + ' bytes':>10}  {name + ' ms':>7}" for name, _ in compressors)
+    print(header)
+    for n in sizes:
+        rows = points(n)
+        for name, encode in encoders:
+            body, seconds = timed(encode, rows)
+            line = f"{n:>7}  {name:<13}  {seconds * 1000:>9.1f}  {len(body):>9}"
+            for _, compress in compressors:
+                packed, cs = timed(compress, body)
+                line += f"  {len(packed):>10}  {cs * 1000:>7.1f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Query count and time of /cardwatch/deals scoring: the per-card loop (the
+old ``calculate_deals``) vs. the bulk-loaded, vectorized ``deal_engine``.
+
+Usage: python benchmarks/bench_deals.py [sizes...]   (default: 1000 10000)
+
+Each size gets a fresh in-memory database with 20 offers and 14 daily rows
+per card, plus the ``card_latest`` snapshots the writer keeps; 10000 cards is
+200k offers. The new timing includes building one 20-deal page.
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from db import Base, CardLatest, SingleCard, SingleCardDaily, SingleCardOffer  # noqa: E402
+from scraper import compute_single_trend  # noqa: E402
+from tracker_utils.deal_finder import calculate_deals  # noqa: E402
+
+OFFERS_PER_CARD = 20
+
+
+def setup(n):
+    rng = random.Random(1)
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, future=True)()
+    today, now = date.today(), datetime.utcnow()
+    ids = range(1, n + 1)
+    base = {i: rng.uniform(1, 400) for i in ids}
+    session.execute(insert(SingleCard), [
+        {"id": i, "name": f"card {i}", "url": f"u{i}", "language": "English"} for i in ids
+    ])
+    session.execute(insert(SingleCardDaily), [
+        {"card_id": i, "day": today - timedelta(days=d), "low": base[i], "avg": base[i] * (1 + 0.01 * (d % 5))}
+        for i in ids for d in range(14)
+    ])
+    session.execute(insert(CardLatest), [
+        {"card_id": i, "ts": now, "low": base[i], "avg5": base[i], "avg7_price": base[i] * 1.02,
+         "supply": rng.randint(1, 400)}
+        for i in ids
+    ])
+    session.execute(insert(SingleCardOffer), [
+        {"card_id": i, "seller_name": f"seller{k}", "country": "Germany", "price": base[i] * rng.uniform(0.7, 1.3)}
+        for i in ids for k in range(OFFERS_PER_CARD)
+    ])
+    session.commit()
+    # The offers query bypasses engine events (DBAPI cursor): count in SQLite.
+    statements = []
+    session.connection().connection.driver_connection.set_trace_callback(
+        lambda sql: sql.startswith("SELECT") and statements.append(1))
+    return session, statements
+
+
+def old_deals(session):
+    """What calculate_deals ran per card before: snapshot, offers, dailies and trend."""
+    for card in session.query(SingleCard).filter(SingleCard.is_enabled == 1, SingleCard.language == "English"):
+        session.get(CardLatest, card.id)
+        session.query(SingleCardOffer).filter_by(card_id=card.id).order_by(SingleCardOffer.price).all()
+        session.query(SingleCardDaily).filter(SingleCardDaily.card_id == card.id).order_by(
+            SingleCardDaily.day.desc()).limit(7).all()
+        compute_single_trend(session, card.id, lookback_days=7)
+
+
+def new_deals(session):
+    return calculate_deals(session)[:20]
+
+
+def measure(session, statements, fn):
+    statements.clear()
+    started = time.perf_counter()
+    fn(session)
+    return len(statements), time.perf_counter() - started
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000]
+    print(f"{'cards':>6}  {'offers':>7}  {'old queries':>11}  {'old s':>7}  {'new queries':>11}  {'new s':>7}")
+    for n in sizes:
+        session, statements = setup(n)
+        old_q, old_s = measure(session, statements, old_deals)
+        session.expunge_all()
+        new_q, new_s = measure(session, statements, new_deals)
+        print(f"{n:>6}  {n * OFFERS_PER_CARD:>7}  {old_q:>11}  {old_s:>7.3f}  {new_q:>11}  {new_s:>7.3f}")
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
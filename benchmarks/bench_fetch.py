@@ -0,0 +1,53 @@
+"""Pages/sec and CPU per page: Firefox (fetch_page) vs plain HTTP (HttpFetcher).
+
+Usage: python benchmarks/bench_fetch.py [pages]
+
+Fetches the first ``pages`` enabled single cards from the database with both
+modes on the shared warm browser context, sequentially and without the host
+rate limiter, so only the fetch cost is measured. CPU includes the Firefox
+child processes. Needs network access, valid cookies and httpx.
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import http_fetcher  # noqa: E402
+from db import get_db_session, SingleCard  # noqa: E402
+from scrape_metrics import FetchStats, process_tree_cpu  # noqa: E402
+from scraper import BROWSER, fetch_page  # noqa: E402
+
+
+async def bench(urls):
+    context = await BROWSER.context()
+    stats = FetchStats(cpu_clock=process_tree_cpu)
+    fetcher = http_fetcher.HttpFetcher()
+    try:
+        for url in urls:
+            started = stats.start()
+            await fetch_page(context, url)
+            stats.record("browser", started)
+        for url in urls:
+            started = stats.start()
+            html = await fetcher.fetch(context, url)
+            stats.record("http" if html is not None else "http-failed", started)
+    finally:
+        await fetcher.aclose()
+    return stats
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    if not http_fetcher.available():
+        sys.exit("httpx is not installed")
+    with get_db_session() as session:
+        urls = [c.url for c in session.query(SingleCard).filter_by(is_enabled=1).limit(pages)]
+    try:
+        stats = BROWSER.run(bench(urls))
+    finally:
+        BROWSER.close()
+    print(stats.report(f"{len(urls)} pages"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Query count and time of the /cardwatch product table: per-product helpers
+(the old view) vs. ``product_index``.
+
+Usage: python benchmarks/bench_index.py [sizes...]   (default: 100 1000 10000)
+
+Each size gets a fresh in-memory database with 14 daily rows and 6 hourly
+prices per product, plus the ``product_latest`` snapshots the writer keeps.
+"""
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import create_engine, event, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from db import Base, Daily, Price, Product  # noqa: E402
+from latest_snapshot import rebuild_all  # noqa: E402
+from scraper import compute_trend, is_heads_up  # noqa: E402
+from tracker_utils.market_stats import product_index  # noqa: E402
+
+
+def setup(n):
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, future=True)()
+    today, now = date.today(), datetime.utcnow()
+    ids = range(1, n + 1)
+    session.execute(insert(Product), [{"id": i, "name": f"box {i}", "url": f"u{i}", "country": "Germany"} for i in ids])
+    session.execute(insert(Daily), [
+        {"product_id": i, "day": today - timedelta(days=d), "low": 100.0 + d, "avg": 100.0 + d}
+        for i in ids for d in range(14)
+    ])
+    session.execute(insert(Price), [
+        {"product_id": i, "ts": now - timedelta(hours=h), "low": 90.0 + h % 7, "avg5": 95.0, "n_seen": 5}
+        for i in ids for h in (1, 12, 25, 24 * 8, 24 * 31, 24 * 60)
+    ])
+    session.commit()
+    rebuild_all(session)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(1))
+    return session, statements
+
+
+def old_view(session):
+    """What index() ran per product before: trend, heads-up, latest, first and three as-of lookups."""
+    now = datetime.utcnow()
+    for p in session.query(Product).order_by(Product.name):
+        compute_trend(session, p.id)
+        is_heads_up(session, p.id)
+        base = session.query(Price).filter_by(product_id=p.id)
+        base.order_by(Price.ts.desc()).first()
+        base.order_by(Price.ts.asc()).first()
+        for delta in (timedelta(hours=24), timedelta(days=7), timedelta(days=30)):
+            base.filter(Price.ts <= now - delta).order_by(Price.ts.desc()).first()
+
+
+def measure(session, statements, fn):
+    statements.clear()
+    started = time.perf_counter()
+    fn(session)
+    return len(statements), time.perf_counter() - started
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [100, 1000, 10000]
+    print(f"{'products':>8}  {'old queries':>11}  {'old s':>7}  {'new queries':>11}  {'new s':>7}")
+    for n in sizes:
+        session, statements = setup(n)
+        old_q, old_s = measure(session, statements, old_view)
+        new_q, new_s = measure(session, statements, product_index)
+        print(f"{n:>8}  {old_q:>11}  {old_s:>7.3f}  {new_q:>11}  {new_s:>7.3f}")
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Parse time per page: one extractor-per-tree (old) vs one shared ParsedPage,
+for each available parser backend.
+
+Usage: python benchmarks/bench_parse.py [repeats]
+
+"before" reproduces the old scraper cost per single card: offers, summary
+(built twice) and supply each parsed their own lxml tree, and PSA10 parsed
+again with html.parser. The remaining columns parse once and run every
+extractor on that tree with the named backend.
+"""
+import glob
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from page_parser import ParsedPage, available_backends  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", "cardmarket")
+
+
+def before(html):
+    ParsedPage(html, "bs4").offers("English")
+    ParsedPage(html, "bs4")
+    ParsedPage(html, "bs4").summary()
+    ParsedPage(html, "bs4").supply()
+    BeautifulSoup(html, "html.parser")
+    ParsedPage(html, "bs4").psa10_offers()
+
+
+def after(html, backend):
+    page = ParsedPage(html, backend)
+    page.offers("English")
+    page.summary()
+    page.supply()
+    page.psa10_offers()
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    backends = available_backends()
+    print(f"{'page (ms per page)':32} {'KB':>6} {'before':>8}" + "".join(f" {b:>11}" for b in backends))
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        b = timed(lambda: before(html), repeats)
+        cols = ""
+        for backend in backends:
+            a = timed(lambda: after(html, backend), repeats)
+            cols += f" {a:6.1f} {b / a:3.0f}x"
+        print(f"{os.path.basename(path):32} {len(html) / 1024:6.0f} {b:8.1f}{cols}")
+
+
+if __name__ == "__main__":
+    main()
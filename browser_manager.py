@@ -0,0 +1,210 @@
+# browser_manager.py
+"""One warm Firefox + context shared by every scrape run.
+
+Playwright objects are bound to the event loop that created them, so the
+manager owns a long-lived loop in a daemon thread and scrape coroutines are
+submitted to it with ``BrowserManager.run`` (blocking) or ``submit``
+(returns a ``concurrent.futures.Future``) instead of ``asyncio.run``.
+
+``context()`` hands out the shared context, relaunching the browser when it
+has crashed/disconnected and recreating the context when it was closed, marked
+unhealthy, or is older than ``max_age``. Cookies are re-read from the cookie
+file only when its mtime changes.
+
+Scrape runs hold the context with ``lease()``. Runs can overlap (a scrape
+started from the UI next to the scheduled one), so a leased context that goes
+stale is only replaced for new runs; it is closed when its last run returns
+it.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from config import Config
+from cookie_loader import parse_netscape_cookies
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:147.0) Gecko/20100101 Firefox/147.0"
+COOKIE_FILE = "cookies-cardmarket-com.txt"
+
+
+class BrowserManager:
+    def __init__(self, cookie_file: str = COOKIE_FILE, setup=None, max_age: float = None,
+                 launcher=None):
+        self.cookie_file = cookie_file
+        self.setup = setup  # async fn(context), run once per new context
+        self.max_age = Config.SCRAPER_CONTEXT_MAX_AGE_S if max_age is None else max_age
+        self._launcher = launcher or self._launch_firefox
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._context_born = 0.0
+        self._context_dead = False
+        self._cookie_mtime = None
+        self._leases = {}  # context -> runs holding it
+        self._lock = None
+        self._loop = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    # --- event loop thread -------------------------------------------------
+
+    def _ensure_loop(self):
+        with self._thread_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="browser-manager",
+                                                daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def submit(self, coro):
+        """Schedule ``coro`` on the manager's loop; returns a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro):
+        """Run ``coro`` on the manager's loop and wait for its result."""
+        return self.submit(coro).result()
+
+    # --- browser / context lifecycle ---------------------------------------
+
+    async def _launch_firefox(self):
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        return await self._playwright.firefox.launch(headless=True)
+
+    def _browser_alive(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    def _context_stale(self) -> bool:
+        if self._context is None or self._context_dead:
+            return True
+        return self.max_age > 0 and time.monotonic() - self._context_born > self.max_age
+
+    async def context(self):
+        """The shared browser context, (re)created as needed."""
+        running = asyncio.get_running_loop()
+        if self._loop is not None and running is not self._loop:
+            raise RuntimeError("BrowserManager.context() must run on the manager loop; use BrowserManager.run()")
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._browser_alive():
+                if self._browser is not None:
+                    logger.warning("Browser disconnected; relaunching")
+                await self._retire_context()
+                self._browser = await self._launcher()
+                self._browser.on("disconnected", lambda *_: self._on_browser_gone())
+            if self._context_stale():
+                await self._retire_context()
+                await self._new_context()
+            await self._refresh_cookies()
+            return self._context
+
+    @asynccontextmanager
+    async def lease(self):
+        """``context()`` held for a whole scrape run; it is not closed under
+        the run even if another run replaces it meanwhile."""
+        context = await self.context()
+        self._leases[context] = self._leases.get(context, 0) + 1
+        try:
+            yield context
+        finally:
+            self._leases[context] -= 1
+            if not self._leases[context]:
+                del self._leases[context]
+                if context is not self._context:
+                    await self._close(context)
+
+    async def _new_context(self):
+        context = await self._browser.new_context(
+            user_agent=USER_AGENT,
+            extra_http_headers={"Referer": "https://www.cardmarket.com/"}
+        )
+        context.on("close", lambda *_: self._on_context_closed(context))
+        self._context = context
+        self._context_born = time.monotonic()
+        self._context_dead = False
+        self._cookie_mtime = None
+        if self.setup is not None:
+            await self.setup(context)
+        logger.info("Browser context created")
+
+    async def _refresh_cookies(self):
+        try:
+            mtime = os.path.getmtime(self.cookie_file)
+        except OSError as e:
+            if self._cookie_mtime is None:
+                logger.error(f"Failed to load cookies: {e}")
+                self._cookie_mtime = -1
+            return
+        if mtime == self._cookie_mtime:
+            return
+        try:
+            cookies = parse_netscape_cookies(self.cookie_file)
+            if self._cookie_mtime is not None:
+                await self._context.clear_cookies()
+                logger.info("Cookie file changed; reloading cookies")
+            await self._context.add_cookies(cookies)
+        except Exception as e:
+            logger.error(f"Failed to load cookies: {e}")
+        self._cookie_mtime = mtime
+
+    def _on_browser_gone(self):
+        self._context_dead = True
+
+    def _on_context_closed(self, context):
+        if context is self._context:
+            self._context_dead = True
+
+    def mark_unhealthy(self):
+        """Recreate the context on next use (e.g. after a Cloudflare block)."""
+        self._context_dead = True
+
+    async def _retire_context(self):
+        """Stop handing out the current context; close it unless a run holds it."""
+        context, self._context = self._context, None
+        if context is not None and context not in self._leases:
+            await self._close(context)
+
+    @staticmethod
+    async def _close(context):
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    async def aclose(self):
+        for context in {self._context, *self._leases} - {None}:
+            await self._close(context)
+        self._context = None
+        self._leases.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self):
+        """Shut the browser down and stop the manager thread."""
+        if self._loop is None:
+            return
+        try:
+            self.run(self.aclose())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+            self._lock = None
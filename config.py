@@ -9,3 +9,51 @@ class Config:
     MEDIA_ROOT = os.environ.get("MEDIA_ROOT", os.path.join(os.path.dirname(__file__), 'media'))
     CARDWATCH_DISABLE_SCHEDULER = os.environ.get("CARDWATCH_DISABLE_SCHEDULER")
     FLASK_DEBUG = os.environ.get("FLASK_DEBUG", "0")
+    # Scraper concurrency: pages working in parallel and the per-host request
+    # budget they share (requests per minute).
+    SCRAPER_WORKERS = int(os.environ.get("SCRAPER_WORKERS", "2"))
+    SCRAPER_HOST_RATE_PER_MIN = float(os.environ.get("SCRAPER_HOST_RATE_PER_MIN", "5"))
+    # HTML parser engine for scraped pages: auto | lxml | selectolax | bs4
+    SCRAPER_PARSER_BACKEND = os.environ.get("SCRAPER_PARSER_BACKEND", "auto")
+    # Where scraped HTML is parsed: auto | inline | thread | process
+    SCRAPER_PARSE_EXECUTOR = os.environ.get("SCRAPER_PARSE_EXECUTOR", "auto")
+    SCRAPER_PARSE_WORKERS = int(os.environ.get("SCRAPER_PARSE_WORKERS", "0"))
+    # Request routing for scraped pages: off | audit | enforce (see request_policy.py)
+    SCRAPER_ROUTE_POLICY = os.environ.get("SCRAPER_ROUTE_POLICY", "audit")
+    SCRAPER_ROUTE_POLICY_FILE = os.environ.get("SCRAPER_ROUTE_POLICY_FILE", "route_policy.json")
+    # Data-usage accounting: sizes | sampled | headers | off (see scrape_metrics.py)
+    SCRAPER_USAGE_ACCOUNTING = os.environ.get("SCRAPER_USAGE_ACCOUNTING", "sizes")
+    SCRAPER_USAGE_SAMPLE_EVERY = int(os.environ.get("SCRAPER_USAGE_SAMPLE_EVERY", "10"))
+    # Page readiness: selector (domcontentloaded + offers table) | networkidle
+    SCRAPER_READY_STRATEGY = os.environ.get("SCRAPER_READY_STRATEGY", "selector")
+    SCRAPER_READY_TIMEOUT_MS = int(os.environ.get("SCRAPER_READY_TIMEOUT_MS", "15000"))
+    # Recreate the shared browser context after this many seconds (0 = never)
+    SCRAPER_CONTEXT_MAX_AGE_S = int(os.environ.get("SCRAPER_CONTEXT_MAX_AGE_S", "21600"))
+    # How pages are fetched: browser | http (httpx with the browser's cookies,
+    # falling back to the browser on Cloudflare challenges)
+    SCRAPER_FETCH_MODE = os.environ.get("SCRAPER_FETCH_MODE", "browser")
+    SCRAPER_HTTP2 = os.environ.get("SCRAPER_HTTP2", "1") == "1"
+    # Archive of fetched pages for offline re-parsing (python html_archive.py replay)
+    HTML_ARCHIVE_ENABLED = os.environ.get("HTML_ARCHIVE_ENABLED", "1") == "1"
+    HTML_ARCHIVE_DIR = os.environ.get("HTML_ARCHIVE_DIR", os.path.join(os.path.dirname(__file__), 'html_archive'))
+    HTML_ARCHIVE_RETENTION_DAYS = int(os.environ.get("HTML_ARCHIVE_RETENTION_DAYS", "30"))
+    HTML_ARCHIVE_LEVEL = int(os.environ.get("HTML_ARCHIVE_LEVEL", "9"))
+    # Scrape results are written in batches of this size or after this many seconds
+    SCRAPER_WRITE_BATCH = int(os.environ.get("SCRAPER_WRITE_BATCH", "25"))
+    SCRAPER_WRITE_INTERVAL_S = float(os.environ.get("SCRAPER_WRITE_INTERVAL_S", "60"))
+    # Cached /cardwatch/deals rankings are patched as scrapes land and
+    # rebuilt from scratch after this many seconds
+    DEALS_CACHE_MAX_AGE_S = float(os.environ.get("DEALS_CACHE_MAX_AGE_S", "3600"))
+    # How far below their watermark they look for late commits (longest
+    # write transaction of any process)
+    DEALS_CACHE_OVERLAP_S = float(os.environ.get("DEALS_CACHE_OVERLAP_S", "300"))
+    # Chart series endpoints return at most this many points by default
+    # (?max_points= overrides, up to 5000)
+    SERIES_MAX_POINTS = int(os.environ.get("SERIES_MAX_POINTS", "1000"))
+    # Rendered chart/list/detail responses kept in memory, by ETag (MB)
+    RESPONSE_CACHE_MAX_BYTES = int(float(os.environ.get("RESPONSE_CACHE_MAX_MB", "32")) * 1024 * 1024)
+    # List responses (sparklines over "the last 30 days", edits made by other
+    # processes) are re-rendered at least this often
+    RESPONSE_CACHE_TTL_S = int(os.environ.get("RESPONSE_CACHE_TTL_S", "300"))
+    # Scraper health and run progress, shared between the scraper and the web app
+    SCRAPER_STATUS_FILE = os.environ.get("SCRAPER_STATUS_FILE", "scraper_status.json")
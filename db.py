@@ -1,4 +1,4 @@
-from datetime import datetime, date
+from datetime import datetime, date, time
 from contextlib import contextmanager
 from typing import Generator, Optional, Any
 from sqlalchemy import (
@@ -11,8 +11,14 @@ from sqlalchemy import (
     Date,
     ForeignKey,
     UniqueConstraint,
+    Index,
+    case,
+    delete,
     func,
+    insert,
+    select,
 )
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 
 from config import Config
@@ -30,6 +36,7 @@ class Product(Base):
     is_enabled = Column(Integer, default=1)
 
     prices = relationship("Price", back_populates="product", cascade="all, delete-orphan")
+    latest = relationship("ProductLatest", uselist=False, cascade="all, delete-orphan")
 
 class Price(Base):
     __tablename__ = "prices"
@@ -42,6 +49,8 @@ class Price(Base):
     supply = Column(Integer, nullable=True)        # available items on site
 
     product = relationship("Product", back_populates="prices")
+    # Latest/as-of lookups and series reads per product, without touching the table.
+    __table_args__ = (Index("ix_prices_product_ts_cover", "product_id", "ts", "low", "avg5", "supply"),)
 
 class Daily(Base):
     __tablename__ = "daily"
@@ -50,7 +59,12 @@ class Daily(Base):
     day = Column(Date, default=date.today, index=True)
     low = Column(Float, nullable=False)
     avg = Column(Float, nullable=False)
-    __table_args__ = (UniqueConstraint("product_id", "day", name="uniq_daily"),)
+    avg_sum = Column(Float, nullable=True)         # running sum of avg5 for the day
+    avg_n = Column(Integer, nullable=True)         # ... and how many prices went into it
+    __table_args__ = (
+        UniqueConstraint("product_id", "day", name="uniq_daily"),
+        Index("ix_daily_product_day_cover", "product_id", "day", "low", "avg"),
+    )
 
 
 class SingleCard(Base):
@@ -80,6 +94,8 @@ class SingleCard(Base):
         "PSA10Price", back_populates="card", cascade="all, delete-orphan"
     )
 
+    latest = relationship("CardLatest", uselist=False, cascade="all, delete-orphan")
+
     psa10_offers = relationship(
         "PSA10Offer", back_populates="card", cascade="all, delete-orphan"
     )
@@ -103,6 +119,7 @@ class SingleCardPrice(Base):
     avg1_price = Column(Float, nullable=True)
 
     card = relationship("SingleCard", back_populates="prices")
+    __table_args__ = (Index("ix_single_card_prices_card_ts_cover", "card_id", "ts", "low", "avg5", "supply"),)
 
 
 class SingleCardOffer(Base):
@@ -113,9 +130,28 @@ class SingleCardOffer(Base):
     seller_name = Column(String, nullable=False)
     country = Column(String, nullable=True)
     price = Column(Float, nullable=False)
-    ts = Column(DateTime, default=datetime.utcnow, index=True)
+    ts = Column(DateTime, default=datetime.utcnow, index=True)  # last time the row changed
+    first_seen = Column(DateTime, default=datetime.utcnow, nullable=True)
+    last_seen = Column(DateTime, default=datetime.utcnow, nullable=True)
 
     card = relationship("SingleCard", back_populates="offers")
+    __table_args__ = (Index("ix_single_card_offers_card_price", "card_id", "price"),)
+
+
+class OfferEvent(Base):
+    """Listed / delisted / repriced, as seen by successive scrapes of a card.
+
+    Read incrementally by ``id`` (see ``offer_sync.offer_events_since``).
+    """
+    __tablename__ = "offer_events"
+    id = Column(Integer, primary_key=True)
+    card_id = Column(Integer, ForeignKey("single_cards.id"), index=True, nullable=False)
+    event = Column(String, nullable=False)         # "listed", "delisted", "repriced"
+    seller_name = Column(String, nullable=False)
+    country = Column(String, nullable=True)
+    price = Column(Float, nullable=False)          # current price (last price for delisted)
+    old_price = Column(Float, nullable=True)       # repriced only
+    ts = Column(DateTime, default=datetime.utcnow, index=True)
 
 
 class SingleCardDaily(Base):
@@ -125,7 +161,57 @@ class SingleCardDaily(Base):
     day = Column(Date, default=date.today, index=True)
     low = Column(Float, nullable=True)
     avg = Column(Float, nullable=True)
-    __table_args__ = (UniqueConstraint("card_id", "day", name="uniq_single_daily"),)
+    avg_sum = Column(Float, nullable=True)
+    avg_n = Column(Integer, nullable=True)
+    __table_args__ = (
+        UniqueConstraint("card_id", "day", name="uniq_single_daily"),
+        Index("ix_single_card_daily_card_day_cover", "card_id", "day", "low", "avg"),
+    )
+
+
+class CardLatest(Base):
+    """Per-card snapshot of the newest prices, kept by ``latest_snapshot``.
+
+    ``low_24h`` .. ``low_90d`` are the lows of the newest price at or before
+    that age, as of ``updated``: the last scrape of the card, or at most
+    ``latest_snapshot.STALE_AFTER`` ago (``refresh_stale``).
+    """
+    __tablename__ = "card_latest"
+    card_id = Column(Integer, ForeignKey("single_cards.id"), primary_key=True)
+    ts = Column(DateTime, nullable=True)           # newest SingleCardPrice
+    low = Column(Float, nullable=True)
+    avg5 = Column(Float, nullable=True)
+    supply = Column(Integer, nullable=True)
+    from_price = Column(Float, nullable=True)
+    price_trend = Column(Float, nullable=True)
+    avg7_price = Column(Float, nullable=True)
+    avg1_price = Column(Float, nullable=True)
+    first_low = Column(Float, nullable=True)       # oldest non-null low
+    low_24h = Column(Float, nullable=True)
+    low_7d = Column(Float, nullable=True)
+    low_30d = Column(Float, nullable=True)
+    low_90d = Column(Float, nullable=True)
+    supply_7d = Column(Integer, nullable=True)
+    psa10_low = Column(Float, nullable=True)       # newest PSA10Price
+    psa10_ts = Column(DateTime, nullable=True)
+    updated = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # change watermark
+
+
+class ProductLatest(Base):
+    """``CardLatest`` for sealed products."""
+    __tablename__ = "product_latest"
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    ts = Column(DateTime, nullable=True)
+    low = Column(Float, nullable=True)
+    avg5 = Column(Float, nullable=True)
+    supply = Column(Integer, nullable=True)
+    first_low = Column(Float, nullable=True)
+    low_24h = Column(Float, nullable=True)
+    low_7d = Column(Float, nullable=True)
+    low_30d = Column(Float, nullable=True)
+    low_90d = Column(Float, nullable=True)
+    supply_7d = Column(Integer, nullable=True)
+    updated = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 class Item(Base):
@@ -162,6 +248,7 @@ class PSA10Price(Base):
     low = Column(Float, nullable=False) # Lowest PSA10 price found
 
     card = relationship("SingleCard", back_populates="psa10_prices")
+    __table_args__ = (Index("ix_psa10_prices_card_ts_cover", "card_id", "ts", "low"),)
 
 
 class PSA10Offer(Base):
@@ -198,6 +285,20 @@ class BookkeepingEntry(Base):
 
 
 
+class PageArchive(Base):
+    """One fetched page; the HTML itself lives in ``html_archive`` blobs."""
+    __tablename__ = "page_archive"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)          # "single" or "sealed"
+    ref_id = Column(Integer, nullable=False)       # SingleCard.id / Product.id
+    url = Column(String, nullable=False)
+    ts = Column(DateTime, default=datetime.utcnow, nullable=False)  # == price row ts
+    sha256 = Column(String(64), nullable=False, index=True)
+    codec = Column(String, nullable=False)         # "zstd" or "zlib"
+    size = Column(Integer, nullable=False)         # uncompressed bytes
+    __table_args__ = (Index("ix_page_archive_kind_ref_ts", "kind", "ref_id", "ts"),)
+
+
 def init_db():
     Base.metadata.create_all(ENGINE)
 
@@ -222,40 +323,100 @@ def get_session():
     """Deprecated: Use get_db_session context manager instead."""
     return SessionLocal()
 
-def upsert_daily(session, product_id:int):
-    # aggregate last 24h -> daily row
-    today = date.today()
-    agg = session.query(func.min(Price.low), func.avg(Price.avg5)).filter(
-        Price.product_id == product_id,
-        func.date(Price.ts) == today.isoformat()
-    ).first()
-    if agg and agg[0] is not None:
-        low, avg = float(agg[0]), float(agg[1])
-        row = session.query(Daily).filter_by(product_id=product_id, day=today).one_or_none()
-        if row:
-            row.low, row.avg = low, avg
-        else:
-            session.add(Daily(product_id=product_id, day=today, low=low, avg=avg))
-        session.commit()
-
-
-def upsert_single_daily(session, card_id: int):
-    """Aggregate the most recent day's single-card prices."""
-    today = date.today()
-    agg = (
-        session.query(func.min(SingleCardPrice.low), func.avg(SingleCardPrice.avg5))
-        .filter(SingleCardPrice.card_id == card_id, func.date(SingleCardPrice.ts) == today)
-        .first()
+def _day_range(start: Optional[date], end: Optional[date]):
+    """``[start, end)`` as datetimes, so ``ts`` comparisons can use the index."""
+    return (datetime.combine(start, time.min) if start else None,
+            datetime.combine(end, time.min) if end else None)
+
+
+def _backfill_daily(session, model, key, price_model, start=None, end=None, ids=None):
+    ref = getattr(price_model, key)
+    lo, hi = _day_range(start, end)
+    where, stale = [price_model.low.isnot(None)], []
+    if ids is not None:
+        where.append(ref.in_(ids))
+        stale.append(getattr(model, key).in_(ids))
+    if lo:
+        where.append(price_model.ts >= lo)
+        stale.append(model.day >= start)
+    if hi:
+        where.append(price_model.ts < hi)
+        stale.append(model.day < end)
+    day = func.date(price_model.ts)
+    aggs = (
+        select(ref, day, func.min(price_model.low), func.avg(price_model.avg5),
+               func.sum(price_model.avg5), func.count(price_model.avg5))
+        .where(*where)
+        .group_by(ref, day)
     )
-    if agg and agg[0] is not None:
-        low, avg = float(agg[0]), float(agg[1]) if agg[1] is not None else None
-        row = (
-            session.query(SingleCardDaily)
-            .filter_by(card_id=card_id, day=today)
-            .one_or_none()
-        )
-        if row:
-            row.low, row.avg = low, avg
-        else:
-            session.add(SingleCardDaily(card_id=card_id, day=today, low=low, avg=avg))
-        session.commit()
+    session.execute(delete(model).where(*stale))
+    session.execute(insert(model).from_select([key, "day", "low", "avg", "avg_sum", "avg_n"], aggs))
+
+
+def backfill_daily(session, start: date = None, end: date = None, product_ids=None):
+    """Rebuild ``daily`` for days in ``[start, end)`` (open-ended when ``None``)
+    from ``prices`` with one ``INSERT ... SELECT`` (no commit)."""
+    _backfill_daily(session, Daily, "product_id", Price, start, end, product_ids)
+
+
+def backfill_single_daily(session, start: date = None, end: date = None, card_ids=None):
+    """``backfill_daily`` for ``single_card_daily`` (no commit)."""
+    _backfill_daily(session, SingleCardDaily, "card_id", SingleCardPrice, start, end, card_ids)
+
+
+def rebuild_daily(session, product_ids):
+    """Recompute every daily row of ``product_ids`` from their prices (no commit)."""
+    backfill_daily(session, product_ids=product_ids)
+
+
+def rebuild_single_daily(session, card_ids):
+    """Recompute every daily row of ``card_ids`` from their prices (no commit)."""
+    backfill_single_daily(session, card_ids=card_ids)
+
+
+def _add_to_daily(session, model, key, prices):
+    """Upsert the day totals of ``prices`` into ``model`` in one statement, so
+    concurrent writers add to the same row instead of overwriting it."""
+    days = {}
+    for p in prices:
+        if p.get("low") is None:
+            continue
+        k = (p[key], p["ts"].date())
+        low, total, n = days.get(k, (p["low"], 0.0, 0))
+        if p.get("avg5") is not None:
+            total, n = total + p["avg5"], n + 1
+        days[k] = (min(low, p["low"]), total, n)
+    if not days:
+        return
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(model).values([
+        # avg is NOT NULL: a day without averages yet shows its low.
+        {key: ref, "day": day, "low": low, "avg": total / n if n else low, "avg_sum": total, "avg_n": n}
+        for (ref, day), (low, total, n) in days.items()
+    ])
+    new = stmt.excluded
+    t = model.__table__.c
+    # Row written before running sums existed: its average counts once.
+    avg_sum = func.coalesce(t.avg_sum, t.avg, 0.0) + new.avg_sum
+    avg_n = func.coalesce(t.avg_n, case((t.avg.is_(None), 0), else_=1)) + new.avg_n
+    low = case((t.low.is_(None), new.low), (new.low < t.low, new.low), else_=t.low)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key, "day"],
+        set_={"low": low, "avg_sum": avg_sum, "avg_n": avg_n, "avg": case((avg_n > 0, avg_sum / avg_n), else_=low)},
+    )
+    session.execute(stmt)
+    # Loaded rows are now stale; reload them on next access.
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, model):
+            session.expire(obj)
+
+
+def add_daily_prices(session, prices):
+    """Fold new ``prices`` mappings (``product_id``, ``ts``, ``low``, ``avg5``)
+    into their daily rows as running min/sum/count (no commit)."""
+    _add_to_daily(session, Daily, "product_id", prices)
+
+
+def add_single_daily_prices(session, prices):
+    """``add_daily_prices`` for single-card prices keyed on ``card_id`` (no commit)."""
+    _add_to_daily(session, SingleCardDaily, "card_id", prices)
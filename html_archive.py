@@ -0,0 +1,281 @@
+# html_archive.py
+"""On-disk archive of every fetched page, for re-parsing without the network.
+
+Pages are stored once per content hash under ``<root>/<sha[:2]>/<sha>.<ext>``
+(zstd when the ``zstandard`` package is installed, zlib otherwise) and
+indexed in the ``page_archive`` table by kind ("single"/"sealed"), card or
+product id and the timestamp of the price row written from that page.
+
+Usage:
+    python html_archive.py replay [--kind single|sealed] [--id N ...] [--since YYYY-MM-DD] [--dry-run]
+    python html_archive.py prune [--days N]
+    python html_archive.py stats
+
+``replay`` re-runs the current parsers over the archive and rewrites the
+price rows (matched on id + timestamp), the current offers, the daily
+rollups and the latest snapshots in bulk.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from config import Config
+from db import (
+    get_db_session,
+    PageArchive,
+    Price,
+    Product,
+    SingleCard,
+    SingleCardPrice,
+    rebuild_daily,
+    rebuild_single_daily,
+)
+from latest_snapshot import refresh_card_latest, refresh_product_latest
+from offer_sync import reconcile_offers
+from parse_executor import parse_sealed_html, parse_single_card_html
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"zstd": "zst", "zlib": "zz"}
+
+
+def zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _compress(data: bytes, codec: str, level: int) -> bytes:
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, min(level, 9))
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class HtmlArchive:
+    def __init__(self, root: str = None, codec: str = None, level: int = None):
+        self.root = root or Config.HTML_ARCHIVE_DIR
+        if codec is None:
+            codec = "zstd" if zstd_available() else "zlib"
+        if codec not in EXTENSIONS:
+            raise ValueError(f"Unknown archive codec: {codec}")
+        self.codec = codec
+        self.level = level or Config.HTML_ARCHIVE_LEVEL
+
+    def path(self, sha: str, codec: str) -> str:
+        return os.path.join(self.root, sha[:2], f"{sha}.{EXTENSIONS[codec]}")
+
+    def put(self, html: str):
+        """Store ``html``; returns ``(sha256, codec, size)``. Existing blobs are reused."""
+        data = html.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        for codec in EXTENSIONS:
+            path = self.path(sha, codec)
+            if os.path.exists(path):
+                # Fresh mtime: prune must not take it before our index row lands.
+                os.utime(path)
+                return sha, codec, len(data)
+        path = self.path(sha, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(_compress(data, self.codec, self.level))
+        os.replace(tmp, path)
+        return sha, self.codec, len(data)
+
+    def get(self, sha: str, codec: str) -> str:
+        with open(self.path(sha, codec), "rb") as f:
+            return _decompress(f.read(), codec).decode("utf-8")
+
+    def record(self, session, kind: str, ref_id: int, url: str, html: str, ts: datetime) -> PageArchive:
+        """Store the blob and add its index row to ``session`` (caller commits)."""
+        sha, codec, size = self.put(html)
+        row = PageArchive(kind=kind, ref_id=ref_id, url=url, ts=ts, sha256=sha, codec=codec, size=size)
+        session.add(row)
+        return row
+
+    def prune(self, session, keep_days: int = None):
+        """Drop index rows older than ``keep_days`` (always keeping the newest
+        page of every card/product) and then every unreferenced blob older
+        than that, so blobs whose index row a scraper has not committed yet
+        survive."""
+        keep_days = Config.HTML_ARCHIVE_RETENTION_DAYS if keep_days is None else keep_days
+        cutoff = datetime.utcnow() - timedelta(days=keep_days)
+        newest = select(func.max(PageArchive.id)).group_by(PageArchive.kind, PageArchive.ref_id)
+        rows = (
+            session.query(PageArchive)
+            .filter(PageArchive.ts < cutoff, PageArchive.id.not_in(newest))
+            .delete(synchronize_session=False)
+        )
+        session.commit()
+
+        referenced = {(sha, codec) for sha, codec in session.query(PageArchive.sha256, PageArchive.codec).distinct()}
+        by_ext = {ext: codec for codec, ext in EXTENSIONS.items()}
+        blobs = 0
+        cutoff_mtime = cutoff.replace(tzinfo=timezone.utc).timestamp()
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                sha, _, ext = name.partition(".")
+                if ext not in by_ext or (sha, by_ext[ext]) in referenced:
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.path.getmtime(path) >= cutoff_mtime:
+                        continue
+                    os.remove(path)
+                except OSError:
+                    continue
+                blobs += 1
+        logger.info(f"Archive prune: {rows} index rows and {blobs} blobs removed (older than {keep_days} days)")
+        return rows, blobs
+
+
+def _archived(session, kind, ids=None, since=None):
+    q = session.query(PageArchive).filter(PageArchive.kind == kind)
+    if ids:
+        q = q.filter(PageArchive.ref_id.in_(ids))
+    if since:
+        q = q.filter(PageArchive.ts >= since)
+    return q.order_by(PageArchive.ref_id, PageArchive.ts).all()
+
+
+def replay_singles(session, archive: HtmlArchive, card_ids=None, since=None, dry_run=False, backend=None):
+    """Re-parse archived single-card pages and rewrite prices, offers and dailies."""
+    from scraper import is_sealed_card
+
+    pages = _archived(session, "single", card_ids, since)
+    ids = sorted({p.ref_id for p in pages})
+    cards = {c.id: c for c in session.query(SingleCard).filter(SingleCard.id.in_(ids))}
+    q = session.query(SingleCardPrice.id, SingleCardPrice.card_id, SingleCardPrice.ts).filter(
+        SingleCardPrice.card_id.in_(ids))
+    if since:
+        q = q.filter(SingleCardPrice.ts >= since)
+    existing = {(card_id, ts): pid for pid, card_id, ts in q}
+
+    updates, inserts, latest = [], [], {}
+    for page in pages:
+        card = cards.get(page.ref_id)
+        if card is None:
+            continue
+        try:
+            html = archive.get(page.sha256, page.codec)
+        except OSError as e:
+            logger.warning(f"Missing archive blob {page.sha256} for card {card.id}: {e}")
+            continue
+        parsed = parse_single_card_html(html, card.language, is_sealed=is_sealed_card(card), backend=backend)
+        stats = parsed["stats"]
+        if stats is None:
+            # Like the scraper: a page without prices leaves the offers alone.
+            continue
+        latest[card.id] = (page.ts, parsed["offers"])
+        pid = existing.get((card.id, page.ts))
+        if pid is not None:
+            updates.append({"id": pid, **stats})
+        else:
+            inserts.append({"card_id": card.id, "ts": page.ts, **stats})
+
+    result = {"pages": len(pages), "updated": len(updates), "inserted": len(inserts), "cards": len(latest)}
+    if dry_run:
+        return result
+
+    session.bulk_update_mappings(SingleCardPrice, updates)
+    session.bulk_insert_mappings(SingleCardPrice, inserts)
+    # A correction, not market activity: no offer events.
+    reconcile_offers(session, latest, record_events=False)
+    rebuild_single_daily(session, list(latest))
+    refresh_card_latest(session, list(latest))
+    session.commit()
+    return result
+
+
+def replay_sealed(session, archive: HtmlArchive, product_ids=None, since=None, dry_run=False, backend=None):
+    """Re-parse archived sealed product pages and rewrite prices and dailies."""
+    pages = _archived(session, "sealed", product_ids, since)
+    ids = sorted({p.ref_id for p in pages})
+    products = {p.id: p for p in session.query(Product).filter(Product.id.in_(ids))}
+    q = session.query(Price.id, Price.product_id, Price.ts).filter(Price.product_id.in_(ids))
+    if since:
+        q = q.filter(Price.ts >= since)
+    existing = {(product_id, ts): pid for pid, product_id, ts in q}
+
+    updates, inserts, touched = [], [], set()
+    for page in pages:
+        prod = products.get(page.ref_id)
+        if prod is None:
+            continue
+        try:
+            html = archive.get(page.sha256, page.codec)
+        except OSError as e:
+            logger.warning(f"Missing archive blob {page.sha256} for product {prod.id}: {e}")
+            continue
+        stats = parse_sealed_html(html, prod.country, backend=backend)["stats"]
+        if stats is None:
+            continue
+        touched.add(prod.id)
+        pid = existing.get((prod.id, page.ts))
+        if pid is not None:
+            updates.append({"id": pid, **stats})
+        else:
+            inserts.append({"product_id": prod.id, "ts": page.ts, **stats})
+
+    result = {"pages": len(pages), "updated": len(updates), "inserted": len(inserts), "products": len(touched)}
+    if dry_run:
+        return result
+    session.bulk_update_mappings(Price, updates)
+    session.bulk_insert_mappings(Price, inserts)
+    rebuild_daily(session, list(touched))
+    refresh_product_latest(session, list(touched))
+    session.commit()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scraped HTML archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rp = sub.add_parser("replay", help="re-parse archived pages into the database")
+    rp.add_argument("--kind", choices=("single", "sealed"), default="single")
+    rp.add_argument("--id", type=int, action="append", dest="ids", help="card/product id (repeatable)")
+    rp.add_argument("--since", type=datetime.fromisoformat)
+    rp.add_argument("--backend", default=None, help="parser backend (default: SCRAPER_PARSER_BACKEND)")
+    rp.add_argument("--dry-run", action="store_true")
+    pp = sub.add_parser("prune", help="apply the retention policy")
+    pp.add_argument("--days", type=int, default=None)
+    sub.add_parser("stats", help="archive size")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+    archive = HtmlArchive()
+    with get_db_session() as session:
+        if args.command == "replay":
+            fn = replay_singles if args.kind == "single" else replay_sealed
+            result = fn(session, archive, args.ids, args.since, dry_run=args.dry_run, backend=args.backend)
+            print(f"Replayed {args.kind}: {result}" + (" (dry run)" if args.dry_run else ""))
+        elif args.command == "prune":
+            archive.prune(session, args.days)
+        else:
+            n, size, blobs = session.query(
+                func.count(PageArchive.id), func.sum(PageArchive.size), func.count(PageArchive.sha256.distinct())
+            ).one()
+            disk = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(archive.root) for f in files)
+            print(f"{n} pages, {blobs} blobs, {(size or 0) / 1024 / 1024:.1f} MB raw, "
+                  f"{disk / 1024 / 1024:.1f} MB on disk ({archive.codec})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
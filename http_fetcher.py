@@ -0,0 +1,112 @@
+# http_fetcher.py
+"""Fetch server-rendered Cardmarket pages without driving Firefox.
+
+``HttpFetcher`` wraps an ``httpx.AsyncClient`` (connection pool, HTTP/2
+keep-alive when ``h2`` is installed) that borrows the cookies and user agent
+of the Playwright context, so Cloudflare sees the same session. ``fetch``
+returns ``None`` whenever the answer is a challenge, a waiting room or an
+error; the caller then falls back to the browser.
+
+``httpx`` is optional: without it ``available()`` is False and everything
+keeps going through ``fetch_page``.
+"""
+import logging
+
+from browser_manager import USER_AGENT
+
+logger = logging.getLogger(__name__)
+
+CHALLENGE_MARKERS = ("Just a moment", "You are now in line", "<title>www.cardmarket.com</title>",
+                     "challenges.cloudflare.com")
+
+
+def available() -> bool:
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def is_challenge(status: int, headers, text: str) -> bool:
+    """Cloudflare interstitial, block or waiting room instead of the product page."""
+    if headers.get("cf-mitigated") == "challenge":
+        return True
+    if status in (403, 429, 503):
+        return True
+    head = text[:4096]
+    return any(marker in head for marker in CHALLENGE_MARKERS)
+
+
+class HttpFetcher:
+    def __init__(self, http2: bool = True, timeout: float = 30.0, max_connections: int = 4):
+        self.http2 = http2 and _http2_available()
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client = None
+        self._context = None
+
+    async def _ensure_client(self, context):
+        import httpx
+
+        if self._client is not None and self._context is context:
+            return self._client
+        await self.aclose()
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            headers={
+                "User-Agent": USER_AGENT,
+                "Referer": "https://www.cardmarket.com/",
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-US,en;q=0.5",
+            },
+        )
+        self._context = context
+        await self.sync_cookies(context)
+        return self._client
+
+    async def sync_cookies(self, context):
+        """Copy the browser context's cookies (cf_clearance etc.) into the client."""
+        if self._client is None:
+            return
+        for c in await context.cookies():
+            self._client.cookies.set(c["name"], c["value"], domain=c.get("domain", ""),
+                                     path=c.get("path", "/"))
+
+    async def fetch(self, context, url: str, card_name: str = None):
+        """Page HTML, or ``None`` when the browser has to take over."""
+        try:
+            client = await self._ensure_client(context)
+            resp = await client.get(url)
+        except Exception as e:
+            logger.warning(f"[{card_name or 'Unknown'}] HTTP fetch failed, using browser: {e}")
+            return None
+        text = resp.text
+        if is_challenge(resp.status_code, resp.headers, text):
+            logger.info(f"[{card_name or 'Unknown'}] HTTP fetch hit a challenge ({resp.status_code}), using browser")
+            return None
+        if resp.status_code != 200:
+            logger.warning(f"[{card_name or 'Unknown'}] HTTP fetch returned {resp.status_code}, using browser")
+            return None
+        return text
+
+    async def aclose(self):
+        client, self._client = self._client, None
+        self._context = None
+        if client is not None:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
@@ -0,0 +1,194 @@
+# latest_snapshot.py
+"""``card_latest`` / ``product_latest``: one row per card/product holding the
+newest prices, the first-ever low and the as-of lows used for % changes.
+
+List pages read these rows instead of running "latest row per card" queries.
+The writer refreshes the snapshots of every card/product in a batch in the
+same transaction as its price inserts; a refresh costs a fixed number of
+set-based queries per batch, not per card.
+
+The as-of lows only move when a snapshot is refreshed. Cards that are no
+longer scraped (disabled, blocked, failing) would keep the lows of the day
+they were last seen, so the scheduled scrape ends with ``refresh_stale``,
+which refreshes every snapshot older than ``STALE_AFTER`` and creates the
+ones still missing.
+
+Usage:
+    python latest_snapshot.py   # rebuild every snapshot from the price tables
+"""
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select
+
+from db import (
+    get_db_session,
+    CardLatest,
+    Price,
+    Product,
+    ProductLatest,
+    PSA10Price,
+    SingleCard,
+    SingleCardPrice,
+)
+
+# Snapshot column -> age of the price it holds.
+AS_OF = {
+    "low_24h": timedelta(hours=24),
+    "low_7d": timedelta(days=7),
+    "low_30d": timedelta(days=30),
+    "low_90d": timedelta(days=90),
+}
+
+CARD_FIELDS = ("low", "avg5", "supply", "from_price", "price_trend", "avg7_price", "avg1_price")
+PRODUCT_FIELDS = ("low", "avg5", "supply")
+
+CHUNK = 500
+# Snapshots not refreshed for this long are refreshed by ``refresh_stale``.
+STALE_AFTER = timedelta(hours=24)
+
+
+def _rows_at(session, price_model, key, ids, before=None, first=False):
+    """Newest row per id (at or before ``before``), or the oldest with a low."""
+    ref = getattr(price_model, key)
+    edge = select(ref.label("ref"), (func.min if first else func.max)(price_model.ts).label("ts")).where(
+        ref.in_(ids))
+    if before is not None:
+        edge = edge.where(price_model.ts <= before)
+    if first:
+        edge = edge.where(price_model.low.isnot(None))
+    edge = edge.group_by(ref).subquery()
+    rows = session.query(price_model).join(edge, and_(ref == edge.c.ref, price_model.ts == edge.c.ts))
+    return {getattr(r, key): r for r in rows}
+
+
+def _refresh(session, model, key, price_model, fields, ids, now, snaps=None):
+    ids = sorted(set(ids))
+    if not ids:
+        return 0
+    latest = _rows_at(session, price_model, key, ids)
+    first = _rows_at(session, price_model, key, ids, first=True)
+    past = {name: _rows_at(session, price_model, key, ids, before=now - age) for name, age in AS_OF.items()}
+    persist = snaps is None
+    if persist:
+        snaps = {getattr(s, key): s for s in session.query(model).filter(getattr(model, key).in_(ids))}
+    for ref in ids:
+        row = latest.get(ref)
+        if row is None:
+            continue
+        snap = snaps.get(ref)
+        if snap is None:
+            snap = snaps[ref] = model(**{key: ref})
+            if persist:
+                session.add(snap)
+        snap.ts = row.ts
+        for field in fields:
+            setattr(snap, field, getattr(row, field))
+        snap.first_low = first[ref].low if ref in first else None
+        for name, rows in past.items():
+            setattr(snap, name, rows[ref].low if ref in rows else None)
+        snap.supply_7d = past["low_7d"][ref].supply if ref in past["low_7d"] else None
+        snap.updated = now
+    return len(latest)
+
+
+def refresh_card_latest(session, card_ids, now: datetime = None) -> int:
+    """Recompute ``card_latest`` for ``card_ids`` (no commit); returns rows written."""
+    now = now or datetime.utcnow()
+    n = _refresh(session, CardLatest, "card_id", SingleCardPrice, CARD_FIELDS, card_ids, now)
+    ids = sorted(set(card_ids))
+    if ids:
+        psa10 = _rows_at(session, PSA10Price, "card_id", ids)
+        snaps = {s.card_id: s for s in session.query(CardLatest).filter(CardLatest.card_id.in_(list(psa10)))}
+        for card_id, row in psa10.items():
+            snap = snaps.get(card_id)
+            if snap is None:
+                # PSA10 prices but no raw price yet.
+                snap = CardLatest(card_id=card_id, updated=now)
+                session.add(snap)
+                n += 1
+            snap.psa10_low, snap.psa10_ts = row.low, row.ts
+    return n
+
+
+def refresh_product_latest(session, product_ids, now: datetime = None) -> int:
+    """Recompute ``product_latest`` for ``product_ids`` (no commit); returns rows written."""
+    return _refresh(session, ProductLatest, "product_id", Price, PRODUCT_FIELDS, product_ids,
+                    now or datetime.utcnow())
+
+
+def card_snapshot(session, card_id: int):
+    """The stored ``CardLatest`` of a card, or one computed from its prices
+    (not added to the session) when none has been written yet."""
+    snap = session.get(CardLatest, card_id)
+    if snap is None:
+        snaps = {}
+        _refresh(session, CardLatest, "card_id", SingleCardPrice, CARD_FIELDS, [card_id], datetime.utcnow(), snaps)
+        snap = snaps.get(card_id)
+    return snap
+
+
+def card_snapshots(session, card_ids, fill: bool = False):
+    """``{card_id: CardLatest}`` for ``card_ids`` in one query; with ``fill``,
+    cards without a stored snapshot get one computed like ``card_snapshot``."""
+    if not card_ids:
+        return {}
+    snaps = {s.card_id: s for s in session.query(CardLatest).filter(CardLatest.card_id.in_(list(card_ids)))}
+    missing = [cid for cid in card_ids if cid not in snaps]
+    if fill and missing:
+        _refresh(session, CardLatest, "card_id", SingleCardPrice, CARD_FIELDS, missing, datetime.utcnow(), snaps)
+    return snaps
+
+
+def product_snapshots(session, product_ids, fill: bool = False):
+    """``card_snapshots`` for ``ProductLatest``, keyed on product id."""
+    if not product_ids:
+        return {}
+    snaps = {s.product_id: s for s in
+             session.query(ProductLatest).filter(ProductLatest.product_id.in_(list(product_ids)))}
+    missing = [pid for pid in product_ids if pid not in snaps]
+    if fill and missing:
+        _refresh(session, ProductLatest, "product_id", Price, PRODUCT_FIELDS, missing, datetime.utcnow(), snaps)
+    return snaps
+
+
+def _refresh_chunks(session, now, stale_before=None):
+    counts = []
+    for model, snapshot, key, refresh in ((SingleCard, CardLatest, "card_id", refresh_card_latest),
+                                          (Product, ProductLatest, "product_id", refresh_product_latest)):
+        q = session.query(model.id).order_by(model.id)
+        if stale_before is not None:
+            # Ids without a snapshot row yet are stale too; the refresh creates it.
+            q = q.outerjoin(snapshot, getattr(snapshot, key) == model.id).filter(
+                or_(snapshot.updated.is_(None), snapshot.updated < stale_before))
+        ids = [i for (i,) in q]
+        n = 0
+        for start in range(0, len(ids), CHUNK):
+            n += refresh(session, ids[start:start + CHUNK], now)
+            session.commit()
+        counts.append(n)
+    return tuple(counts)
+
+
+def rebuild_all(session, now: datetime = None):
+    """Refresh every card and product snapshot, ``CHUNK`` ids per round (commits)."""
+    return _refresh_chunks(session, now or datetime.utcnow())
+
+
+def refresh_stale(session, max_age: timedelta = STALE_AFTER, now: datetime = None):
+    """Refresh the snapshots not refreshed within ``max_age`` so their as-of
+    lows age, and create missing ones (commits); returns ``(cards, products)``
+    refreshed."""
+    now = now or datetime.utcnow()
+    return _refresh_chunks(session, now, stale_before=now - max_age)
+
+
+def main():
+    with get_db_session() as session:
+        cards, products = rebuild_all(session)
+    print(f"Rebuilt {cards} card and {products} product snapshots")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""add page_archive
+
+Revision ID: 4f1c2a9e7b10
+Revises: cde45cd3a7a1
+Create Date: 2026-10-17 09:12:40.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f1c2a9e7b10'
+down_revision: Union[str, Sequence[str], None] = 'cde45cd3a7a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'page_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('ref_id', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(), nullable=False),
+        sa.Column('ts', sa.DateTime(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('codec', sa.String(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_page_archive_sha256', 'page_archive', ['sha256'], unique=False)
+    op.create_index('ix_page_archive_kind_ref_ts', 'page_archive', ['kind', 'ref_id', 'ts'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_page_archive_kind_ref_ts', table_name='page_archive')
+    op.drop_index('ix_page_archive_sha256', table_name='page_archive')
+    op.drop_table('page_archive')
@@ -0,0 +1,52 @@
+"""offer first_seen/last_seen and offer_events
+
+Revision ID: 9b3e6d1f0c42
+Revises: 4f1c2a9e7b10
+Create Date: 2026-10-17 10:03:15.442871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e6d1f0c42'
+down_revision: Union[str, Sequence[str], None] = '4f1c2a9e7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('single_card_offers') as batch_op:
+        batch_op.add_column(sa.Column('first_seen', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('last_seen', sa.DateTime(), nullable=True))
+    op.execute("UPDATE single_card_offers SET first_seen = ts, last_seen = ts")
+
+    op.create_table(
+        'offer_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('card_id', sa.Integer(), nullable=False),
+        sa.Column('event', sa.String(), nullable=False),
+        sa.Column('seller_name', sa.String(), nullable=False),
+        sa.Column('country', sa.String(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('old_price', sa.Float(), nullable=True),
+        sa.Column('ts', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['card_id'], ['single_cards.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_offer_events_card_id', 'offer_events', ['card_id'], unique=False)
+    op.create_index('ix_offer_events_ts', 'offer_events', ['ts'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_offer_events_ts', table_name='offer_events')
+    op.drop_index('ix_offer_events_card_id', table_name='offer_events')
+    op.drop_table('offer_events')
+    with op.batch_alter_table('single_card_offers') as batch_op:
+        batch_op.drop_column('last_seen')
+        batch_op.drop_column('first_seen')
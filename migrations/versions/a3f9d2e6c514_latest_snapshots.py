@@ -0,0 +1,105 @@
+"""card_latest / product_latest snapshot tables
+
+Revision ID: a3f9d2e6c514
+Revises: e5c81b07a9d2
+Create Date: 2026-10-17 14:05:32.671940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9d2e6c514'
+down_revision: Union[str, Sequence[str], None] = 'e5c81b07a9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _latest_columns():
+    return [
+        sa.Column('ts', sa.DateTime(), nullable=True),
+        sa.Column('low', sa.Float(), nullable=True),
+        sa.Column('avg5', sa.Float(), nullable=True),
+        sa.Column('supply', sa.Integer(), nullable=True),
+    ]
+
+
+def _as_of_columns():
+    return [
+        sa.Column('first_low', sa.Float(), nullable=True),
+        sa.Column('low_24h', sa.Float(), nullable=True),
+        sa.Column('low_7d', sa.Float(), nullable=True),
+        sa.Column('low_30d', sa.Float(), nullable=True),
+        sa.Column('low_90d', sa.Float(), nullable=True),
+        sa.Column('supply_7d', sa.Integer(), nullable=True),
+    ]
+
+
+# Snapshot column -> age of the price it holds (as ``latest_snapshot.AS_OF``).
+AS_OF = (('low_24h', '-24 hours'), ('low_7d', '-7 days'), ('low_30d', '-30 days'), ('low_90d', '-90 days'))
+
+
+def _newest(prices, key, column, where="", order="DESC"):
+    return f"(SELECT p.{column} FROM {prices} p WHERE p.{key} = o.id{where} ORDER BY p.ts {order} LIMIT 1)"
+
+
+def _backfill(snapshot, owners, prices, key, fields, psa10=None):
+    """Snapshot every owner with prices in one INSERT ... SELECT."""
+    columns = {'ts': _newest(prices, key, 'ts')}
+    columns.update((f, _newest(prices, key, f)) for f in fields)
+    columns['first_low'] = _newest(prices, key, 'low', " AND p.low IS NOT NULL", order="ASC")
+    for name, age in AS_OF:
+        columns[name] = _newest(prices, key, 'low', f" AND p.ts <= datetime('now', '{age}')")
+    columns['supply_7d'] = _newest(prices, key, 'supply', " AND p.ts <= datetime('now', '-7 days')")
+    sources = [prices]
+    if psa10:
+        columns['psa10_low'] = _newest(psa10, key, 'low')
+        columns['psa10_ts'] = _newest(psa10, key, 'ts')
+        sources.append(psa10)
+    columns['updated'] = "datetime('now')"
+    has_prices = " OR ".join(f"EXISTS (SELECT 1 FROM {t} p WHERE p.{key} = o.id)" for t in sources)
+    op.execute(
+        f"INSERT INTO {snapshot} ({key}, {', '.join(columns)}) "
+        f"SELECT o.id, {', '.join(columns.values())} FROM {owners} o WHERE {has_prices}"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'card_latest',
+        sa.Column('card_id', sa.Integer(), nullable=False),
+        *_latest_columns(),
+        sa.Column('from_price', sa.Float(), nullable=True),
+        sa.Column('price_trend', sa.Float(), nullable=True),
+        sa.Column('avg7_price', sa.Float(), nullable=True),
+        sa.Column('avg1_price', sa.Float(), nullable=True),
+        *_as_of_columns(),
+        sa.Column('psa10_low', sa.Float(), nullable=True),
+        sa.Column('psa10_ts', sa.DateTime(), nullable=True),
+        sa.Column('updated', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['card_id'], ['single_cards.id']),
+        sa.PrimaryKeyConstraint('card_id'),
+    )
+    op.create_table(
+        'product_latest',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        *_latest_columns(),
+        *_as_of_columns(),
+        sa.Column('updated', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('product_id'),
+    )
+    _backfill('card_latest', 'single_cards', 'single_card_prices', 'card_id',
+              ('low', 'avg5', 'supply', 'from_price', 'price_trend', 'avg7_price', 'avg1_price'),
+              psa10='psa10_prices')
+    _backfill('product_latest', 'products', 'prices', 'product_id', ('low', 'avg5', 'supply'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('product_latest')
+    op.drop_table('card_latest')
@@ -0,0 +1,27 @@
+"""index card_latest.updated for change detection
+
+Revision ID: b8e4f1a27c93
+Revises: a3f9d2e6c514
+Create Date: 2026-10-17 16:22:08.114503
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4f1a27c93'
+down_revision: Union[str, Sequence[str], None] = 'a3f9d2e6c514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_card_latest_updated', 'card_latest', ['updated'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_card_latest_updated', table_name='card_latest')
@@ -0,0 +1,49 @@
+"""daily running totals and (ref_id, ts) price indexes
+
+Revision ID: d7a24c8e5f31
+Revises: 9b3e6d1f0c42
+Create Date: 2026-10-17 11:20:07.508134
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a24c8e5f31'
+down_revision: Union[str, Sequence[str], None] = '9b3e6d1f0c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (daily table, price table, key) pairs whose rollups get running sums.
+ROLLUPS = (('daily', 'prices', 'product_id'), ('single_card_daily', 'single_card_prices', 'card_id'))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_prices_product_ts', 'prices', ['product_id', 'ts'], unique=False)
+    op.create_index('ix_single_card_prices_card_ts', 'single_card_prices', ['card_id', 'ts'], unique=False)
+    for daily, prices, key in ROLLUPS:
+        with op.batch_alter_table(daily) as batch_op:
+            batch_op.add_column(sa.Column('avg_sum', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('avg_n', sa.Integer(), nullable=True))
+        day_prices = (
+            f"FROM {prices} p WHERE p.{key} = {daily}.{key} AND p.low IS NOT NULL "
+            f"AND p.ts >= {daily}.day AND p.ts < date({daily}.day, '+1 day')"
+        )
+        op.execute(
+            f"UPDATE {daily} SET avg_sum = (SELECT coalesce(sum(p.avg5), 0) {day_prices}), "
+            f"avg_n = (SELECT count(p.avg5) {day_prices})"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for daily, _, _ in ROLLUPS:
+        with op.batch_alter_table(daily) as batch_op:
+            batch_op.drop_column('avg_n')
+            batch_op.drop_column('avg_sum')
+    op.drop_index('ix_single_card_prices_card_ts', table_name='single_card_prices')
+    op.drop_index('ix_prices_product_ts', table_name='prices')
@@ -0,0 +1,43 @@
+"""composite covering indexes for per-entity latest/series reads
+
+Revision ID: e5c81b07a9d2
+Revises: d7a24c8e5f31
+Create Date: 2026-10-17 12:41:55.930214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c81b07a9d2'
+down_revision: Union[str, Sequence[str], None] = 'd7a24c8e5f31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('ix_prices_product_ts_cover', 'prices', ['product_id', 'ts', 'low', 'avg5', 'supply']),
+    ('ix_single_card_prices_card_ts_cover', 'single_card_prices', ['card_id', 'ts', 'low', 'avg5', 'supply']),
+    ('ix_psa10_prices_card_ts_cover', 'psa10_prices', ['card_id', 'ts', 'low']),
+    ('ix_daily_product_day_cover', 'daily', ['product_id', 'day', 'low', 'avg']),
+    ('ix_single_card_daily_card_day_cover', 'single_card_daily', ['card_id', 'day', 'low', 'avg']),
+    ('ix_single_card_offers_card_price', 'single_card_offers', ['card_id', 'price']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+    # Prefixes of the covering indexes above.
+    op.drop_index('ix_prices_product_ts', table_name='prices')
+    op.drop_index('ix_single_card_prices_card_ts', table_name='single_card_prices')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_single_card_prices_card_ts', 'single_card_prices', ['card_id', 'ts'], unique=False)
+    op.create_index('ix_prices_product_ts', 'prices', ['product_id', 'ts'], unique=False)
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
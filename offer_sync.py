@@ -0,0 +1,132 @@
+# offer_sync.py
+"""Reconcile a card's stored offers with a fresh scrape.
+
+Instead of deleting and re-inserting every ``SingleCardOffer`` row, offers
+are matched on ``(seller_name, country, price)``:
+
+* identical offers keep their row; only ``last_seen`` moves
+* a seller/country whose price changed is updated in place  -> ``repriced``
+* offers that are gone are deleted                          -> ``delisted``
+* new offers are inserted with ``first_seen``               -> ``listed``
+
+Each change is appended to ``offer_events``; consumers keep the last event
+id they processed and call ``offer_events_since``.
+"""
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, insert, update
+
+from db import OfferEvent, SingleCardOffer
+
+LISTED = "listed"
+DELISTED = "delisted"
+REPRICED = "repriced"
+
+
+def _key(seller, country, price):
+    return seller, country, round(price, 2)
+
+
+def diff_offers(existing, scraped):
+    """Match stored rows against scraped offers.
+
+    ``existing`` items need ``seller_name``, ``country`` and ``price``
+    attributes; ``scraped`` items are parser dicts (``seller``, ``country``,
+    ``price``). Returns ``(unchanged, repriced, delisted, listed)`` where
+    ``repriced`` is a list of ``(row, offer)`` pairs.
+    """
+    stored = defaultdict(list)
+    for row in existing:
+        stored[_key(row.seller_name, row.country, row.price)].append(row)
+
+    unchanged, leftover = [], []
+    for offer in scraped:
+        rows = stored.get(_key(offer["seller"], offer["country"], offer["price"]))
+        if rows:
+            unchanged.append(rows.pop())
+        else:
+            leftover.append(offer)
+
+    # Same seller and country at a different price: a repricing, not a new listing.
+    old_by_seller = defaultdict(list)
+    for rows in stored.values():
+        for row in rows:
+            old_by_seller[(row.seller_name, row.country)].append(row)
+    new_by_seller = defaultdict(list)
+    for offer in leftover:
+        new_by_seller[(offer["seller"], offer["country"])].append(offer)
+
+    repriced, delisted, listed = [], [], []
+    for seller, offers in new_by_seller.items():
+        rows = sorted(old_by_seller.pop(seller, []), key=lambda r: r.price)
+        offers = sorted(offers, key=lambda o: o["price"])
+        repriced.extend(zip(rows, offers))
+        listed.extend(offers[len(rows):])
+        delisted.extend(rows[len(offers):])
+    for rows in old_by_seller.values():
+        delisted.extend(rows)
+    return unchanged, repriced, delisted, listed
+
+
+def reconcile_offers(session, scraped_by_card, record_events: bool = True) -> Counter:
+    """Apply scrapes to ``single_card_offers`` in ``session`` (caller commits).
+
+    ``scraped_by_card`` maps ``card_id`` to ``(ts, offers)``. Returns event
+    counts (plus ``unchanged``).
+    """
+    if not scraped_by_card:
+        return Counter()
+    existing = defaultdict(list)
+    for row in (
+        session.query(SingleCardOffer.id, SingleCardOffer.card_id, SingleCardOffer.seller_name,
+                      SingleCardOffer.country, SingleCardOffer.price)
+        .filter(SingleCardOffer.card_id.in_(list(scraped_by_card)))
+    ):
+        existing[row.card_id].append(row)
+
+    seen, changed, removed, added, events = [], [], [], [], []
+    counts = Counter()
+    for card_id, (ts, offers) in scraped_by_card.items():
+        unchanged, repriced, delisted, listed = diff_offers(existing.get(card_id, []), offers)
+        counts["unchanged"] += len(unchanged)
+        counts[REPRICED] += len(repriced)
+        counts[DELISTED] += len(delisted)
+        counts[LISTED] += len(listed)
+
+        seen.extend({"id": r.id, "last_seen": ts} for r in unchanged)
+        for row, offer in repriced:
+            changed.append({"id": row.id, "price": offer["price"], "ts": ts, "last_seen": ts})
+            events.append({"card_id": card_id, "event": REPRICED, "seller_name": row.seller_name,
+                           "country": row.country, "price": offer["price"], "old_price": row.price, "ts": ts})
+        for row in delisted:
+            removed.append(row.id)
+            events.append({"card_id": card_id, "event": DELISTED, "seller_name": row.seller_name,
+                           "country": row.country, "price": row.price, "old_price": None, "ts": ts})
+        for offer in listed:
+            added.append({"card_id": card_id, "seller_name": offer["seller"], "country": offer["country"],
+                          "price": offer["price"], "ts": ts, "first_seen": ts, "last_seen": ts})
+            events.append({"card_id": card_id, "event": LISTED, "seller_name": offer["seller"],
+                           "country": offer["country"], "price": offer["price"], "old_price": None, "ts": ts})
+
+    if seen:
+        session.execute(update(SingleCardOffer), seen)
+    if changed:
+        session.execute(update(SingleCardOffer), changed)
+    if removed:
+        session.execute(delete(SingleCardOffer).where(SingleCardOffer.id.in_(removed)))
+    if added:
+        session.execute(insert(SingleCardOffer), added)
+    if events and record_events:
+        session.execute(insert(OfferEvent), events)
+    return counts
+
+
+def offer_events_since(session, after_id: int = 0, limit: int = None, card_ids=None):
+    """Events with ``id > after_id`` in order; pass the last id back next time."""
+    q = session.query(OfferEvent).filter(OfferEvent.id > after_id)
+    if card_ids is not None:
+        q = q.filter(OfferEvent.card_id.in_(card_ids))
+    q = q.order_by(OfferEvent.id)
+    if limit:
+        q = q.limit(limit)
+    return q.all()
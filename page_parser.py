@@ -0,0 +1,568 @@
+# page_parser.py
+"""Parse a Cardmarket product page once and read every field from that tree.
+
+The scraper used to hand the raw HTML to each extractor, and every extractor
+built its own ``BeautifulSoup`` tree. ``ParsedPage`` builds the tree once and
+exposes offers, headline summary, supply and PSA10 rows from it. The
+``parse_*`` helpers in ``scraper.py`` accept either a ``ParsedPage`` or raw
+HTML and delegate here.
+
+The tree itself comes from a pluggable backend. BeautifulSoup is the
+reference implementation; ``lxml`` (compiled XPath) and ``selectolax`` (if
+installed) run the same selectors on a C engine and must produce identical
+output; ``tests/test_parser_backends.py`` checks that over the saved corpus.
+"""
+import logging
+import re
+from functools import cached_property
+
+from bs4 import BeautifulSoup
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PRICE_RE = re.compile(r"([\d.,]+)\s*€")
+
+TABLE_SELECTOR = "div.table.article-table.table-striped"
+ROW_SELECTOR = "div.article-row"
+
+
+def _parse_euro(text):
+    """'1.234,50 €' -> 1234.5; None when the text holds no euro amount."""
+    if text is None:
+        return None
+    m = PRICE_RE.search(text)
+    if not m:
+        return None
+    try:
+        return float(m.group(1).replace(".", "").replace(",", "."))
+    except ValueError:
+        return None
+
+
+def _location_country(label):
+    if label and ":" in label:
+        return label.split(":", 1)[1].strip()
+    return None
+
+
+# Row fields every extractor may need, as CSS selectors relative to one
+# ``div.article-row``. This is the reference definition; the lxml backend
+# mirrors each entry with a compiled XPath.
+ROW_SELECTORS = {
+    "offer": ".col-offer .color-primary",
+    "mobile_offer": ".mobile-offer-container .color-primary",
+    "price_container": ".price-container .color-primary",
+    "condition": ".article-condition .badge",
+    "language_icon": (
+        ".product-attributes .icon[data-bs-original-title], .product-attributes .icon[aria-label]"
+    ),
+    "seller_link": ".col-seller a",
+    "seller": ".col-seller",
+    "location": ".col-seller [aria-label^='Item location:']",
+    "icon_location": ".col-seller .icon[aria-label^='Item location']",
+    "comment": ".product-comments",
+}
+
+# Strings BeautifulSoup's ``get_text`` leaves out (it gives them their own
+# string classes); the other backends must skip them too to stay identical.
+NON_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+
+
+class BaseRow:
+    """Lazily extracted fields of one ``div.article-row``.
+
+    Backends implement ``first`` (first match of a ``ROW_SELECTORS`` key, or
+    None), ``text`` and ``attr``.
+    """
+
+    def __init__(self, el):
+        self.el = el
+
+    def first(self, key):
+        raise NotImplementedError
+
+    def text(self, node):
+        raise NotImplementedError
+
+    def attr(self, node, name):
+        raise NotImplementedError
+
+    def _text_of(self, key):
+        node = self.first(key)
+        return self.text(node) if node is not None else None
+
+    @cached_property
+    def offer_text(self):
+        return self._text_of("offer")
+
+    @cached_property
+    def mobile_offer_text(self):
+        return self._text_of("mobile_offer")
+
+    @cached_property
+    def price_container_text(self):
+        return self._text_of("price_container")
+
+    @cached_property
+    def condition(self):
+        return self._text_of("condition")
+
+    @cached_property
+    def language_label(self):
+        icon = self.first("language_icon")
+        if icon is None:
+            return None
+        return self.attr(icon, "data-bs-original-title") or self.attr(icon, "aria-label")
+
+    @cached_property
+    def seller(self):
+        node = self.first("seller_link")
+        if node is None:
+            node = self.first("seller")
+        return self.text(node) if node is not None else None
+
+    @cached_property
+    def location_label(self):
+        node = self.first("location")
+        return self.attr(node, "aria-label") if node is not None else None
+
+    @cached_property
+    def icon_location_label(self):
+        node = self.first("icon_location")
+        return self.attr(node, "aria-label") if node is not None else None
+
+    @cached_property
+    def comment(self):
+        return self._text_of("comment") or ""
+
+
+# --- BeautifulSoup (reference) ---------------------------------------------
+
+class SoupRow(BaseRow):
+    def first(self, key):
+        return self.el.select_one(ROW_SELECTORS[key])
+
+    def text(self, node):
+        return node.get_text(strip=True)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+
+class SoupBackend:
+    """Reference implementation on BeautifulSoup + soupsieve."""
+
+    name = "bs4"
+
+    def __init__(self, html: str):
+        self.soup = BeautifulSoup(html, "lxml")
+
+    def table_rows(self):
+        table = self.soup.select_one(TABLE_SELECTOR)
+        if table is None:
+            return None
+        return [SoupRow(r) for r in table.select(ROW_SELECTOR)]
+
+    def all_rows(self):
+        return [SoupRow(r) for r in self.soup.select(ROW_SELECTOR)]
+
+    def definition(self, matches, separator=""):
+        dt = self.soup.find("dt", string=lambda s: bool(s) and matches(s.strip().lower()))
+        if not dt:
+            return None
+        dd = dt.find_next_sibling("dd")
+        if not dd:
+            return None
+        return dd.get_text(separator, strip=True)
+
+
+# --- lxml.html with compiled XPath -----------------------------------------
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _under(name):
+    # CSS descendant combinator: the ancestor may sit anywhere above the match,
+    # including outside the row (soupsieve behaves the same way).
+    return f"[ancestor::*[{_has_class(name)}]]"
+
+
+def _compile_lxml():
+    from lxml import etree
+
+    first = lambda expr: etree.XPath(f"({expr})[1]")  # noqa: E731
+    row = {
+        "offer": first(f".//*[{_has_class('color-primary')}]{_under('col-offer')}"),
+        "mobile_offer": first(f".//*[{_has_class('color-primary')}]{_under('mobile-offer-container')}"),
+        "price_container": first(f".//*[{_has_class('color-primary')}]{_under('price-container')}"),
+        "condition": first(f".//*[{_has_class('badge')}]{_under('article-condition')}"),
+        "language_icon": first(
+            f".//*[{_has_class('icon')}][@data-bs-original-title or @aria-label]{_under('product-attributes')}"
+        ),
+        "seller_link": first(f".//a{_under('col-seller')}"),
+        "seller": first(f".//*[{_has_class('col-seller')}]"),
+        "location": first(f".//*[starts-with(@aria-label, 'Item location:')]{_under('col-seller')}"),
+        "icon_location": first(
+            f".//*[{_has_class('icon')}][starts-with(@aria-label, 'Item location')]{_under('col-seller')}"
+        ),
+        "comment": first(f".//*[{_has_class('product-comments')}]"),
+    }
+    assert set(row) == set(ROW_SELECTORS)
+    table = first(
+        f"//div[{_has_class('table')}][{_has_class('article-table')}][{_has_class('table-striped')}]"
+    )
+    rows = etree.XPath(f".//div[{_has_class('article-row')}]")
+    return row, table, rows
+
+
+_LXML_XPATH = None
+
+
+def _lxml_xpath():
+    global _LXML_XPATH
+    if _LXML_XPATH is None:
+        _LXML_XPATH = _compile_lxml()
+    return _LXML_XPATH
+
+
+def _lxml_strings(el):
+    """Text nodes under ``el`` in document order, as BeautifulSoup sees them."""
+    if el.text:
+        yield el.text
+    for child in el:
+        # Comments / processing instructions have a non-string tag.
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            yield from _lxml_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _lxml_text(el, separator=""):
+    return separator.join(s for s in (t.strip() for t in _lxml_strings(el)) if s)
+
+
+def _lxml_string(el):
+    """BeautifulSoup's ``Tag.string``: the only child string, recursively."""
+    contents = []
+    if el.text:
+        contents.append(el.text)
+    for child in el:
+        contents.append(child)
+        if child.tail:
+            contents.append(child.tail)
+    if len(contents) != 1:
+        return None
+    only = contents[0]
+    if isinstance(only, str):
+        return only
+    if not isinstance(only.tag, str):
+        return only.text
+    return _lxml_string(only)
+
+
+class LxmlRow(BaseRow):
+    def first(self, key):
+        found = _lxml_xpath()[0][key](self.el)
+        return found[0] if found else None
+
+    def text(self, node):
+        return _lxml_text(node)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+
+class LxmlBackend:
+    """lxml.html tree queried with precompiled XPath."""
+
+    name = "lxml"
+
+    def __init__(self, html: str):
+        from lxml import etree, html as lxml_html
+
+        if html and html.strip():
+            self.root = lxml_html.document_fromstring(html)
+        else:
+            self.root = etree.Element("html")
+
+    def table_rows(self):
+        _, table_xpath, rows_xpath = _lxml_xpath()
+        table = table_xpath(self.root)
+        if not table:
+            return None
+        return [LxmlRow(r) for r in rows_xpath(table[0])]
+
+    def all_rows(self):
+        return [LxmlRow(r) for r in _lxml_xpath()[2](self.root)]
+
+    def definition(self, matches, separator=""):
+        for dt in self.root.iter("dt"):
+            s = _lxml_string(dt)
+            if s and matches(s.strip().lower()):
+                dd = next(dt.itersiblings("dd"), None)
+                if dd is None:
+                    return None
+                return _lxml_text(dd, separator)
+        return None
+
+
+# --- selectolax (lexbor), optional -----------------------------------------
+
+def _lexbor_strings(node):
+    for child in node.iter(include_text=True):
+        if child.is_text_node:
+            yield child.text_content
+        elif child.is_element_node and child.tag not in NON_TEXT_TAGS:
+            yield from _lexbor_strings(child)
+
+
+def _lexbor_text(node, separator=""):
+    return separator.join(s for s in (t.strip() for t in _lexbor_strings(node)) if s)
+
+
+def _lexbor_string(node):
+    contents = list(node.iter(include_text=True))
+    if len(contents) != 1:
+        return None
+    only = contents[0]
+    if only.is_text_node:
+        return only.text_content
+    if only.is_comment_node:
+        return only.comment_content
+    return _lexbor_string(only)
+
+
+class LexborRow(BaseRow):
+    def first(self, key):
+        return self.el.css_first(ROW_SELECTORS[key])
+
+    def text(self, node):
+        return _lexbor_text(node)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+
+class SelectolaxBackend:
+    """selectolax's lexbor engine running the reference CSS selectors."""
+
+    name = "selectolax"
+
+    def __init__(self, html: str):
+        from selectolax.lexbor import LexborHTMLParser
+
+        self.tree = LexborHTMLParser(html or "")
+
+    def table_rows(self):
+        table = self.tree.css_first(TABLE_SELECTOR)
+        if table is None:
+            return None
+        return [LexborRow(r) for r in table.css(ROW_SELECTOR)]
+
+    def all_rows(self):
+        return [LexborRow(r) for r in self.tree.css(ROW_SELECTOR)]
+
+    def definition(self, matches, separator=""):
+        for dt in self.tree.css("dt"):
+            s = _lexbor_string(dt)
+            if s and matches(s.strip().lower()):
+                dd = dt.next
+                while dd is not None and not (dd.is_element_node and dd.tag == "dd"):
+                    dd = dd.next
+                if dd is None:
+                    return None
+                return _lexbor_text(dd, separator)
+        return None
+
+
+BACKENDS = {
+    SoupBackend.name: SoupBackend,
+    LxmlBackend.name: LxmlBackend,
+    SelectolaxBackend.name: SelectolaxBackend,
+}
+
+
+def available_backends():
+    """Backend names whose dependencies import in this environment."""
+    names = [SoupBackend.name, LxmlBackend.name]
+    try:
+        import selectolax.lexbor  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        names.append(SelectolaxBackend.name)
+    return names
+
+
+def resolve_backend(name=None):
+    """Map a configured backend name to a backend class.
+
+    ``auto`` prefers selectolax, then lxml. Unknown or unavailable backends
+    fall back to the BeautifulSoup reference implementation.
+    """
+    name = (name or Config.SCRAPER_PARSER_BACKEND or "auto").lower()
+    available = available_backends()
+    if name == "auto":
+        name = SelectolaxBackend.name if SelectolaxBackend.name in available else LxmlBackend.name
+    if name not in available:
+        logger.warning(f"Parser backend '{name}' is not available; using BeautifulSoup")
+        name = SoupBackend.name
+    return BACKENDS[name]
+
+
+class ParsedPage:
+    """One parsed Cardmarket page.
+
+    Extractor results are cached, so calling ``offers()`` and then
+    ``supply()`` walks the same tree without re-parsing. ``backend`` picks the
+    parser engine (``bs4``, ``lxml``, ``selectolax`` or ``auto``); every
+    backend produces identical results.
+    """
+
+    def __init__(self, html: str, backend=None):
+        self.html = html
+        self.tree = resolve_backend(backend)(html)
+
+    @property
+    def backend(self) -> str:
+        return self.tree.name
+
+    # --- tree access -------------------------------------------------------
+
+    @cached_property
+    def _table_rows(self):
+        return self.tree.table_rows()
+
+    @property
+    def has_table(self) -> bool:
+        return self._table_rows is not None
+
+    @property
+    def table_rows(self):
+        """Rows inside the article table ([] when there is no table)."""
+        return self._table_rows or []
+
+    @cached_property
+    def all_rows(self):
+        """Every article row on the page, table or not."""
+        return self.tree.all_rows()
+
+    def _definition(self, matches, separator=""):
+        """Text of the ``<dd>`` following the first ``<dt>`` whose string
+        satisfies ``matches``; None if either is missing."""
+        return self.tree.definition(matches, separator)
+
+    # --- extractors --------------------------------------------------------
+
+    def supply(self):
+        """Total available items from the ``<dt>Available items</dt>`` entry."""
+        text = self._definition(lambda s: s == "available items")
+        if text is None:
+            return None
+        m = re.search(r"[\d.,]+", text)
+        if not m:
+            return None
+        raw = m.group(0).replace(".", "").replace(",", "")
+        try:
+            return int(raw)
+        except ValueError:
+            return None
+
+    def summary(self):
+        """Headline pricing data (from / trend / 7-day / 1-day averages)."""
+
+        def extract(label):
+            label = label.lower()
+            return _parse_euro(self._definition(lambda s: label in s, " "))
+
+        return {
+            "from_price": extract("from"),
+            "price_trend": extract("price trend"),
+            "avg7": extract("7-day"),
+            "avg1": extract("1-day"),
+        }
+
+    def country_prices(self, country_name: str):
+        """Up to 5 lowest prices from ``country_name``, else from anywhere."""
+        if not self.has_table:
+            return []
+
+        country_matches = []
+        other_matches = []
+        for r in self.table_rows:
+            text = r.offer_text if r.offer_text is not None else r.mobile_offer_text
+            price = _parse_euro(text)
+            if price is None:
+                continue
+            if _location_country(r.location_label) == country_name:
+                country_matches.append(price)
+            else:
+                other_matches.append(price)
+
+        # Prioritize target country, fallback to global cheapest
+        matches = country_matches or other_matches
+        matches.sort()
+        return matches[:5]
+
+    def offers(self, language: str, is_sealed: bool = False, limit: int = 20):
+        """Lowest NM/M offers in ``language`` as seller/price/country dicts."""
+        rows = self.table_rows if self.has_table else self.all_rows
+        lang_norm = language.strip().lower()
+        offers = []
+        for r in rows:
+            if not is_sealed:
+                cond = r.condition.lower() if r.condition is not None else None
+                if cond not in {"nm", "m"}:
+                    continue
+
+            lang_text = r.language_label
+            if not lang_text or lang_norm not in lang_text.lower():
+                continue
+
+            text = r.offer_text if r.offer_text is not None else r.mobile_offer_text
+            price = _parse_euro(text)
+            if price is None:
+                continue
+
+            offers.append({
+                "seller": r.seller if r.seller is not None else "Unknown",
+                "price": price,
+                "country": _location_country(r.icon_location_label),
+            })
+            if len(offers) >= limit:
+                break
+
+        offers.sort(key=lambda x: x["price"])
+        return offers
+
+    def psa10_offers(self):
+        """Offers whose comment mentions PSA 10, in page order."""
+        offers = []
+        for r in self.all_rows:
+            comment = r.comment
+            text_lower = comment.lower()
+            if "psa10" not in text_lower and "psa 10" not in text_lower and "psa-10" not in text_lower:
+                continue
+            text = r.offer_text if r.offer_text is not None else r.price_container_text
+            if text is None:
+                continue
+            try:
+                price = float(text.replace("€", "").replace(".", "").replace(",", ".").strip())
+            except ValueError:
+                continue
+            offers.append({
+                "seller": r.seller if r.seller is not None else "Unknown",
+                "price": price,
+                "comment": comment,
+            })
+        return offers
+
+
+def as_page(html_or_page, backend=None) -> ParsedPage:
+    """Accept raw HTML or an already parsed page."""
+    if isinstance(html_or_page, ParsedPage):
+        return html_or_page
+    return ParsedPage(html_or_page, backend)
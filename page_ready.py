@@ -0,0 +1,56 @@
+# page_ready.py
+"""When is a Cardmarket page ready to scrape?
+
+``networkidle`` waits for every analytics beacon to go quiet. Everything the
+parsers need is in the server-rendered HTML, so the ``selector`` strategy
+navigates to ``domcontentloaded`` and waits for the offers table or the
+"Available items" summary. Only when neither shows up (Cloudflare challenge,
+waiting room, odd layouts) does it fall back to ``networkidle``.
+"""
+import logging
+import time
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("selector", "networkidle")
+
+READY_SELECTOR = 'div.article-table, dt:has-text("Available items")'
+
+
+async def goto_ready(page, url: str, strategy: str = None, timeout_ms: int = 60_000,
+                     ready_timeout_ms: int = None):
+    """Navigate ``page`` to ``url`` and wait until it can be scraped.
+
+    Returns ``(response, outcome, seconds)``; ``outcome`` is ``selector``,
+    ``fallback`` (selector never appeared, waited for networkidle) or
+    ``networkidle`` (strategy forced).
+    """
+    strategy = (strategy or Config.SCRAPER_READY_STRATEGY or "selector").lower()
+    if strategy not in STRATEGIES:
+        logger.warning(f"Unknown readiness strategy '{strategy}', using networkidle")
+        strategy = "networkidle"
+    if ready_timeout_ms is None:
+        ready_timeout_ms = Config.SCRAPER_READY_TIMEOUT_MS
+
+    start = time.monotonic()
+    if strategy == "networkidle":
+        resp = await page.goto(url, wait_until="networkidle", timeout=timeout_ms)
+        return resp, "networkidle", time.monotonic() - start
+
+    resp = await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+    try:
+        await page.wait_for_selector(READY_SELECTOR, state="attached", timeout=ready_timeout_ms)
+        return resp, "selector", time.monotonic() - start
+    except PlaywrightTimeoutError:
+        pass
+
+    remaining = max(1_000, timeout_ms - int((time.monotonic() - start) * 1000))
+    try:
+        await page.wait_for_load_state("networkidle", timeout=remaining)
+    except PlaywrightTimeoutError:
+        logger.warning(f"Page never became ready: {url}")
+    return resp, "fallback", time.monotonic() - start
@@ -0,0 +1,155 @@
+# parse_executor.py
+"""Run HTML parsing off the asyncio event loop.
+
+The scraper hands raw HTML to ``ParseExecutor.run`` together with one of the
+module-level parse functions below; those return plain dicts so they can
+cross a process boundary. Modes:
+
+* ``inline``  - parse in the event loop thread (the 1-core systemd unit)
+* ``thread``  - ``ThreadPoolExecutor``; lxml releases the GIL while parsing
+* ``process`` - ``ProcessPoolExecutor``; uses the extra cores when present.
+                Workers are spawned, not forked: the scraper process already
+                runs the browser loop and writer threads.
+* ``auto``    - ``inline`` on one usable CPU, ``process`` otherwise
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from config import Config
+from page_parser import ParsedPage
+
+logger = logging.getLogger(__name__)
+
+MODES = ("inline", "thread", "process")
+
+
+def parse_single_card_html(html: str, language: str, is_sealed: bool = False,
+                           with_psa10: bool = False, backend=None) -> dict:
+    """Everything the single-card scrape stores, from one parse."""
+    page = ParsedPage(html, backend)
+    parsed = {
+        "offers": page.offers(language, is_sealed=is_sealed),
+        "summary": page.summary(),
+        "supply": page.supply(),
+        "psa10": page.psa10_offers() if with_psa10 else None,
+    }
+    parsed["stats"] = single_card_stats(parsed)
+    return parsed
+
+
+def single_card_stats(parsed: dict):
+    """``SingleCardPrice`` column values for a parsed page, or ``None`` when
+    the page had neither offers nor summary prices."""
+    prices = [o["price"] for o in parsed["offers"]]
+    summary = parsed["summary"]
+    if not (prices or any(v is not None for v in summary.values())):
+        return None
+    # Chart points come from the scraped listings so the low/avg lines match
+    # the table rows shown on the website; avg5 keeps the old top-5 average.
+    top5 = prices[:5]
+    return {
+        "low": min(prices) if prices else None,
+        "avg5": sum(top5) / len(top5) if top5 else None,
+        "n_seen": len(prices) if prices else None,
+        "supply": parsed["supply"],
+        "from_price": summary.get("from_price"),
+        "price_trend": summary.get("price_trend"),
+        "avg7_price": summary.get("avg7"),
+        "avg1_price": summary.get("avg1"),
+    }
+
+
+def parse_sealed_html(html: str, country: str, backend=None) -> dict:
+    """Prices and supply for a sealed product page, from one parse."""
+    page = ParsedPage(html, backend)
+    parsed = {
+        "prices": page.country_prices(country),
+        "supply": page.supply(),
+    }
+    parsed["stats"] = sealed_stats(parsed)
+    return parsed
+
+
+def sealed_stats(parsed: dict):
+    """``Price`` column values for a parsed sealed page, or ``None``."""
+    prices = parsed["prices"]
+    if not prices:
+        return None
+    return {
+        "low": min(prices),
+        "avg5": sum(prices) / len(prices),
+        "n_seen": len(prices),
+        "supply": parsed["supply"],
+    }
+
+
+def available_cpus(cpu_max_path="/sys/fs/cgroup/cpu.max") -> int:
+    """CPUs this process may really use: affinity mask capped by the cgroup
+    quota (systemd ``CPUQuota=`` shows up in ``cpu.max``)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    try:
+        with open(cpu_max_path) as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+
+class ParseExecutor:
+    """Thin wrapper over ``loop.run_in_executor`` with an inline fast path."""
+
+    def __init__(self, mode: str = None, workers: int = None):
+        mode = (mode or Config.SCRAPER_PARSE_EXECUTOR or "auto").lower()
+        cpus = available_cpus()
+        if mode == "auto":
+            mode = "inline" if cpus <= 1 else "process"
+        if mode not in MODES:
+            logger.warning(f"Unknown parse executor mode '{mode}', parsing inline")
+            mode = "inline"
+        # Leave one core for the event loop and the browser.
+        self.workers = workers or Config.SCRAPER_PARSE_WORKERS or max(1, min(cpus - 1, 4))
+        self.mode = mode
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+            logger.info(f"Parse executor: {self.mode} with {self.workers} workers")
+        return self._pool
+
+    async def run(self, fn, *args, **kwargs):
+        """``fn(*args, **kwargs)`` in the configured executor."""
+        if self.mode == "inline":
+            return fn(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(), partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+_executor = None
+
+
+def get_parse_executor() -> ParseExecutor:
+    """Process-wide executor, created on first use and reused across runs."""
+    global _executor
+    if _executor is None:
+        _executor = ParseExecutor()
+    return _executor
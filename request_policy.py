@@ -0,0 +1,195 @@
+# request_policy.py
+"""Allow/deny rules for the sub-requests a scraped page makes.
+
+Rules are checked in order and the first match wins; requests no rule
+matches get ``default``. Each rule may name Playwright resource types
+(``document``, ``script``, ``image``, ``xhr`` ...), a URL regex and/or
+``"third_party": true`` (host outside ``first_party``).
+
+Modes (``Config.SCRAPER_ROUTE_POLICY``):
+
+* ``off``     - nothing is intercepted
+* ``audit``   - nothing is blocked; requests and bytes that *would* have been
+                blocked are counted so the rules can be tuned safely
+* ``enforce`` - denied requests are aborted through ``context.route``
+
+Each scrape run counts its pages and bytes on its own ``new_run()``, so
+overlapping runs do not reset each other's numbers.
+
+The rules can be overridden with a JSON file (``route_policy.json``) of the
+form ``{"default": "allow", "first_party": [...], "rules": [...]}``.
+"""
+import json
+import logging
+import os
+import re
+from collections import Counter
+from urllib.parse import urlparse
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "audit", "enforce")
+
+# Only the document, first-party scripts/XHR (the "Show more results" button
+# is driven by them) and the Cloudflare challenge are needed to scrape a page.
+DEFAULT_RULES = [
+    {"action": "allow", "resource_types": ["document"]},
+    {"action": "allow", "url": r"/cdn-cgi/|challenges\.cloudflare\.com"},
+    {"action": "deny", "resource_types": ["image", "media", "font"]},
+    {"action": "deny", "url": r"google-analytics\.com|googletagmanager\.com|doubleclick\.net|"
+                              r"googlesyndication\.com|facebook\.(net|com)|hotjar\.com|criteo\.|"
+                              r"adservice\.|adnxs\.com|taboola\.com|quantserve\.com|scorecardresearch\.com"},
+    {"action": "deny", "third_party": True},
+]
+DEFAULT_FIRST_PARTY = ["cardmarket.com"]
+
+
+class Rule:
+    def __init__(self, action, resource_types=None, url=None, third_party=None):
+        if action not in ("allow", "deny"):
+            raise ValueError(f"Unknown rule action: {action}")
+        self.action = action
+        self.resource_types = set(resource_types) if resource_types else None
+        self.url = re.compile(url) if url else None
+        self.third_party = third_party
+
+    def matches(self, resource_type, url, third_party) -> bool:
+        if self.resource_types is not None and resource_type not in self.resource_types:
+            return False
+        if self.url is not None and not self.url.search(url):
+            return False
+        if self.third_party is not None and self.third_party != third_party:
+            return False
+        return True
+
+
+class Accounting:
+    """Pages, bytes and blocked requests; ``mode``, ``decide`` and the counters
+    come from the subclass."""
+
+    def record_page(self):
+        self.pages += 1
+
+    def record_bytes(self, request, nbytes: int):
+        """Called from ``fetch_page``'s data counter for every response."""
+        self.bytes_total += nbytes
+        if self.mode == "audit" and self.decide(request.resource_type, request.url) == "deny":
+            self.bytes_denied += nbytes
+
+    def summary(self) -> str:
+        types = ", ".join(f"{t} {n}" for t, n in self.blocked.most_common()) or "none"
+        total_kb = self.bytes_total / 1024
+        per_page = total_kb / self.pages if self.pages else 0.0
+        if self.mode == "audit":
+            pct = self.bytes_denied / self.bytes_total * 100 if self.bytes_total else 0.0
+            return (
+                f"Request policy (audit): {sum(self.blocked.values())} requests would be blocked ({types}); "
+                f"{self.bytes_denied / 1024:.0f} KB of {total_kb:.0f} KB ({pct:.0f}%) would be saved "
+                f"over {self.pages} pages"
+            )
+        return (
+            f"Request policy ({self.mode}): blocked {sum(self.blocked.values())} requests ({types}); "
+            f"downloaded {total_kb:.0f} KB over {self.pages} pages ({per_page:.0f} KB/page)"
+        )
+
+    def log_summary(self):
+        logger.info(self.summary())
+
+
+class RequestPolicy(Accounting):
+    def __init__(self, rules=None, mode="audit", default="allow", first_party=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown request policy mode: {mode}")
+        self.mode = mode
+        self.default = default
+        self.first_party = [h.lower() for h in (first_party or DEFAULT_FIRST_PARTY)]
+        self.rules = [Rule(**r) for r in (DEFAULT_RULES if rules is None else rules)]
+        self.start_run()
+
+    @classmethod
+    def from_config(cls):
+        mode = (Config.SCRAPER_ROUTE_POLICY or "audit").lower()
+        if mode not in MODES:
+            logger.warning(f"Unknown SCRAPER_ROUTE_POLICY '{mode}', using audit")
+            mode = "audit"
+        path = Config.SCRAPER_ROUTE_POLICY_FILE
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                return cls(
+                    rules=data.get("rules"),
+                    mode=mode,
+                    default=data.get("default", "allow"),
+                    first_party=data.get("first_party"),
+                )
+            except Exception as e:
+                logger.error(f"Failed to load request policy {path}: {e}")
+        return cls(mode=mode)
+
+    def is_third_party(self, url) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        return not any(host == fp or host.endswith("." + fp) for fp in self.first_party)
+
+    def decide(self, resource_type, url) -> str:
+        third_party = self.is_third_party(url)
+        for rule in self.rules:
+            if rule.matches(resource_type, url, third_party):
+                return rule.action
+        return self.default
+
+    # --- Playwright wiring -------------------------------------------------
+
+    async def install(self, context):
+        """Attach the policy to a browser context (every page it opens)."""
+        if self.mode == "enforce":
+            await context.route("**/*", self._route)
+        elif self.mode == "audit":
+            context.on("request", self._observe)
+
+    async def _route(self, route, request):
+        if self.decide(request.resource_type, request.url) == "deny":
+            self.blocked[request.resource_type] += 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    def _observe(self, request):
+        if self.decide(request.resource_type, request.url) == "deny":
+            self.blocked[request.resource_type] += 1
+
+    # --- per-run accounting ------------------------------------------------
+
+    def start_run(self):
+        self.blocked = Counter()
+        self.pages = 0
+        self.bytes_total = 0
+        self.bytes_denied = 0
+
+    def new_run(self) -> "PolicyRun":
+        """Accounting for one scrape run; the policy's own is left alone."""
+        return PolicyRun(self)
+
+
+class PolicyRun(Accounting):
+    """One scrape run's pages and bytes under a policy.
+
+    Requests are intercepted context-wide, so ``blocked`` is what the policy
+    blocked since the run started; runs sharing the context see each
+    other's.
+    """
+
+    def __init__(self, policy: RequestPolicy):
+        self.policy = policy
+        self.mode = policy.mode
+        self.decide = policy.decide
+        self._blocked_at = Counter(policy.blocked)
+        self.pages = 0
+        self.bytes_total = 0
+        self.bytes_denied = 0
+
+    @property
+    def blocked(self) -> Counter:
+        return self.policy.blocked - self._blocked_at
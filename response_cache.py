@@ -0,0 +1,210 @@
+# response_cache.py
+"""ETags and a rendered-body LRU for the read-mostly pages and APIs.
+
+A cached view names a version function; the ETag hashes that version with
+the request URL and the headers the body depends on. ``If-None-Match`` is
+answered with 304 right after the version lookup, and a matching body is
+served from memory, so the view's own queries only run when something
+changed. Versions are cheap:
+
+* ``generation`` counts committed writes in this process (the scheduler's
+  scrapes, edits from the UI) and is bumped by session events;
+* ``card_version`` / ``product_version`` add the ``updated`` stamp of the
+  entity's latest-snapshot row, one primary-key read, which the scrape
+  writer refreshes with every batch (so a scraper running in another
+  process is seen too); ``latest_version`` takes the newest stamp overall.
+  Lists also depend on card edits that other processes commit and on the
+  clock (30-day sparklines), so it adds the count and highest id of the
+  cards and a ``RESPONSE_CACHE_TTL_S`` time bucket;
+* price series read the price and daily tables directly, so their version
+  adds the newest price timestamp (cards without a snapshot yet) and the
+  count, last day and sums of the daily rows (``backfill_daily.py`` rewrites
+  them from another process).
+
+Responses carry ``Cache-Control: no-cache``: browsers keep the body and
+revalidate every time, which costs a 304.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, request, session as flask_session
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from config import Config
+from db import (
+    CardLatest,
+    Daily,
+    Price,
+    ProductLatest,
+    SingleCard,
+    SingleCardDaily,
+    SingleCardPrice,
+    get_db_session,
+)
+
+CACHE_CONTROL = "no-cache"
+_RECOMPUTED = {"Content-Length", "ETag", "Cache-Control"}  # set again on every response
+
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def generation() -> int:
+    """Committed writes so far in this process."""
+    return _generation
+
+
+def bump_generation():
+    global _generation
+    with _generation_lock:
+        _generation += 1
+
+
+@event.listens_for(Session, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _executed(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    if session.info.pop("wrote", False):
+        bump_generation()
+
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back(session):
+    session.info.pop("wrote", None)
+
+
+def card_version(session, cid, **_):
+    return generation(), session.execute(select(CardLatest.updated).where(CardLatest.card_id == cid)).scalar()
+
+
+def product_version(session, pid, **_):
+    return generation(), session.execute(
+        select(ProductLatest.updated).where(ProductLatest.product_id == pid)).scalar()
+
+
+def _series_version(session, snapshot, price_model, daily_model, key, ref):
+    def of(model):
+        return getattr(model, key) == ref
+
+    daily = (select(func.count(), func.max(daily_model.day), func.sum(daily_model.low), func.sum(daily_model.avg))
+             .where(of(daily_model)).subquery())
+    return tuple(session.execute(select(
+        select(snapshot.updated).where(of(snapshot)).scalar_subquery(),
+        select(func.max(price_model.ts)).where(of(price_model)).scalar_subquery(),
+        daily,
+    )).one())
+
+
+def card_series_version(session, cid, **_):
+    """Price series only change when the card is scraped or its daily rows
+    are rebuilt."""
+    return _series_version(session, CardLatest, SingleCardPrice, SingleCardDaily, "card_id", cid)
+
+
+def product_series_version(session, pid, **_):
+    return _series_version(session, ProductLatest, Price, Daily, "product_id", pid)
+
+
+def latest_version(session, **_):
+    cards = session.execute(select(func.count(SingleCard.id), func.max(SingleCard.id))).one()
+    return (generation(), session.execute(select(func.max(CardLatest.updated))).scalar(),
+            session.execute(select(func.max(ProductLatest.updated))).scalar(), tuple(cards),
+            int(time.time() // max(Config.RESPONSE_CACHE_TTL_S, 1)))
+
+
+class ResponseCache:
+    """LRU of rendered bodies by ETag, bounded to ``max_bytes`` of body."""
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = Config.RESPONSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.not_modified = self.misses = 0
+
+    def get(self, etag):
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+                self.hits += 1
+            return entry
+
+    def put(self, etag, body, status, headers):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(etag, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[etag] = (body, status, headers)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                    "not_modified": self.not_modified, "misses": self.misses}
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
+def _etag(version):
+    key = "\0".join((request.full_path, request.headers.get("Accept", ""),
+                     request.headers.get("Accept-Encoding", ""), repr(version)))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def cached_response(version, cache: ResponseCache = None):
+    """Decorator for a GET view: ``version(session, **view_args)`` is the
+    data version of the response. Only 200 responses are stored; a request
+    with flashed messages waiting skips the cache (pages render them)."""
+    def decorate(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            store = RESPONSE_CACHE if cache is None else cache
+            if "_flashes" in flask_session:
+                return view(**kwargs)
+            with get_db_session() as s:
+                etag = _etag(version(s, **kwargs))
+            if etag in request.if_none_match:
+                store.not_modified += 1
+                resp = make_response("", 304)
+            else:
+                entry = store.get(etag)
+                if entry is not None:
+                    body, status, headers = entry
+                    resp = make_response(body, status, headers)
+                else:
+                    store.misses += 1
+                    resp = make_response(view(**kwargs))
+                    if resp.status_code != 200 or resp.is_streamed:
+                        return resp
+                    headers = [(k, v) for k, v in resp.headers.items() if k not in _RECOMPUTED]
+                    store.put(etag, resp.get_data(), resp.status_code, headers)
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = CACHE_CONTROL
+            return resp
+        return wrapper
+    return decorate
@@ -0,0 +1,275 @@
+# scrape_metrics.py
+"""Per-run measurements of the scraper that are cheap enough for the hot path.
+
+``UsageMeter`` counts downloaded bytes per URL class (resource type + host)
+without ever pulling a response body across the Playwright driver pipe:
+
+* a ``Content-Length`` header is read straight off the ``response`` event
+* anything else is measured with ``request.sizes()`` once the request has
+  finished (``sizes`` mode), for one in ``sample_every`` of them scaled back
+  up (``sampled`` mode), or not at all (``headers`` mode)
+
+``Histogram`` buckets per-page durations such as time-to-ready.
+``FetchStats`` compares fetch modes (browser / http) by pages/sec and CPU
+per page. Scrape runs count this process only; ``benchmarks/bench_fetch.py``
+passes ``process_tree_cpu`` to include Firefox, which walks ``/proc`` and is
+too slow for every fetch.
+"""
+import logging
+import os
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+USAGE_MODES = ("sizes", "sampled", "headers", "off")
+
+
+def url_class(request) -> str:
+    host = urlparse(request.url).hostname or "-"
+    return f"{request.resource_type} {host}"
+
+
+def _fmt_bytes(n: float) -> str:
+    if n >= 1024 * 1024:
+        return f"{n / (1024 * 1024):.1f} MB"
+    return f"{n / 1024:.0f} KB"
+
+
+class PageUsage:
+    """Response listeners for one ``fetch_page`` call."""
+
+    def __init__(self, meter, on_bytes=None):
+        self.meter = meter
+        self.on_bytes = on_bytes
+        self.bytes = 0
+        self._counted = set()
+
+    def _add(self, request, nbytes):
+        self.bytes += nbytes
+        self.meter.record(request, nbytes)
+        if self.on_bytes is not None:
+            self.on_bytes(request, nbytes)
+
+    def on_response(self, response):
+        try:
+            length = int(response.headers.get("content-length") or 0)
+        except (TypeError, ValueError):
+            length = 0
+        if length > 0:
+            self._counted.add(response.request)
+            self._add(response.request, length)
+
+    async def on_finished(self, request):
+        if request in self._counted:
+            self._counted.discard(request)
+            return
+        scale = self.meter.sample_scale()
+        if not scale:
+            return
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self._add(request, sizes.get("responseBodySize", 0) * scale)
+
+    def attach(self, page):
+        if self.meter.mode == "off":
+            return
+        page.on("response", self.on_response)
+        if self.meter.mode != "headers":
+            page.on("requestfinished", self.on_finished)
+
+    def detach(self, page):
+        if self.meter.mode == "off":
+            return
+        page.remove_listener("response", self.on_response)
+        if self.meter.mode != "headers":
+            page.remove_listener("requestfinished", self.on_finished)
+
+
+class UsageMeter:
+    """Bytes per URL class for one scrape run."""
+
+    def __init__(self, mode: str = None, sample_every: int = None):
+        mode = (mode or Config.SCRAPER_USAGE_ACCOUNTING or "sizes").lower()
+        if mode not in USAGE_MODES:
+            logger.warning(f"Unknown usage accounting mode '{mode}', using sizes")
+            mode = "sizes"
+        self.mode = mode
+        self.sample_every = max(1, sample_every or Config.SCRAPER_USAGE_SAMPLE_EVERY)
+        self.start_run()
+
+    def start_run(self):
+        self.classes = defaultdict(lambda: [0, 0])  # class -> [bytes, requests]
+        self.pages = 0
+        self._unmeasured = 0
+
+    def sample_scale(self) -> int:
+        """How many requests the next ``sizes()`` call stands for (0 = skip it)."""
+        if self.mode == "sizes":
+            return 1
+        if self.mode == "sampled":
+            self._unmeasured += 1
+            if self._unmeasured % self.sample_every == 0:
+                return self.sample_every
+        return 0
+
+    def page(self, on_bytes=None) -> PageUsage:
+        self.pages += 1
+        return PageUsage(self, on_bytes)
+
+    def record(self, request, nbytes: int):
+        entry = self.classes[url_class(request)]
+        entry[0] += nbytes
+        entry[1] += 1
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(b for b, _ in self.classes.values())
+
+    def report(self, name: str, top: int = 8) -> str:
+        total = self.total_bytes
+        per_page = total / self.pages if self.pages else 0
+        lines = [
+            f"{name} data usage ({self.mode}): {_fmt_bytes(total)} over {self.pages} pages "
+            f"({_fmt_bytes(per_page)}/page)"
+        ]
+        ranked = sorted(self.classes.items(), key=lambda kv: kv[1][0], reverse=True)
+        for cls, (nbytes, count) in ranked[:top]:
+            share = nbytes / total * 100 if total else 0.0
+            lines.append(f"  {cls:<45} {_fmt_bytes(nbytes):>9} {share:5.1f}% {count:6d} req")
+        if len(ranked) > top:
+            rest = sum(b for _, (b, _) in ranked[top:])
+            lines.append(f"  {f'({len(ranked) - top} more classes)':<45} {_fmt_bytes(rest):>9}")
+        return "\n".join(lines)
+
+    def log_report(self, name: str):
+        logger.info(self.report(name))
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations (seconds), split by outcome label."""
+
+    BUCKETS = (0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+
+    def __init__(self, name: str, buckets=None):
+        self.name = name
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self.start_run()
+
+    def start_run(self):
+        self.samples = []
+        self.labels = defaultdict(int)
+
+    def observe(self, seconds: float, label: str = None):
+        self.samples.append(seconds)
+        if label:
+            self.labels[label] += 1
+
+    def counts(self):
+        """Samples per bucket; the last entry is the overflow above the top bucket."""
+        counts = [0] * (len(self.buckets) + 1)
+        for s in self.samples:
+            for i, upper in enumerate(self.buckets):
+                if s <= upper:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    def report(self) -> str:
+        n = len(self.samples)
+        labels = ", ".join(f"{k} {v}" for k, v in sorted(self.labels.items())) or "-"
+        lines = [
+            f"{self.name}: n={n} p50={self.percentile(50):.2f}s p90={self.percentile(90):.2f}s "
+            f"max={max(self.samples, default=0):.2f}s ({labels})"
+        ]
+        if n:
+            counts = self.counts()
+            width = max(counts)
+            bounds = [f"<={b}s" for b in self.buckets] + [f">{self.buckets[-1]}s"]
+            for bound, count in zip(bounds, counts):
+                if count:
+                    bar = "#" * max(1, round(count / width * 30))
+                    lines.append(f"  {bound:>7} {count:5d} {bar}")
+        return "\n".join(lines)
+
+    def log_report(self):
+        logger.info(self.report())
+
+
+def process_tree_cpu() -> float:
+    """CPU seconds used by this process and all its descendants.
+
+    Reads ``/proc`` so the Playwright driver and Firefox content processes are
+    included; elsewhere only this process is counted.
+    """
+    try:
+        tick = os.sysconf("SC_CLK_TCK")
+        children = defaultdict(list)
+        cpu = {}
+        for pid in os.listdir("/proc"):
+            if not pid.isdigit():
+                continue
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            # After the comm field: [0] state, [1] ppid, [11] utime, [12] stime
+            children[int(fields[1])].append(int(pid))
+            cpu[int(pid)] = (int(fields[11]) + int(fields[12])) / tick
+        total, stack = 0.0, [os.getpid()]
+        while stack:
+            pid = stack.pop()
+            total += cpu.get(pid, 0.0)
+            stack.extend(children.get(pid, ()))
+        return total
+    except (OSError, ValueError, IndexError):
+        return time.process_time()
+
+
+class FetchStats:
+    """Pages, wall time and CPU time per fetch mode for one run."""
+
+    def __init__(self, cpu_clock=time.process_time):
+        self.cpu_clock = cpu_clock
+        self.start_run()
+
+    def start_run(self):
+        self.modes = defaultdict(lambda: [0, 0.0, 0.0])  # mode -> [pages, wall, cpu]
+
+    def start(self):
+        return time.monotonic(), self.cpu_clock()
+
+    def record(self, mode: str, started):
+        wall0, cpu0 = started
+        entry = self.modes[mode]
+        entry[0] += 1
+        entry[1] += time.monotonic() - wall0
+        entry[2] += self.cpu_clock() - cpu0
+
+    def report(self, name: str) -> str:
+        lines = [f"{name} fetch modes:"]
+        for mode, (pages, wall, cpu) in sorted(self.modes.items()):
+            rate = pages / wall if wall > 0 else 0.0
+            lines.append(
+                f"  {mode:<8} {pages:5d} pages {rate:6.2f} pages/s {cpu / pages if pages else 0:6.2f} s CPU/page"
+            )
+        if len(lines) == 1:
+            lines.append("  none")
+        return "\n".join(lines)
+
+    def log_report(self, name: str):
+        logger.info(self.report(name))
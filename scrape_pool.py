@@ -0,0 +1,218 @@
+# scrape_pool.py
+"""Bounded concurrency for the scraper: page pool, per-host rate limiting and
+per-run throughput stats.
+
+Nothing in here holds an ``asyncio.Lock``/``Queue`` across runs, so the same
+limiter instance can be reused by every ``asyncio.run`` the scheduler makes.
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Returned by a ``run_workers`` handler for items it skipped without touching
+# the network; the worker moves straight on instead of pacing.
+SKIPPED = "skipped"
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate_per_min`` tokens per minute, ``burst`` max.
+
+    ``acquire`` reserves a token synchronously (no await between reading and
+    updating the bucket), so concurrent callers queue up behind each other
+    without needing a lock.
+    """
+
+    def __init__(self, rate_per_min: float, burst: int = 1):
+        self.rate = max(rate_per_min, 0.001) / 60.0  # tokens per second
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+
+    def _reserve(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    async def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """One ``TokenBucket`` per host name."""
+
+    def __init__(self, rate_per_min: float, burst: int = 1):
+        self.rate_per_min = rate_per_min
+        self.burst = burst
+        self._buckets = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc or url
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate_per_min, self.burst)
+        return bucket
+
+    async def acquire(self, url: str):
+        return await self.bucket(url).acquire()
+
+
+class PagePool:
+    """Hands out at most ``size`` Playwright pages from a single context.
+
+    Pages are created lazily and reused by the next worker instead of opening a
+    fresh tab per card.
+    """
+
+    def __init__(self, context, size: int):
+        self.context = context
+        self.size = max(size, 1)
+        self._idle = []
+        self._created = 0
+        self._waiters = []
+
+    @asynccontextmanager
+    async def page(self):
+        page = await self._checkout()
+        try:
+            yield page
+        except BaseException:
+            # A page that blew up (or was cancelled) mid-navigation may be in
+            # any state; replace it.
+            await self._discard(page)
+            raise
+        else:
+            self._checkin(page)
+
+    async def _checkout(self):
+        while True:
+            if self._idle:
+                page = self._idle.pop()
+                if not page.is_closed():
+                    return page
+                self._created -= 1
+                continue
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return await self.context.new_page()
+                except BaseException:
+                    self._created -= 1
+                    raise
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            await fut
+
+    def _wake_one(self):
+        while self._waiters:
+            fut = self._waiters.pop(0)
+            if not fut.done():
+                fut.set_result(None)
+                return
+
+    def _checkin(self, page):
+        self._idle.append(page)
+        self._wake_one()
+
+    async def _discard(self, page):
+        self._created -= 1
+        try:
+            await page.close()
+        except Exception:
+            pass
+        self._wake_one()
+
+    async def close(self):
+        for page in self._idle:
+            try:
+                await page.close()
+            except Exception:
+                pass
+        self._idle.clear()
+        self._created = 0
+
+
+class RunStats:
+    """Counters for one scrape run, reported as items/hour at the end."""
+
+    def __init__(self, name: str, total: int, workers: int = 1):
+        self.name = name
+        self.total = total
+        self.workers = workers
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+
+    def record(self, ok: bool):
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+
+    def skip(self):
+        self.skipped += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def per_hour(self) -> float:
+        processed = self.done + self.failed
+        if not processed or self.elapsed <= 0:
+            return 0.0
+        return processed / self.elapsed * 3600.0
+
+    def summary(self) -> str:
+        minutes, seconds = divmod(int(self.elapsed), 60)
+        hours, minutes = divmod(minutes, 60)
+        return (
+            f"{self.name} run: {self.done} ok, {self.failed} failed, {self.skipped} skipped "
+            f"of {self.total} in {hours}:{minutes:02d}:{seconds:02d} "
+            f"({self.per_hour():.1f}/hour, {self.workers} workers)"
+        )
+
+    def log_summary(self):
+        logger.info(self.summary())
+
+
+async def run_workers(items, handler, workers: int, jitter=(20, 25)):
+    """Run ``await handler(worker_id, index, item)`` over ``items`` with
+    ``workers`` concurrent workers.
+
+    ``index`` is 1-based, matching the ``[i/total]`` log prefix. After each
+    item a worker sleeps for the rest of its own ``jitter`` window (measured
+    from when it started the item), so pacing is per worker rather than a
+    global sleep between every card. Handlers return ``SKIPPED`` for items
+    that never hit the network.
+    """
+    pending = list(enumerate(items, 1))
+    pending.reverse()
+
+    async def worker(worker_id: int):
+        while pending:
+            index, item = pending.pop()
+            start = time.monotonic()
+            result = None
+            try:
+                result = await handler(worker_id, index, item)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed on item {index}: {e}")
+            finally:
+                if jitter and pending and result != SKIPPED:
+                    remain = random.uniform(*jitter) - (time.monotonic() - start)
+                    if remain > 0:
+                        await asyncio.sleep(remain)
+
+    await asyncio.gather(*(worker(w) for w in range(1, max(workers, 1) + 1)))
@@ -0,0 +1,176 @@
+# scrape_writer.py
+"""Batched database writes for scrape results.
+
+Workers ``put`` one result dict per page and move on; a single writer task
+collects them and flushes a batch when it holds ``batch_size`` results or its
+oldest result is ``flush_interval`` seconds old. A flush is one transaction
+(run in a thread so fetching continues): bulk inserts for prices, PSA10
+rows and archive index rows, one offer reconciliation (``offer_sync``), running-total daily updates and
+a ``latest_snapshot`` refresh for the whole batch. A crash loses at most the
+batch that was still collecting. A batch that fails to write is retried
+once result by result, so a transient error or one bad result does not
+drop the others; what still fails is counted in ``lost`` and in the run's
+``RunProgress``.
+
+Result dicts:
+
+* ``{"kind": "single", "card_id", "ts", "stats", "offers", "psa10", "archive"}``
+* ``{"kind": "sealed", "product_id", "ts", "stats", "archive"}``
+* ``{"kind": "archive", "archive"}`` for pages that yielded no prices
+
+``stats`` holds the price-row columns, ``psa10`` is ``None`` for cards that
+are not tracked for PSA10, ``archive`` a ``page_archive`` row mapping or
+``None``.
+"""
+import asyncio
+import logging
+import time
+
+from sqlalchemy import delete, insert
+
+from config import Config
+from db import (
+    get_db_session,
+    PageArchive,
+    Price,
+    PSA10Offer,
+    PSA10Price,
+    SingleCardPrice,
+    add_daily_prices,
+    add_single_daily_prices,
+)
+from latest_snapshot import refresh_card_latest, refresh_product_latest
+from offer_sync import reconcile_offers
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def write_batch(session, batch):
+    """Write ``batch`` in ``session``'s transaction (caller commits)."""
+    singles = [r for r in batch if r["kind"] == "single"]
+    sealed = [r for r in batch if r["kind"] == "sealed"]
+
+    if singles:
+        prices = [{"card_id": r["card_id"], "ts": r["ts"], **r["stats"]} for r in singles]
+        session.execute(insert(SingleCardPrice), prices)
+        # Offers are reconciled against the newest page of each card.
+        latest = list({r["card_id"]: r for r in singles}.values())
+        reconcile_offers(session, {r["card_id"]: (r["ts"], r["offers"]) for r in latest})
+
+        # PSA10 offers are only replaced when the page had some.
+        psa10 = [r for r in latest if r.get("psa10")]
+        if psa10:
+            session.execute(delete(PSA10Offer).where(PSA10Offer.card_id.in_([r["card_id"] for r in psa10])))
+            session.execute(insert(PSA10Offer), [
+                {"card_id": r["card_id"], "seller_name": o["seller"], "price": o["price"],
+                 "comment": o["comment"], "ts": r["ts"]}
+                for r in psa10 for o in r["psa10"]
+            ])
+            session.execute(insert(PSA10Price), [
+                {"card_id": r["card_id"], "ts": r["ts"], "low": min(o["price"] for o in r["psa10"])}
+                for r in psa10
+            ])
+        add_single_daily_prices(session, prices)
+        refresh_card_latest(session, [r["card_id"] for r in singles])
+
+    if sealed:
+        prices = [{"product_id": r["product_id"], "ts": r["ts"], **r["stats"]} for r in sealed]
+        session.execute(insert(Price), prices)
+        add_daily_prices(session, prices)
+        refresh_product_latest(session, [r["product_id"] for r in sealed])
+
+    archive = [r["archive"] for r in batch if r.get("archive")]
+    if archive:
+        session.execute(insert(PageArchive), archive)
+
+
+class ScrapeWriter:
+    """Queue + writer task; use as ``async with ScrapeWriter() as writer``."""
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None, session_factory=get_db_session,
+                 progress=None, retry_delay: float = 1.0):
+        self.batch_size = max(1, batch_size or Config.SCRAPER_WRITE_BATCH)
+        self.flush_interval = Config.SCRAPER_WRITE_INTERVAL_S if flush_interval is None else flush_interval
+        self.session_factory = session_factory
+        self.progress = progress  # RunProgress that counts lost results
+        self.retry_delay = retry_delay
+        self.flushes = 0
+        self.written = 0
+        self.lost = 0
+        self._queue = None
+        self._task = None
+
+    async def __aenter__(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def put(self, result: dict):
+        """Queue one result; never blocks the caller."""
+        if self._queue is None:
+            raise RuntimeError("ScrapeWriter used outside 'async with'")
+        self._queue.put_nowait(result)
+
+    async def close(self):
+        """Flush whatever is pending and stop the writer task."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"Scrape writer: {self.written} results in {self.flushes} batches"
+                    + (f", {self.lost} lost" if self.lost else ""))
+
+    async def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if not batch else max(0.0, deadline - time.monotonic())
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+            if batch and (item is None or len(batch) >= self.batch_size):
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+
+    def _write(self, batch):
+        with self.session_factory() as session:
+            write_batch(session, batch)
+            session.commit()
+
+    async def _flush(self, batch):
+        try:
+            await asyncio.to_thread(self._write, batch)
+            self.flushes += 1
+            self.written += len(batch)
+            return
+        except Exception as e:
+            logger.warning(f"Failed to write batch of {len(batch)} scrape results, retrying one by one: {e}")
+        await asyncio.sleep(self.retry_delay)
+        lost = 0
+        for result in batch:
+            try:
+                await asyncio.to_thread(self._write, [result])
+                self.written += 1
+            except Exception as e:
+                lost += 1
+                logger.error(f"Failed to write {result['kind']} scrape result: {e}")
+        self.flushes += 1
+        if lost:
+            self.lost += lost
+            if self.progress is not None:
+                self.progress.lose(lost)
@@ -1,344 +1,188 @@
 # scraper.py
-import asyncio, re, time, random
+import asyncio, time, random
 from datetime import datetime, timedelta
 
 from apscheduler.schedulers.background import BackgroundScheduler
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
 from db import (
     get_db_session,
     Product,
     Price,
     SingleCard,
     SingleCardPrice,
-    SingleCardOffer,
-    upsert_daily,
-    upsert_single_daily,
-    PSA10Price,
-    PSA10Offer,
 )
 from sqlalchemy import func
-from cookie_loader import parse_netscape_cookies
 from blocklist_manager import is_blocked
+from config import Config
+from page_parser import as_page
+from parse_executor import get_parse_executor, parse_single_card_html, parse_sealed_html
+from scrape_pool import HostRateLimiter, PagePool, RunStats, run_workers, SKIPPED
+from request_policy import RequestPolicy
+from scrape_metrics import UsageMeter, Histogram, FetchStats
+from page_ready import goto_ready
+from browser_manager import BrowserManager
+import http_fetcher
+from html_archive import HtmlArchive
+from latest_snapshot import refresh_stale
+from scrape_writer import ScrapeWriter
+from scraper_status import STATUS as SCRAPER_STATUS
+import atexit
 import logging
-import json
-import os
 
 logger = logging.getLogger(__name__)
 
-STATUS_FILE = "scraper_status.json"
+# Shared by every fetch so concurrent workers never exceed the per-host budget.
+HOST_LIMITER = HostRateLimiter(Config.SCRAPER_HOST_RATE_PER_MIN)
+# Images/fonts/trackers routing, installed on every browser context.
+ROUTE_POLICY = RequestPolicy.from_config()
+# Warm browser/context reused by every run; scrape coroutines run on its loop.
+BROWSER = BrowserManager(setup=ROUTE_POLICY.install)
+atexit.register(BROWSER.close)
+
+
+class ScrapeRun:
+    """Measurements of one scrape run, reported when it ends.
+
+    Every run gets its own, so a scrape started from the UI next to the
+    scheduled one neither resets nor mixes into the other's numbers.
+    """
+
+    def __init__(self, name: str = "Fetch"):
+        self.name = name
+        # Bytes per URL class and per policy decision.
+        self.usage = UsageMeter()
+        self.policy = ROUTE_POLICY.new_run()
+        # Seconds from navigation start until the page could be scraped.
+        self.ready_times = Histogram("Time to ready")
+        # Pages/sec and CPU per page for each fetch mode.
+        self.fetch_stats = FetchStats()
+
+    def log_report(self):
+        self.fetch_stats.log_report(self.name)
+        self.usage.log_report(self.name)
+        self.ready_times.log_report()
+        self.policy.log_summary()
+
+
+def _make_http_fetcher():
+    if (Config.SCRAPER_FETCH_MODE or "browser").lower() != "http":
+        return None
+    if not http_fetcher.available():
+        logger.warning("SCRAPER_FETCH_MODE=http needs httpx; fetching with the browser")
+        return None
+    return http_fetcher.HttpFetcher(http2=Config.SCRAPER_HTTP2)
 
-def update_scraper_status(status: str, message: str):
-    """Update the scraper status file."""
-    try:
-        data = {
-            "status": status,
-            "message": message,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        # Write mostly atomic
-        temp_file = STATUS_FILE + ".tmp"
-        with open(temp_file, "w") as f:
-            json.dump(data, f)
-        os.rename(temp_file, STATUS_FILE)
-    except Exception as e:
-        logger.error(f"Failed to update scraper status: {e}")
 
+HTTP_FETCHER = _make_http_fetcher()
+# Raw pages kept for offline re-parsing (html_archive.py replay).
+ARCHIVE = HtmlArchive() if Config.HTML_ARCHIVE_ENABLED else None
+
+def update_scraper_status(status: str, message: str):
+    """Update the scraper status (written out only when it changes)."""
+    SCRAPER_STATUS.set(status, message)
 
-PRICE_RE = re.compile(r"([\d.,]+)\s*€")
 
-def parse_supply(html: str):
-    """Extract total available items from page HTML.
+def parse_supply(html):
+    """Extract total available items from page HTML (or a ``ParsedPage``).
 
     The Cardmarket detail page presents this as a definition list with a
     ``<dt>Available items</dt>`` followed by a ``<dd>`` containing the number.
     Parsing the DOM structure is more reliable than searching for the phrase
     "X available items" which may not exist when the count is zero.
     """
-    soup = BeautifulSoup(html, "lxml")
-    dt = soup.find("dt", string=lambda s: s and s.strip().lower() == "available items")
-    if not dt:
-        return None
-    dd = dt.find_next_sibling("dd")
-    if not dd:
-        return None
-    text = dd.get_text(strip=True)
-    m = re.search(r"[\d.,]+", text)
-    if not m:
-        return None
-    raw = m.group(0).replace(".", "").replace(",", "")
-    try:
-        return int(raw)
-    except ValueError:
-        return None
+    return as_page(html).supply()
 
-def parse_prices_for_country(html: str, country_name: str):
+def parse_prices_for_country(html, country_name: str):
     """
     Returns up to 5 lowest euro prices.
     Strategy:
     1. Try to find prices from the specific `country_name`.
     2. If none found, fallback to ALL countries and return the cheapest.
     """
-    soup = BeautifulSoup(html, "lxml")
-    table = soup.select_one("div.table.article-table.table-striped")
-    if not table:
-        # Fallback for empty/blocked pages or different layouts
-        return []
+    return as_page(html).country_prices(country_name)
 
-    rows = table.select("div.article-row")
-    
-    country_matches = []
-    other_matches = []
-
-    for r in rows:
-        # 1. Parse Price
-        price_span = r.select_one(".col-offer .color-primary")
-        if not price_span:
-            price_span = r.select_one(".mobile-offer-container .color-primary")
-        if not price_span:
-            continue
-            
-        m = PRICE_RE.search(price_span.get_text(strip=True))
-        if not m:
-            continue
-            
-        # normalize "83,00 €" -> 83.00
-        raw = m.group(1).replace(".", "").replace(",", ".")
-        try:
-            price = float(raw)
-        except ValueError:
-            continue
-
-        # 2. Parse Country
-        loc = r.select_one(".col-seller [aria-label^='Item location:']")
-        loc_country = None
-        if loc and loc.has_attr("aria-label"):
-            lab = loc["aria-label"]
-            if ":" in lab:
-                loc_country = lab.split(":", 1)[1].strip()
-        
-        if loc_country == country_name:
-            country_matches.append(price)
-        else:
-            other_matches.append(price)
 
-    # Strategy: Prioritize target country, fallback to global cheapest
-    if country_matches:
-        country_matches.sort()
-        return country_matches[:5]
-    
-    if other_matches:
-        other_matches.sort()
-        # Fallback: return cheapest from any country
-        return other_matches[:5]
-
-    return []
-
-
-def parse_single_card_offers(html: str, language: str, is_sealed: bool = False):
+def parse_single_card_offers(html, language: str, is_sealed: bool = False):
     """Return up to 20 lowest offers with details (seller, price, country).
     
     Returns list of dicts: {'seller': str, 'price': float, 'country': str}
     """
-    soup = BeautifulSoup(html, "lxml")
-    table = soup.select_one("div.table.article-table.table-striped")
-    rows = table.select("div.article-row") if table else soup.select("div.article-row")
-    if not rows:
-        return []
-        
-    offers = []
-    lang_norm = language.strip().lower()
-    
-    for r in rows:
-        # 1. Condition Check
-        if not is_sealed:
-            badge = r.select_one(".article-condition .badge")
-            cond = badge.get_text(strip=True).lower() if badge else None
-            if cond not in {"nm", "m"}:
-                continue
-        
-        # 2. Language Check
-        lang_icon = r.select_one(
-            ".product-attributes .icon[data-bs-original-title], .product-attributes .icon[aria-label]"
-        )
-        lang_text = None
-        if lang_icon:
-            lang_text = lang_icon.get("data-bs-original-title") or lang_icon.get("aria-label")
-        if not lang_text or lang_norm not in lang_text.lower():
-            continue
-
-        # 3. Price
-        price_span = r.select_one(".col-offer .color-primary") or r.select_one(
-            ".mobile-offer-container .color-primary"
-        )
-        if not price_span:
-            continue
-        m = PRICE_RE.search(price_span.get_text(strip=True))
-        if not m:
-            continue
-        try:
-            raw_price = float(m.group(1).replace(".", "").replace(",", "."))
-        except ValueError:
-            continue
+    return as_page(html).offers(language, is_sealed=is_sealed)
 
-        # 4. Seller & Country
-        seller_name = "Unknown"
-        country = None
-        
-        # Seller name is usually in the first anchor of col-seller or just text
-        seller_elem = r.select_one(".col-seller a") or r.select_one(".col-seller")
-        if seller_elem:
-           seller_name = seller_elem.get_text(strip=True)
-           
-        # Country is often in aria-label of an icon in col-seller
-        loc_elem = r.select_one(".col-seller .icon[aria-label^='Item location']")
-        if loc_elem:
-            label = loc_elem.get("aria-label", "")
-            if ":" in label:
-                country = label.split(":", 1)[1].strip()
-
-        offers.append({
-            "seller": seller_name,
-            "price": raw_price,
-            "country": country
-        })
-
-        if len(offers) >= 20:
-             break
-
-    # Sort by price ascending
-    offers.sort(key=lambda x: x["price"])
-    return offers
-
-
-def parse_single_card_summary(html: str):
+
+def parse_single_card_summary(html):
     """Extract headline pricing data from the Cardmarket single card page."""
+    return as_page(html).summary()
 
-    def extract(label: str):
-        soup_dt = soup.find(
-            "dt",
-            string=lambda s: bool(s)
-            and label.lower() in s.strip().lower(),
-        )
-        if not soup_dt:
-            return None
-        dd = soup_dt.find_next_sibling("dd")
-        if not dd:
-            return None
-        m = PRICE_RE.search(dd.get_text(" ", strip=True))
-        if not m:
-            return None
-        try:
-            return float(m.group(1).replace(".", "").replace(",", "."))
-        except ValueError:
-            return None
-
-    soup = BeautifulSoup(html, "lxml")
-    soup = BeautifulSoup(html, "lxml")
-    return {
-        "from_price": extract("from"),
-        "price_trend": extract("price trend"),
-        "avg7": extract("7-day"),
-        "avg1": extract("1-day"),
-    }
-
-def process_psa10_data(session, card, html):
-    """Parse and save PSA10 offers from the expanded HTML."""
-    soup = BeautifulSoup(html, 'html.parser')
-    rows = soup.select("div.article-row")
-    
-    psa10_offers = []
-    lowest_price = None
+async def fetch_page(context, url: str, expand_results: bool = False, card_name: str = None,
+                     page=None, run: ScrapeRun = None) -> str:
+    """Load ``url`` and return the rendered HTML.
 
-    for row in rows:
-        comment_col = row.select_one(".product-comments")
-        comment_text = comment_col.get_text(strip=True) if comment_col else ""
-        text_lower = comment_text.lower()
-        
-        if "psa10" in text_lower or "psa 10" in text_lower or "psa-10" in text_lower:
-            price_elem = row.select_one(".col-offer .color-primary") or row.select_one(".price-container .color-primary")
-            if not price_elem:
-                continue
-            
-            price_str = price_elem.get_text(strip=True).replace("€", "").replace(".", "").replace(",", ".").strip()
-            try:
-                price = float(price_str)
-            except ValueError:
-                continue
-            
-            seller_elem = row.select_one(".col-seller a") or row.select_one(".col-seller")
-            seller = seller_elem.get_text(strip=True) if seller_elem else "Unknown"
-            
-            psa10_offers.append({
-                "seller": seller,
-                "price": price,
-                "comment": comment_text
-            })
-
-            if lowest_price is None or price < lowest_price:
-                lowest_price = price
-    
-    psa10_found = len(psa10_offers) > 0
-    # We log this summary inside the main loop or here? Let's log here for clarity.
-    # But current logic has 'summary' variable in main loop printed? No, we print explicit summary line.
-    logger.info(f"[{card.name}] PSA10 Summary: Found: {'Yes' if psa10_found else 'No'} ({len(psa10_offers)} offers). Low: {lowest_price}")
-
-    if psa10_offers:
-        # Clear old offers
-        session.query(PSA10Offer).filter(PSA10Offer.card_id == card.id).delete()
-        
-        # Add new offers
-        for offer in psa10_offers:
-            db_offer = PSA10Offer(
-                card_id=card.id,
-                seller_name=offer["seller"],
-                price=offer["price"],
-                comment=offer["comment"]
-            )
-            session.add(db_offer)
-        
-        # Add Price History (if we have a low)
-        if lowest_price is not None:
-            db_price = PSA10Price(
-                card_id=card.id,
-                low=lowest_price
-            )
-            session.add(db_price)
-        session.commit()
-
-async def fetch_page(context, url: str, expand_results: bool = False, card_name: str = None) -> str:
-    page = await context.new_page()
+    Pass ``page`` to reuse a pooled page; otherwise a new page is opened on
+    ``context`` and closed again afterwards. Not rate limited by itself: the
+    scrape loops go through ``fetch_html``, which takes the host token.
+    Measurements go to ``run`` (a throwaway one if not given).
+    """
+    run = run or ScrapeRun()
+    owns_page = page is None
+    if owns_page:
+        page = await context.new_page()
 
-    # Data Usage Tracking
-    total_data_bytes = 0
-    async def track_data(response):
-        nonlocal total_data_bytes
-        try:
-            # Fallback: Content-Length header (fast)
-            length = int(response.headers.get('content-length', 0))
-            if length == 0:
-                # If header missing/zero (chunked/gzipped), try getting body size
-                # Note: this might slightly slow down if bodies are huge, but we blocked huge things.
-                try:
-                    body = await response.body()
-                    length = len(body)
-                except Exception:
-                    pass 
-            total_data_bytes += length
-        except Exception:
-            pass
-        
+    def warn_status(response):
         if response.status in [403, 429]:
             logger.warning(f"[{card_name or 'Unknown'}] Network error: {response.status} {response.url}")
 
-    page.on("response", track_data)
+    # Data usage: header/sizes() based, never awaits response.body()
+    usage = run.usage.page(on_bytes=run.policy.record_bytes)
+    usage.attach(page)
+    page.on("response", warn_status)
+    run.policy.record_page()
+    try:
+        return await _load_page(page, url, expand_results, card_name, lambda: usage.bytes, run)
+    finally:
+        page.remove_listener("response", warn_status)
+        usage.detach(page)
+        if owns_page:
+            await page.close()
+
+
+async def fetch_html(context, url: str, expand_results: bool = False, card_name: str = None,
+                     page=None, run: ScrapeRun = None) -> str:
+    """``fetch_page`` with the plain-HTTP fast path in front of it.
+
+    With ``SCRAPER_FETCH_MODE=http`` the page is requested with the context's
+    cookies over HTTP first; Cloudflare challenges, errors and
+    ``expand_results`` (needs a real "Show more" click) go through the browser.
+    """
+    run = run or ScrapeRun()
+    if HTTP_FETCHER is not None and not expand_results:
+        await HOST_LIMITER.acquire(url)
+        started = run.fetch_stats.start()
+        html = await HTTP_FETCHER.fetch(context, url, card_name)
+        if html is not None:
+            run.fetch_stats.record("http", started)
+            update_scraper_status("ok", "Scraper is running normally.")
+            return html
+        mode = "fallback"
+    else:
+        mode = "browser"
+
+    await HOST_LIMITER.acquire(url)
+    started = run.fetch_stats.start()
+    html = await fetch_page(context, url, expand_results, card_name, page, run)
+    run.fetch_stats.record(mode, started)
+    if mode == "fallback":
+        # The browser may have earned a fresh cf_clearance; hand it to the client.
+        await HTTP_FETCHER.sync_cookies(context)
+    return html
+
+
+async def _load_page(page, url, expand_results, card_name, data_bytes, run):
+    # Sub-resources are filtered by ROUTE_POLICY (installed on the context);
+    # data usage is tracked via the response listener in fetch_page
 
-    # Resource blocking removed to improve reliability and reduce blocking risks
-    # We still track data usage via the response listener above
-    
-    # cardmarket often requires login to buy, but listing/prices are visible
     # cardmarket often requires login to buy, but listing/prices are visible
-    resp = await page.goto(url, wait_until="networkidle", timeout=60_000)
+    resp, ready, ready_s = await goto_ready(page, url, timeout_ms=60_000)
+    run.ready_times.observe(ready_s, ready)
     
     # Handle "Show more results" if requested
     if expand_results:
@@ -444,16 +288,17 @@ async def fetch_page(context, url: str, expand_results: bool = False, card_name:
     if title == "www.cardmarket.com" or "Just a moment" in title:
         logger.error(f"Scraper blocked by Cloudflare (Title: '{title}'). Body snippet: {content_text[:100]}")
         update_scraper_status("error", "Scraper is blocked by Cloudflare (Just a moment / Redirect). Cookies need update.")
+        # Start the next run from a fresh context (and freshly loaded cookies).
+        BROWSER.mark_unhealthy()
     else:
         # If we successfully got a product page, clear error? 
         if "Cardmarket" in title and title != "www.cardmarket.com":
              update_scraper_status("ok", "Scraper is running normally.")
         
-    kb_used = total_data_bytes / 1024
+    kb_used = data_bytes() / 1024
     if card_name:
-        logger.info(f"[{card_name}] Page Size: {kb_used:.2f} KB")
+        logger.debug(f"[{card_name}] Page Size: {kb_used:.2f} KB")
 
-    await page.close()
     return html
 
 async def scrape_once(product_ids=None):
@@ -461,8 +306,7 @@ async def scrape_once(product_ids=None):
 
     If ``product_ids`` is provided, only those product ids will be scraped.
     """
-    from db import get_session, Product, Price
-    print(f"[scraper] Starting scrape run at {datetime.utcnow():%Y-%m-%d %H:%M:%S}")
+    logger.info(f"Starting scrape run at {datetime.utcnow():%Y-%m-%d %H:%M:%S}")
 
     with get_db_session() as session:
         q = session.query(Product).filter_by(is_enabled=1)
@@ -494,67 +338,158 @@ async def scrape_once(product_ids=None):
         logger.info("Skipping sealed scrape: all products fetched recently")
         return
 
-    async with async_playwright() as p:
-        browser = await p.firefox.launch(headless=True)
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (X11; Linux x86_64; rv:147.0) Gecko/20100101 Firefox/147.0",
-            extra_http_headers={"Referer": "https://www.cardmarket.com/"}
-        )
-        try:
-            cookies = parse_netscape_cookies("cookies-cardmarket-com.txt")
-            await context.add_cookies(cookies)
-        except Exception as e:
-            logger.error(f"Failed to load cookies: {e}")
-        
-
-        total_products = len(products)
-        for i, prod in enumerate(products, 1):
-            if is_blocked(product_id=prod.id, url=prod.url):
-                 logger.info(f"[{i}/{total_products}] Skipping blocked product: {prod.name} (ID: {prod.id})")
-                 continue
-            
-            logger.info(f"[{i}/{total_products}] Fetching prices for {prod.name} ({prod.country})")
-            start = time.time()
-            try:
-                # Add language filter for sealed English products to avoid French/Italian items
-                target_url = prod.url
-                if "japanese" not in prod.name.lower() and " jp" not in prod.name.lower():
-                    if "language=" not in target_url:
-                        sep = "&" if "?" in target_url else "?"
-                        target_url += f"{sep}language=1"
-
-                html = await fetch_page(context, target_url)
-                prices = parse_prices_for_country(html, prod.country)
-                supply = parse_supply(html)
-                if prices:
-                    low = min(prices)
-                    avg = sum(prices) / len(prices)
-                    with get_db_session() as s:
-                        s.add(Price(product_id=prod.id, low=low, avg5=avg,
-                                    n_seen=len(prices), supply=supply))
-                        s.commit()
-                        upsert_daily(s, prod.id)
-                    logger.info(f"Stored {len(prices)} prices: low={low:.2f}, avg5={avg:.2f}, supply={supply}")
-                else:
-                    logger.warning("No prices found")
-            except Exception as e:
-                logger.error(f"Error while processing {prod.name}: {e}")
-            finally:
-                elapsed = time.time() - start
-                remain = max(0, random.uniform(10, 15) - elapsed)
-                await asyncio.sleep(remain)
-        
-        await context.close()
-        await browser.close()
+    run = ScrapeRun("Sealed")
+    progress = SCRAPER_STATUS.start_run("Sealed", len(products))
+    try:
+        async with BROWSER.lease() as context, ScrapeWriter(progress=progress) as writer:
+            total_products = len(products)
+            for i, prod in enumerate(products, 1):
+                if is_blocked(product_id=prod.id, url=prod.url):
+                     logger.info(f"[{i}/{total_products}] Skipping blocked product: {prod.name} (ID: {prod.id})")
+                     progress.advance(skipped=True)
+                     continue
+
+                logger.info(f"[{i}/{total_products}] Fetching prices for {prod.name} ({prod.country})")
+                start = time.time()
+                ok = True
+                try:
+                    # Add language filter for sealed English products to avoid French/Italian items
+                    target_url = prod.url
+                    if "japanese" not in prod.name.lower() and " jp" not in prod.name.lower():
+                        if "language=" not in target_url:
+                            sep = "&" if "?" in target_url else "?"
+                            target_url += f"{sep}language=1"
+
+                    html = await fetch_html(context, target_url, run=run)
+                    ts = datetime.utcnow()
+                    archived = archive_page("sealed", prod.id, target_url, html, ts)
+                    parsed = await get_parse_executor().run(parse_sealed_html, html, prod.country)
+                    stats = parsed["stats"]
+                    if stats:
+                        writer.put({"kind": "sealed", "product_id": prod.id, "ts": ts, "stats": stats, "archive": archived})
+                        logger.info(f"Queued {stats['n_seen']} prices: low={stats['low']:.2f}, "
+                                    f"avg5={stats['avg5']:.2f}, supply={stats['supply']}")
+                    else:
+                        if archived:
+                            writer.put({"kind": "archive", "archive": archived})
+                        logger.warning("No prices found")
+                except Exception as e:
+                    ok = False
+                    logger.error(f"Error while processing {prod.name}: {e}")
+                finally:
+                    progress.advance(ok)
+                    elapsed = time.time() - start
+                    remain = max(0, random.uniform(10, 15) - elapsed)
+                    await asyncio.sleep(remain)
+    finally:
+        progress.finish()
 
+    run.log_report()
     logger.info(f"Scrape run finished at {datetime.utcnow():%Y-%m-%d %H:%M:%S}")
 
 
 
 
 
+def is_sealed_card(card) -> bool:
+    """Sealed products (Booster Box, Pack, etc.) tracked as singles; we skip
+    condition checks for these."""
+    cat_lower = (card.category or "").lower()
+    name_lower = card.name.lower()
+    return (
+        "booster" in cat_lower or "pack" in cat_lower or "display" in cat_lower or
+        "collection" in name_lower or "box" in name_lower or "set" in name_lower or
+        "promo" in cat_lower
+    )
+
+
+def archive_page(kind: str, ref_id: int, url: str, html: str, ts: datetime):
+    """Keep the raw page for ``html_archive.py replay``; never fails the scrape.
+
+    Returns the ``page_archive`` row mapping for the writer, or ``None``.
+    """
+    if ARCHIVE is None:
+        return None
+    try:
+        sha, codec, size = ARCHIVE.put(html)
+    except Exception as e:
+        logger.error(f"Failed to archive page {url}: {e}")
+        return None
+    return {"kind": kind, "ref_id": ref_id, "url": url, "ts": ts, "sha256": sha, "codec": codec, "size": size}
+
+
+async def _scrape_single_card(context, page, card, writer, run: ScrapeRun = None) -> bool:
+    """Fetch, parse and queue one single card for ``writer``. Returns True when
+    prices were found.
+
+    Fetch and parse errors propagate, so ``PagePool.page`` replaces the page.
+    """
+    # Add language filter param for better pre-filtering
+    target_url = card.url
+    if card.language == "English" and "language=" not in target_url:
+        sep = "&" if "?" in target_url else "?"
+        target_url += f"{sep}language=1"
+
+    # Check if we need to do PSA10 expansion (Merged Query)
+    is_liked = (card.category == 'Liked')
+
+    # DISABLE EXPANSION FOR NOW to avoid shadow bans
+    html = await fetch_html(context, target_url, expand_results=False, card_name=card.name, page=page, run=run)
+
+    ts = datetime.utcnow()
+    archived = archive_page("single", card.id, target_url, html, ts)
+
+    is_sealed = is_sealed_card(card)
+
+    # Parse once, off the event loop when the executor has spare cores,
+    # so other workers keep fetching meanwhile.
+    parsed = await get_parse_executor().run(
+        parse_single_card_html, html, card.language, is_sealed=is_sealed, with_psa10=is_liked
+    )
+    offers = parsed["offers"]
+    stats = parsed["stats"]
+    supply = parsed["supply"]
+
+    if stats is None:
+        if supply and supply > 0:
+            logger.warning(
+                f"[{card.name}] Mismatch: Found supply {supply} but extracted 0 offers. "
+                f"HTML size: {len(html)/1024:.2f}KB. "
+                f"Check if filters (language/condition) match available items."
+            )
+        logger.warning("No prices found for single card")
+        if archived:
+            writer.put({"kind": "archive", "archive": archived})
+        return False
+
+    psa10 = parsed["psa10"] if is_liked else None
+    if psa10 is not None:
+        lowest = min((o["price"] for o in psa10), default=None)
+        logger.info(f"[{card.name}] PSA10 Summary: Found: {'Yes' if psa10 else 'No'} ({len(psa10)} offers). Low: {lowest}")
+
+    # Price row, offers, PSA10 and the daily rollup are written in batches.
+    writer.put({
+        "kind": "single",
+        "card_id": card.id,
+        "ts": ts,
+        "stats": stats,
+        "offers": offers,
+        "psa10": psa10,
+        "archive": archived,
+    })
+
+    logger.info(
+        f"Queued single card stats (low={stats['low']}, avg5={stats['avg5']}, supply={supply})"
+    )
+    return True
+
+
 async def scrape_single_cards(card_ids=None):
-    """Scrape single-card prices and headline stats."""
+    """Scrape single-card prices and headline stats.
+
+    Cards are spread over ``Config.SCRAPER_WORKERS`` pages of one browser
+    context; every fetch still goes through the shared per-host rate limiter.
+    """
     logger.info(f"Starting single-card scrape at {datetime.utcnow():%Y-%m-%d %H:%M:%S}")
 
     with get_db_session() as session:
@@ -588,139 +523,61 @@ async def scrape_single_cards(card_ids=None):
         logger.info("Skipping single-card scrape: all cards fetched recently")
         return
 
-    async with async_playwright() as p:
-        browser = await p.firefox.launch(headless=True)
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (X11; Linux x86_64; rv:147.0) Gecko/20100101 Firefox/147.0",
-            extra_http_headers={"Referer": "https://www.cardmarket.com/"}
+    run = ScrapeRun("Single-card")
+    workers = max(1, min(Config.SCRAPER_WORKERS, len(cards)))
+    stats = RunStats("Single-card", len(cards), workers)
+    # Shared between workers: consecutive failures and the cooldown they trigger.
+    state = {"consecutive_errors": 0, "cooldown_until": 0.0}
+
+    async def handle(worker_id, i, card):
+        if is_blocked(product_id=card.product_id, url=card.url):
+            logger.info(f"[{i}/{stats.total}] Skipping blocked card: {card.name} (ID: {card.product_id})")
+            stats.skip()
+            progress.advance(skipped=True)
+            return SKIPPED
+
+        if "Don!!" in card.name:
+            logger.info(f"[{i}/{stats.total}] Skipping Don card: {card.name}")
+            stats.skip()
+            progress.advance(skipped=True)
+            return SKIPPED
+
+        if state["consecutive_errors"] >= 3:
+            logger.error("Too many consecutive errors (likely blocked). Cooling down for 60 minutes...")
+            state["consecutive_errors"] = 0
+            state["cooldown_until"] = time.monotonic() + 3600
+        # Every worker waits out a cooldown, not just the one that triggered it.
+        cooldown = state["cooldown_until"] - time.monotonic()
+        if cooldown > 0:
+            await asyncio.sleep(cooldown)
+
+        logger.info(
+            f"[{i}/{stats.total}] Fetching single card {card.name} ({card.language}, {card.condition})"
         )
         try:
-            cookies = parse_netscape_cookies("cookies-cardmarket-com.txt")
-            await context.add_cookies(cookies)
+            async with pool.page() as page:
+                ok = await _scrape_single_card(context, page, card, writer, run)
         except Exception as e:
-            logger.error(f"Failed to load cookies: {e}")
-
-        consecutive_errors = 0
-        total_cards = len(cards)
-        
-        for i, card in enumerate(cards, 1):
-            if consecutive_errors >= 3:
-                logger.error("Too many consecutive errors (likely blocked). Cooling down for 60 minutes...")
-                await asyncio.sleep(3600)
-                consecutive_errors = 0 # Reset after cooling down, or should we break? Let's reset and try one more time or just continue slowly.
-                # Actually, maybe better to just break this run?
-                # But looking at requirements, 'paused' is better.
-            
-            if is_blocked(product_id=card.product_id, url=card.url):
-                 logger.info(f"[{i}/{total_cards}] Skipping blocked card: {card.name} (ID: {card.product_id})")
-                 continue
-
-            if "Don!!" in card.name:
-                 logger.info(f"[{i}/{total_cards}] Skipping Don card: {card.name}")
-                 continue
-
-            logger.info(
-                f"[{i}/{total_cards}] Fetching single card {card.name} ({card.language}, {card.condition})"
-            )
-            start = time.time()
+            logger.error(f"Error while processing {card.name}: {e}")
+            ok = False
+        state["consecutive_errors"] = 0 if ok else state["consecutive_errors"] + 1
+        stats.record(ok)
+        progress.advance(ok)
+        return ok
+
+    progress = SCRAPER_STATUS.start_run("Single-card", len(cards))
+    try:
+        async with BROWSER.lease() as context, ScrapeWriter(progress=progress) as writer:
+            pool = PagePool(context, workers)
             try:
-                # Add language filter param for better pre-filtering
-                target_url = card.url
-                if card.language == "English" and "language=" not in target_url:
-                    sep = "&" if "?" in target_url else "?"
-                    target_url += f"{sep}language=1"
-
-                # Check if we need to do PSA10 expansion (Merged Query)
-                is_liked = (card.category == 'Liked')
-                
-                # DISABLE EXPANSION FOR NOW to avoid shadow bans
-                html = await fetch_page(context, target_url, expand_results=False, card_name=card.name)
-                
-                # Determine if this is a sealed product (Booster Box, Pack, etc.)
-                # We skip condition checks for these.
-                cat_lower = (card.category or "").lower()
-                name_lower = card.name.lower()
-                is_sealed = (
-                    "booster" in cat_lower or "pack" in cat_lower or "display" in cat_lower or
-                    "collection" in name_lower or "box" in name_lower or "set" in name_lower or
-                    "promo" in cat_lower
-                )
-                
-                offers = parse_single_card_offers(html, card.language, is_sealed=is_sealed)
-                prices = [o["price"] for o in offers]
-                
-                summary = parse_single_card_summary(html)
-                supply = parse_supply(html)
-
-                if prices or any(v is not None for v in summary.values()):
-                    consecutive_errors = 0 # Success!
-                    
-                    # Always derive chart points from the scraped listings so the
-                    # low/avg lines match the table rows shown on the website.
-                    low = min(prices) if prices else None
-                    # Use top 5 for average consistency with old logic
-                    top5 = prices[:5]
-                    avg = sum(top5) / len(top5) if top5 else None
-                    
-                    with get_db_session() as s:
-                        # 1. Save Stats History (SingleCardPrice)
-                        s.add(
-                            SingleCardPrice(
-                                card_id=card.id,
-                                low=low,
-                                avg5=avg,
-                                n_seen=len(prices) if prices else None,
-                                supply=supply,
-                                from_price=summary.get("from_price"),
-                                price_trend=summary.get("price_trend"),
-                                avg7_price=summary.get("avg7"),
-                                avg1_price=summary.get("avg1"),
-                            )
-                        )
-                        
-                        # 2. Update Offers (SingleCardOffer)
-                        # Clear old offers for this card
-                        s.query(SingleCardOffer).filter_by(card_id=card.id).delete()
-                        
-                        # Insert new offers
-                        for o in offers:
-                            s.add(SingleCardOffer(
-                                card_id=card.id,
-                                seller_name=o["seller"],
-                                price=o["price"],
-                                country=o["country"]
-                            ))
-
-                        s.commit()
-                        upsert_single_daily(s, card.id)
-                        
-                        # 3. Process PSA10 if applicable (merged in same session)
-                        if is_liked:
-                             process_psa10_data(s, card, html)
-
-                    logger.info(
-                        f"Stored single card stats (low={low}, avg5={avg}, supply={supply})"
-                    )
-                else:
-                    if supply and supply > 0:
-                        logger.warning(
-                            f"[{card.name}] Mismatch: Found supply {supply} but extracted 0 offers. "
-                            f"HTML size: {len(html)/1024:.2f}KB. "
-                            f"Check if filters (language/condition) match available items."
-                        )
-                    logger.warning("No prices found for single card")
-                    consecutive_errors += 1
-            except Exception as e:
-                logger.error(f"Error while processing {card.name}: {e}")
-                consecutive_errors += 1
+                await run_workers(cards, handle, workers, jitter=(20, 25))
             finally:
-                elapsed = time.time() - start
-                remain = max(0, random.uniform(20, 25) - elapsed)
-                await asyncio.sleep(remain)
-
-        await context.close()
-        await browser.close()
+                await pool.close()
+    finally:
+        progress.finish()
 
+    stats.log_summary()
+    run.log_report()
     logger.info(
         f"Single-card scrape finished at {datetime.utcnow():%Y-%m-%d %H:%M:%S}"
     )
@@ -729,6 +586,18 @@ async def scrape_single_cards(card_ids=None):
 async def scrape_all(product_ids=None, single_card_ids=None):
     await scrape_once(product_ids)
     await scrape_single_cards(single_card_ids)
+    if ARCHIVE is not None:
+        try:
+            with get_db_session() as s:
+                ARCHIVE.prune(s)
+        except Exception as e:
+            logger.error(f"Archive prune failed: {e}")
+    try:
+        with get_db_session() as s:
+            cards, products = refresh_stale(s)
+        logger.info(f"Refreshed {cards} card and {products} product snapshots missing or not scraped in the last day")
+    except Exception as e:
+        logger.error(f"Snapshot refresh failed: {e}")
 
 def compute_trend(session, product_id: int, lookback_days: int = 7):
     """
@@ -811,7 +680,7 @@ def is_heads_up(session, product_id: int):
 def run_and_reschedule(scheduler):
     try:
         logger.info("Starting scheduled scrape...")
-        asyncio.run(scrape_all())
+        BROWSER.run(scrape_all())
     except Exception as e:
         logger.error(f"Scrape job failed: {e}")
     finally:
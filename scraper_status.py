@@ -0,0 +1,163 @@
+# scraper_status.py
+"""Scraper health, shared through a file, and run progress, kept in memory.
+
+``STATUS.set`` records the health (``ok`` / ``warning`` / ``error`` plus a
+message). Repeating the current health, which every successful fetch does,
+only touches memory. A change bumps ``version`` and rewrites the status file
+atomically, so the import scripts and the web app in separate processes see
+each other. ``health`` stats the file and re-reads it only when its mtime
+moved; our own writes are not re-read.
+
+Run progress (``start_run`` hands out a ``RunProgress``) changes with
+every card and is only read by the status API of the process running the
+scheduler, so it never touches the file.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ScraperStatus:
+    def __init__(self, path: str = None):
+        self.path = path or Config.SCRAPER_STATUS_FILE
+        self.version = 0
+        self._health = {}
+        self._runs = []
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._mtime = mtime
+        self._health = {k: data.get(k) for k in ("status", "message", "timestamp")}
+        self.version = max(self.version, data.get("version", 0))
+
+    def _write(self):
+        data = dict(self._health, version=self.version)
+        try:
+            # Write mostly atomic
+            temp_file = self.path + ".tmp"
+            with open(temp_file, "w") as f:
+                json.dump(data, f)
+            os.replace(temp_file, self.path)
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except Exception as e:
+            logger.error(f"Failed to update scraper status: {e}")
+
+    def set(self, status: str, message: str) -> bool:
+        """Record the scraper's health; ``False`` if it was already that."""
+        with self._lock:
+            self._sync()
+            if self._health.get("status") == status and self._health.get("message") == message:
+                return False
+            self.version += 1
+            self._health = {"status": status, "message": message, "timestamp": datetime.utcnow().isoformat()}
+            self._write()
+            return True
+
+    def health(self) -> dict:
+        """``status``, ``message``, ``timestamp`` (of the last change) and ``version``."""
+        with self._lock:
+            self._sync()
+            return dict(self._health, version=self.version)
+
+    def start_run(self, name: str, total: int) -> "RunProgress":
+        """Progress of a new run. Runs may overlap (a scrape started from the
+        UI next to the scheduled one); each counts on its own handle."""
+        run = RunProgress(name, total)
+        with self._lock:
+            self._runs = self._prune() + [run]
+        return run
+
+    def _prune(self):
+        """The last run to finish, then the ones still going."""
+        finished = sorted((r for r in self._runs if r.finished is not None), key=lambda r: r.finished)
+        return finished[-1:] + [r for r in self._runs if r.finished is None]
+
+    def runs(self) -> list:
+        """``RunProgress.snapshot`` of every running run and the last finished one."""
+        with self._lock:
+            self._runs = self._prune()
+            runs = list(self._runs)
+        return [r.snapshot() for r in runs]
+
+    def progress(self):
+        """The longest running run, else the last one to finish; ``None``
+        before the first run."""
+        runs = self.runs()
+        running = [r for r in runs if r["running"]]
+        return (running or runs or [None])[0]
+
+
+class RunProgress:
+    """Items processed by one run, as handed out by ``ScraperStatus.start_run``."""
+
+    def __init__(self, name: str, total: int):
+        self.name = name
+        self.total = total
+        self.done = self.failed = self.skipped = 0
+        self.lost = 0  # fetched, but the writer could not store them
+        self.started = time.time()
+        self.finished = None
+
+    def advance(self, ok: bool = True, skipped: bool = False):
+        """One item of the run processed."""
+        if skipped:
+            self.skipped += 1
+        elif ok:
+            self.done += 1
+        else:
+            self.failed += 1
+
+    def lose(self, n: int):
+        self.lost += n
+
+    def finish(self):
+        self.finished = time.time()
+
+    def snapshot(self) -> dict:
+        """``i``/``total``, fetch rate in pages per minute and the ETA at that rate."""
+        end = self.finished or time.time()
+        elapsed = max(end - self.started, 1e-9)
+        fetched = self.done + self.failed
+        i = fetched + self.skipped
+        per_min = fetched / elapsed * 60.0
+        remaining = self.total - i
+        if self.finished or remaining <= 0:
+            eta = 0.0
+        else:
+            eta = remaining / per_min * 60.0 if per_min else None
+        return {
+            "name": self.name,
+            "running": self.finished is None,
+            "i": i,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "lost": self.lost,
+            "started": datetime.utcfromtimestamp(self.started).isoformat(),
+            "elapsed_s": round(elapsed, 1),
+            "pages_per_min": round(per_min, 2),
+            "eta_s": None if eta is None else round(eta, 1),
+        }
+
+
+STATUS = ScraperStatus()
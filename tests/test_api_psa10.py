@@ -0,0 +1,108 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# disable scheduler before importing app
+os.environ["CARDWATCH_DISABLE_SCHEDULER"] = "1"
+
+import app as cardapp
+import db
+from latest_snapshot import rebuild_all
+
+
+@pytest.fixture
+def client():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    db.SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+    db.Base.metadata.create_all(engine)
+    rng = random.Random(5)
+    now = datetime.utcnow()
+    s = db.SessionLocal()
+    for cid in range(1, 41):
+        s.add(db.SingleCard(id=cid, name=rng.choice(["Luffy", "Zoro", "Nami"]) + f" {cid % 7}", url=f"u{cid}",
+                            language=rng.choice(["English", "Japanese"]),
+                            category="Liked" if cid % 4 else "Other"))
+        if rng.random() < 0.8:
+            s.add(db.SingleCardPrice(card_id=cid, ts=now, low=rng.choice([0.0, None, rng.uniform(1, 50)])))
+        for i in range(rng.randint(0, 35)):
+            s.add(db.PSA10Price(card_id=cid, ts=now - timedelta(hours=i), low=rng.choice([0.0, rng.uniform(50, 500)])))
+    s.commit()
+    rebuild_all(s)
+    s.close()
+    cardapp.app.config["TESTING"] = True
+    client = cardapp.app.test_client()
+    client.engine = engine
+    return client
+
+
+def reference(args):
+    """The endpoint before paging moved into SQL: everything loaded, sorted and sliced in Python."""
+    s = db.SessionLocal()
+    query = s.query(db.SingleCard).filter(db.SingleCard.category == "Liked")
+    if args.get("search"):
+        query = query.filter(db.SingleCard.name.ilike(f"%{args['search'].lower()}%"))
+    if args.get("language", "All") != "All":
+        query = query.filter(db.SingleCard.language == args["language"])
+    data = []
+    for c in query.all():
+        psa10 = s.query(db.PSA10Price).filter_by(card_id=c.id).order_by(db.PSA10Price.ts.desc()).first()
+        raw = s.query(db.SingleCardPrice).filter_by(card_id=c.id).order_by(db.SingleCardPrice.ts.desc()).first()
+        history = s.query(db.PSA10Price.low).filter_by(card_id=c.id).order_by(db.PSA10Price.ts.desc()).limit(30).all()
+        psa10_low, raw_low = psa10.low if psa10 else None, raw.low if raw else None
+        data.append({"id": c.id, "name": c.name, "image_url": c.image_url, "psa10_low": psa10_low, "raw_low": raw_low,
+                     "ratio": psa10_low / raw_low if psa10_low and raw_low and raw_low > 0 else None,
+                     "psa10_history": [h[0] for h in history][::-1], "url": c.url})
+    s.close()
+    reverse = args.get("order") == "desc"
+    sort = args.get("sort", "name")
+    data.sort(key=lambda x: (-999999 if reverse else 999999) if x.get(sort) is None else x.get(sort), reverse=reverse)
+    offset, limit = int(args.get("offset", 0)), int(args.get("limit", 100))
+    return {"total": len(data), "rows": data[offset:offset + limit]}
+
+
+def rounded(value):
+    if isinstance(value, float):
+        return round(value, 9)
+    if isinstance(value, list):
+        return [rounded(v) for v in value]
+    if isinstance(value, dict):
+        return {k: rounded(v) for k, v in value.items()}
+    return value
+
+
+@pytest.mark.parametrize("args", [
+    {},
+    {"sort": "ratio", "order": "desc", "limit": 7, "offset": 3},
+    {"sort": "ratio", "order": "asc", "limit": 50},
+    {"sort": "psa10_low", "order": "desc", "language": "Japanese"},
+    {"sort": "raw_low", "order": "asc", "limit": 5, "offset": 10},
+    {"sort": "name", "order": "desc", "search": "LUFFY"},
+])
+def test_psa10_api_matches_in_memory_sorting(client, args):
+    assert rounded(client.get("/api/psa10", query_string=args).json) == rounded(reference(args))
+
+
+def test_psa10_api_query_count_does_not_grow_with_the_list(client):
+    statements = []
+    event.listen(client.engine, "before_cursor_execute", lambda *a: statements.append(1))
+    client.get("/api/psa10", query_string={"limit": 2})
+    small = len(statements)
+    statements.clear()
+    client.get("/api/psa10", query_string={"limit": 100})
+    assert len(statements) == small
+
+
+@pytest.mark.parametrize("args", [
+    {"sort": "ratio", "order": "desc", "limit": 7, "offset": 3},
+    {"sort": "psa10_low", "order": "asc", "limit": 10},
+    {"sort": "raw_low", "order": "desc"},
+])
+def test_psa10_api_sorts_cards_without_a_snapshot_by_their_prices(client, args):
+    with db.SessionLocal() as s:
+        s.query(db.CardLatest).filter(db.CardLatest.card_id % 2 == 1).delete()
+        s.commit()
+    assert rounded(client.get("/api/psa10", query_string=args).json) == rounded(reference(args))
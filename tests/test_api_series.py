@@ -0,0 +1,72 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# disable scheduler before importing app
+os.environ["CARDWATCH_DISABLE_SCHEDULER"] = "1"
+
+import app as cardapp
+import db
+from response_cache import RESPONSE_CACHE
+from tracker_utils.series_codec import MEDIA_TYPES, decode_binary
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def client():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    db.SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+    db.Base.metadata.create_all(engine)
+    s = db.SessionLocal()
+    s.add(db.SingleCard(id=1, name="Luffy", url="u1", language="English"))
+    s.add_all([db.SingleCardPrice(card_id=1, ts=START + timedelta(hours=4 * i), low=None if i == 3 else 1.5 + i,
+                                  avg5=2.25 + i) for i in range(300)])
+    s.commit()
+    db.backfill_single_daily(s)
+    s.commit()
+    s.close()
+    RESPONSE_CACHE.clear()
+    cardapp.app.config["TESTING"] = True
+    return cardapp.app.test_client()
+
+
+def test_json_stays_default(client):
+    resp = client.get("/cardwatch/api/single/1/series")
+    assert resp.mimetype == "application/json"
+    rows = resp.get_json()
+    assert rows[3] == {"t": "2024-01-01T12:00:00", "low": None, "avg5": 5.25}
+    assert "Accept" in resp.vary
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"query_string": {"format": "columns"}},
+    {"headers": {"Accept": MEDIA_TYPES["columns"]}},
+])
+def test_columns(client, kwargs):
+    resp = client.get("/cardwatch/api/single/1/series", **kwargs)
+    assert resp.mimetype == MEDIA_TYPES["columns"]
+    cols = json.loads(resp.data)
+    rows = client.get("/cardwatch/api/single/1/series").get_json()
+    assert len(cols["t"]) == len(rows) == 300
+    assert cols["t"][1] - cols["t"][0] == 4 * 3600
+    assert cols["low"] == [r["low"] for r in rows] and cols["avg5"] == [r["avg5"] for r in rows]
+
+    daily = json.loads(client.get("/cardwatch/api/single/1/daily?format=columns").data)
+    assert list(daily) == ["d", "low", "avg"] and len(daily["d"]) == 50
+
+
+def test_binary_gzip(client):
+    resp = client.get("/cardwatch/api/single/1/series?format=binary", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    cols = decode_binary(gzip.decompress(resp.data))
+    assert cols["avg5"].tolist() == [2.25 + i for i in range(300)]
+
+
+def test_unknown_format(client):
+    assert client.get("/cardwatch/api/single/1/daily?format=xml").status_code == 400
@@ -0,0 +1,152 @@
+import asyncio
+import os
+
+import pytest
+
+from browser_manager import BrowserManager
+
+COOKIES = "# Netscape HTTP Cookie File\n.cardmarket.com\tTRUE\t/\tTRUE\t0\tcf_clearance\t{value}\n"
+
+
+class FakeContext:
+    def __init__(self):
+        self.cookies = []
+        self.closed = False
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+
+    async def clear_cookies(self):
+        self.cookies = []
+
+    async def close(self):
+        self.closed = True
+        if "close" in self.handlers:
+            self.handlers["close"](self)
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+        self.handlers = {}
+
+    def is_connected(self):
+        return self.connected
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def new_context(self, **kwargs):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+    def crash(self):
+        self.connected = False
+        self.handlers["disconnected"](self)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    cookie_file = tmp_path / "cookies.txt"
+    cookie_file.write_text(COOKIES.format(value="one"))
+    browsers = []
+    setups = []
+
+    async def launcher():
+        browsers.append(FakeBrowser())
+        return browsers[-1]
+
+    async def setup(context):
+        setups.append(context)
+
+    mgr = BrowserManager(cookie_file=str(cookie_file), setup=setup, max_age=0, launcher=launcher)
+    mgr.browsers = browsers
+    mgr.setups = setups
+    yield mgr
+    mgr.close()
+
+
+def test_context_is_reused_across_runs(manager):
+    first = manager.run(manager.context())
+    second = manager.run(manager.context())
+    assert first is second
+    assert len(manager.browsers) == 1
+    assert manager.setups == [first]
+    assert [c["value"] for c in first.cookies] == ["one"]
+
+
+def test_cookies_reload_only_when_file_changes(manager):
+    context = manager.run(manager.context())
+    manager.run(manager.context())
+    assert len(context.cookies) == 1
+
+    with open(manager.cookie_file, "w") as f:
+        f.write(COOKIES.format(value="two"))
+    mtime = os.path.getmtime(manager.cookie_file)
+    os.utime(manager.cookie_file, (mtime + 5, mtime + 5))
+
+    manager.run(manager.context())
+    assert [c["value"] for c in context.cookies] == ["two"]
+
+
+def test_crashed_browser_is_relaunched(manager):
+    first = manager.run(manager.context())
+    manager.browsers[0].crash()
+    second = manager.run(manager.context())
+    assert len(manager.browsers) == 2
+    assert second is not first
+    assert [c["value"] for c in second.cookies] == ["one"]
+
+
+def test_unhealthy_or_closed_context_is_recreated(manager):
+    first = manager.run(manager.context())
+    manager.mark_unhealthy()
+    second = manager.run(manager.context())
+    assert first.closed and second is not first
+
+    manager.run(second.close())
+    third = manager.run(manager.context())
+    assert third is not second
+    assert len(manager.browsers) == 1
+
+
+def test_stale_context_is_recycled(tmp_path):
+    async def launcher():
+        return FakeBrowser()
+
+    mgr = BrowserManager(cookie_file=str(tmp_path / "missing.txt"), max_age=0.01, launcher=launcher)
+    try:
+        first = mgr.run(mgr.context())
+        mgr.run(asyncio.sleep(0.02))
+        assert mgr.run(mgr.context()) is not first
+    finally:
+        mgr.close()
+
+
+def test_context_refuses_foreign_event_loop(manager):
+    manager.run(manager.context())
+    with pytest.raises(RuntimeError):
+        asyncio.run(manager.context())
+
+
+def test_leased_context_outlives_replacement(manager):
+    async def overlapping_runs():
+        async with manager.lease() as scheduled:
+            manager.mark_unhealthy()
+            async with manager.lease() as manual:
+                assert manual is not scheduled
+            assert not scheduled.closed and not manual.closed
+        return scheduled, manual
+
+    scheduled, manual = manager.run(overlapping_runs())
+    assert scheduled.closed and not manual.closed
+    assert manager.run(manager.context()) is manual
@@ -0,0 +1,45 @@
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app as cardapp
+from db import Base, SingleCard, SingleCardDaily, SingleCardPrice
+from latest_snapshot import refresh_card_latest
+
+
+def test_calculate_card_stats_many_matches_per_card_stats():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, future=True)()
+    rng = random.Random(11)
+    now = datetime.utcnow()
+    today = date.today()
+    for cid in range(1, 31):
+        session.add(SingleCard(id=cid, name=f"card {cid}", url=f"u{cid}", language="English", condition="NM"))
+        for hours in sorted(rng.sample(range(1, 24 * 120), rng.randint(0, 12))):
+            low = rng.choice([None, rng.uniform(5, 50)])
+            session.add(SingleCardPrice(card_id=cid, ts=now - timedelta(hours=hours), low=low,
+                                        avg5=rng.uniform(5, 50), supply=rng.randint(1, 200)))
+        for i in range(rng.randint(0, 14)):
+            avg = rng.choice([None, 20.0 * (1 + rng.uniform(-0.3, 0.3) * (i < 7))])
+            session.add(SingleCardDaily(card_id=cid, day=today - timedelta(days=i), low=avg, avg=avg))
+    session.commit()
+    # Half of the cards have a stored snapshot, the rest are computed on the fly.
+    refresh_card_latest(session, range(1, 16))
+    session.commit()
+
+    ids = [17, 3, 99, 8] + list(range(20, 31)) + list(range(1, 3))
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(1))
+    cardapp.calculate_card_stats_many(session, [17, 3])
+    few = len(statements)
+    statements.clear()
+    many = cardapp.calculate_card_stats_many(session, ids)
+    assert len(statements) == few
+
+    expected = [cardapp.calculate_card_stats(session, session.get(SingleCard, cid)) for cid in ids if cid != 99]
+    assert many == expected
+    assert any(r["history_30d"] for r in many) and any(r["trend"] != "flat" for r in many)
+    session.close()
@@ -0,0 +1,99 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import (
+    Base,
+    Daily,
+    Price,
+    Product,
+    SingleCardDaily,
+    add_daily_prices,
+    add_single_daily_prices,
+    backfill_daily,
+    backfill_single_daily,
+)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, future=True)()
+    s.add(Product(id=1, name="box", url="u1", country="Germany"))
+    s.commit()
+    yield s
+    s.close()
+
+
+PRICES = [
+    {"product_id": 1, "ts": datetime(2026, 10, 1, 0, 0), "low": 5.0, "avg5": 7.0},
+    {"product_id": 1, "ts": datetime(2026, 10, 1, 23, 59, 59), "low": 4.0, "avg5": 9.0},
+    {"product_id": 1, "ts": datetime(2026, 10, 2, 0, 0), "low": 6.0, "avg5": 6.0},
+]
+
+
+def daily(session):
+    return [(d.day, d.low, d.avg, d.avg_sum, d.avg_n) for d in session.query(Daily).order_by(Daily.day)]
+
+
+def test_incremental_rollup_matches_backfill(session):
+    for p in PRICES:
+        session.add(Price(n_seen=5, **p))
+        add_daily_prices(session, [p])
+        session.flush()
+    incremental = daily(session)
+    assert incremental == [(date(2026, 10, 1), 4.0, 8.0, 16.0, 2), (date(2026, 10, 2), 6.0, 6.0, 6.0, 1)]
+
+    backfill_daily(session)
+    assert daily(session) == incremental
+
+
+def test_backfill_range_is_half_open(session):
+    session.add_all([Price(n_seen=5, **p) for p in PRICES])
+    session.add(Daily(product_id=1, day=date(2026, 10, 2), low=1.0, avg=1.0))
+    backfill_daily(session, start=date(2026, 10, 1), end=date(2026, 10, 2))
+    assert daily(session) == [(date(2026, 10, 1), 4.0, 8.0, 16.0, 2), (date(2026, 10, 2), 1.0, 1.0, None, None)]
+
+
+def test_legacy_row_without_totals_and_null_averages(session):
+    session.add(SingleCardDaily(card_id=7, day=date(2026, 10, 1), low=3.0, avg=4.0))
+    session.flush()
+    add_single_daily_prices(session, [
+        {"card_id": 7, "ts": datetime(2026, 10, 1, 12), "low": 2.0, "avg5": 6.0},
+        {"card_id": 7, "ts": datetime(2026, 10, 1, 13), "low": 2.5, "avg5": None},
+        {"card_id": 8, "ts": datetime(2026, 10, 1, 13), "low": None, "avg5": None},
+    ])
+    session.flush()
+    row = session.query(SingleCardDaily).one()
+    assert (row.low, row.avg, row.avg_sum, row.avg_n) == (2.0, 5.0, 10.0, 2)
+
+    backfill_single_daily(session, card_ids=[7])
+    assert session.query(SingleCardDaily).count() == 0
+
+
+def test_day_without_averages_falls_back_to_low(session):
+    add_daily_prices(session, [{"product_id": 1, "ts": datetime(2026, 10, 1, 8), "low": 5.0, "avg5": None}])
+    session.flush()
+    assert daily(session) == [(date(2026, 10, 1), 5.0, 5.0, 0.0, 0)]
+
+    add_daily_prices(session, [{"product_id": 1, "ts": datetime(2026, 10, 1, 9), "low": 6.0, "avg5": 8.0}])
+    assert daily(session) == [(date(2026, 10, 1), 5.0, 8.0, 8.0, 1)]
+
+
+def test_overlapping_writers_both_count(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'd.db'}", future=True)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, future=True)
+    first, second = Session(), Session()
+    add_daily_prices(first, [{"product_id": 1, "ts": datetime(2026, 10, 1, 8), "low": 5.0, "avg5": 6.0}])
+    assert second.query(Daily).count() == 0  # second has not seen the row
+    first.commit()
+    add_daily_prices(second, [{"product_id": 1, "ts": datetime(2026, 10, 1, 9), "low": 4.0, "avg5": 10.0}])
+    second.commit()
+    with Session() as s:
+        assert daily(s) == [(date(2026, 10, 1), 4.0, 8.0, 16.0, 2)]
+    first.close()
+    second.close()
@@ -0,0 +1,138 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import Base, CardLatest, SingleCard, SingleCardDaily, SingleCardOffer
+from scrape_writer import write_batch
+from scraper import compute_single_trend
+from tracker_utils.deal_cache import DealCache
+from tracker_utils.deal_finder import calculate_deals, get_market_sentiment
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, future=True)()
+    s.statements = []
+    s.connection().connection.driver_connection.set_trace_callback(
+        lambda sql: sql.startswith("SELECT") and s.statements.append(sql))
+    rng = random.Random(11)
+    today = date.today()
+    for cid in range(1, 41):
+        base = rng.uniform(5, 200)
+        s.add(SingleCard(id=cid, name=f"card {cid}", url=f"u{cid}", language="English",
+                         category=rng.choice([None, "Leader", "Ignore"])))
+        for i in range(rng.choice([0, 5, 14])):
+            avg = base * (1 + rng.uniform(-0.2, 0.2) * (i >= 7))
+            s.add(SingleCardDaily(card_id=cid, day=today - timedelta(days=i), low=avg, avg=avg))
+        s.add(CardLatest(card_id=cid, ts=datetime.utcnow(), avg5=base, avg7_price=base, supply=rng.randint(1, 300)))
+        for k in range(4):
+            s.add(SingleCardOffer(card_id=cid, seller_name=f"s{k}", price=round(base * rng.uniform(0.6, 1.2), 2)))
+    s.commit()
+    yield s
+    s.close()
+
+
+def scrape(session, card_id, offers, avg5):
+    stats = {"low": min(offers, default=None), "avg5": avg5, "n_seen": len(offers), "supply": 3,
+             "from_price": None, "price_trend": None, "avg7_price": avg5, "avg1_price": None}
+    write_batch(session, [{"kind": "single", "card_id": card_id, "ts": datetime.utcnow(), "stats": stats,
+                           "offers": [{"seller": f"n{i}", "price": p, "country": "DE"} for i, p in enumerate(offers)],
+                           "psa10": None, "archive": None}])
+    session.commit()
+
+
+def key(deals):
+    return [(d["card"].id, d["offer"].id, round(d["score"], 9)) for d in deals[:len(deals)]]
+
+
+def test_cache_hits_then_patches_changed_cards(session):
+    cache = DealCache(max_age=3600)
+    assert key(cache.ranked(session)) == key(calculate_deals(session))
+    assert (cache.misses, cache.hits) == (1, 0)
+
+    session.statements.clear()
+    ranked = cache.ranked(session)
+    assert cache.hits == 1 and len(session.statements) == 1  # change check only
+    assert key(ranked) == key(calculate_deals(session))
+
+    scrape(session, 7, [1.0, 2.5, 300.0], avg5=50.0)
+    scrape(session, 8, [], avg5=40.0)
+    ranked = cache.ranked(session)
+    assert cache.patches == 1
+    assert key(ranked) == key(calculate_deals(session))
+    assert any(d["card"].id == 7 and d["offer"].price == 1.0 for d in ranked[:5])
+    assert all(d["card"].id != 8 for d in ranked[:len(ranked)])
+
+    stats = cache.stats()
+    assert stats["hit_ratio"] == pytest.approx(1 / 3)
+    assert stats["rankings"][0]["deals"] == len(ranked)
+
+
+def test_late_commit_below_watermark_is_patched(session):
+    cache = DealCache(max_age=3600, overlap=60)
+    cache.ranked(session)
+    scrape(session, 7, [1.0], avg5=50.0)
+    cache.ranked(session)
+    mark = session.get(CardLatest, 7).updated
+
+    # Stamped before card 7 but committed after it (e.g. by another process).
+    scrape(session, 9, [0.01], avg5=500.0)
+    session.get(CardLatest, 9).updated = mark - timedelta(seconds=1)
+    session.commit()
+    ranked = cache.ranked(session)
+    assert cache.patches == 2
+    assert key(ranked) == key(calculate_deals(session))
+    assert any(d["card"].id == 9 and d["offer"].price == 0.01 for d in ranked[:5])
+
+    cache.ranked(session)
+    assert cache.patches == 2 and cache.hits == 1
+
+
+def test_card_edit_rebuilds(session):
+    cache = DealCache(max_age=3600)
+    before = cache.ranked(session)
+    top = before[0]["card"]
+    top.is_enabled = 0
+    session.commit()
+    after = cache.ranked(session)
+    assert cache.misses == 2
+    assert all(d["card"].id != top.id for d in after[:len(after)])
+    assert key(after) == key(calculate_deals(session))
+
+
+def test_cursor_resumes_after_refresh(session):
+    cache = DealCache(max_age=3600)
+    ranked = cache.ranked(session)
+    assert ranked.after(ranked.cursor(9)) == 10
+    assert ranked.after("garbage") == 0
+    cursor, nxt = ranked.cursor(9), ranked[10]
+
+    # A better deal for another card ranks above the cursor: the next page
+    # still starts at the deal that followed it.
+    scrape(session, ranked[20]["card"].id, [0.01], avg5=500.0)
+    refreshed = cache.ranked(session)
+    resumed = refreshed[refreshed.after(cursor)]
+    assert (resumed["card"].id, resumed["offer"].id) == (nxt["card"].id, nxt["offer"].id)
+
+
+def test_market_sentiment_bulk_and_cached(session):
+    cards = session.query(SingleCard).filter(SingleCard.is_enabled == 1).filter(
+        (SingleCard.category != 'Ignore') | (SingleCard.category.is_(None))).all()
+    trends = [compute_single_trend(session, c.id, lookback_days=7) for c in cards]
+    expected = {"rising": trends.count("up"), "falling": trends.count("down"), "flat": trends.count("flat")}
+    assert get_market_sentiment(session) == expected
+
+    session.statements.clear()
+    assert get_market_sentiment(session) == expected
+    assert len(session.statements) == 1  # version check only
+
+    up = next(c for c, t in zip(cards, trends) if t == "up")
+    up.category = "Ignore"
+    session.commit()
+    expected["rising"] -= 1
+    assert get_market_sentiment(session) == expected
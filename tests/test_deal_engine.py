@@ -0,0 +1,146 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import Base, CardLatest, SingleCard, SingleCardDaily, SingleCardOffer
+from scraper import compute_single_trend
+from tracker_utils.deal_finder import calculate_deals
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, future=True)()
+    # The offers query runs on the DBAPI cursor, so count at the SQLite level.
+    s.statements = []
+    s.connection().connection.driver_connection.set_trace_callback(
+        lambda sql: sql.startswith("SELECT") and s.statements.append(sql))
+    yield s
+    s.close()
+
+
+def populate(session, n, seed=5):
+    rng = random.Random(seed)
+    today = date.today()
+    names = ["Luffy", "Zoro", "Nami Championship", "Sanji", "Robin Prize"]
+    for cid in range(1, n + 1):
+        session.add(SingleCard(
+            id=cid, name=f"{rng.choice(names)} {cid}", url=f"https://cm/{cid}" + ("/special-tournaments-promos" * (cid % 13 == 0)),
+            language=rng.choice(["English", "English", "Japanese"]), is_enabled=int(cid % 11 != 0),
+            category=rng.choice([None, "Leader", "Booster Pack"]),
+        ))
+        base = rng.choice([0.0, 5.0, 40.0, 300.0, 6000.0])
+        for i in range(rng.randint(0, 15)):
+            avg = rng.choice([None, 0.0, base * (1 + rng.uniform(-0.15, 0.15) * (i >= 7))])
+            session.add(SingleCardDaily(card_id=cid, day=today - timedelta(days=i), low=avg, avg=avg))
+        if rng.random() < 0.9:
+            session.add(CardLatest(
+                card_id=cid, ts=None if rng.random() < 0.05 else datetime.utcnow(),
+                avg5=rng.choice([None, base]), avg7_price=rng.choice([None, 0.0, base * 1.1]),
+                supply=rng.choice([None, 3, 20, 120, 500]),
+            ))
+        for k in range(rng.randint(0, 6)):
+            session.add(SingleCardOffer(card_id=cid, seller_name=f"s{k}", country="DE",
+                                        price=round(rng.uniform(0.5, 1.3) * (base or 10.0), 2)))
+    session.commit()
+
+
+def old_deals(session, include_promos=False, english_only=True, include_packs=False, language=None):
+    """The per-card loop ``calculate_deals`` used to run."""
+    query = session.query(SingleCard).filter(SingleCard.is_enabled == 1)
+    if language and language != "All":
+        query = query.filter(SingleCard.language == language)
+    elif english_only:
+        query = query.filter(SingleCard.language == "English")
+    deals = []
+    for card in query.order_by(SingleCard.id):
+        if not include_packs and card.category and "pack" in card.category.lower():
+            continue
+        latest = session.get(CardLatest, card.id)
+        if not latest or latest.ts is None:
+            continue
+        offers = session.query(SingleCardOffer).filter_by(card_id=card.id).order_by(SingleCardOffer.price).all()
+        if not offers or (latest.avg5 or 0) > 5000:
+            continue
+        if not include_promos and ("special-tournaments-promos" in card.url.lower() or any(
+                x in card.name.lower() for x in ["championship", "serial", "treasure cup", "regional", "prize"])):
+            continue
+        rows = (session.query(SingleCardDaily).filter(SingleCardDaily.card_id == card.id)
+                .order_by(SingleCardDaily.day.desc()).limit(7).all())
+        avgs = [d.avg for d in rows if d.avg]
+        internal = sum(avgs) / len(avgs) if avgs else (latest.avg5 or 0)
+        website = latest.avg7_price or internal
+        if internal == 0 and website == 0:
+            continue
+        mv = 0.5 * internal + 0.5 * website
+        trend = compute_single_trend(session, card.id, lookback_days=7)
+        trend_mult = {"up": 1.1, "down": 0.9}.get(trend, 1.0)
+        supply = latest.supply or 0
+        supply_mult = 1.15 if supply < 10 else 1.05 if supply < 50 else 0.95 if supply > 200 else 1.0
+        if trend == "up" and supply < 50:
+            trend_mult += 0.05
+        if trend == "down" and supply > 100:
+            trend_mult -= 0.05
+        for offer in offers:
+            if mv <= 0:
+                continue
+            discount = (mv - offer.price) / mv * 100.0
+            if discount < -10 or offer.price > 5000:
+                continue
+            deals.append({"card": card.id, "offer": offer.id, "mv": mv, "discount_pct": discount,
+                          "score": discount * trend_mult * supply_mult, "trend": trend, "supply": supply})
+    deals.sort(key=lambda x: x["score"], reverse=True)
+    return deals
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"include_promos": True, "include_packs": True},
+    {"language": "All", "english_only": False},
+    {"language": "Japanese", "include_packs": True},
+])
+def test_calculate_deals_matches_per_card_loop(session, kwargs):
+    populate(session, 120)
+    expected = old_deals(session, **kwargs)
+    deals = calculate_deals(session, **kwargs)
+    assert len(deals) == len(expected) > 0
+    got = [{**d, "card": d["card"].id, "offer": d["offer"].id} for d in deals]
+    assert [d["score"] for d in got] == pytest.approx([d["score"] for d in expected])
+    for d, e in zip(got, expected):
+        assert (d["card"], d["trend"], d["supply"]) == (e["card"], e["trend"], e["supply"])
+        assert d["mv"] == pytest.approx(e["mv"])
+        assert d["discount_pct"] == pytest.approx(e["discount_pct"])
+
+
+def test_calculate_deals_pages_and_query_count(session):
+    populate(session, 120)
+    session.statements.clear()
+    deals = calculate_deals(session, english_only=False, include_packs=True)
+    few = len(session.statements)
+    page = deals[10:20]
+    assert len(page) == 10 and page[0] == deals[10] and deals[-1] == deals[len(deals) - 1]
+    assert page[0]["offer"].seller_name and page[0]["card"].name and deals[5:5] == []
+    assert deals[len(deals):] == []
+
+    session.add_all([SingleCard(id=i, name=f"x{i}", url=f"x{i}", language="English") for i in range(121, 321)])
+    session.commit()
+    session.statements.clear()
+    calculate_deals(session, english_only=False, include_packs=True)
+    assert len(session.statements) == few == 4
+
+
+def test_deals_whose_offer_was_removed_are_skipped(session):
+    populate(session, 120)
+    deals = calculate_deals(session, english_only=False, include_packs=True)
+    page = deals[10:20]
+    session.query(SingleCardOffer).filter(SingleCardOffer.id == page[3]["offer"].id).delete()
+    session.commit()
+    remaining = deals[10:20]
+    assert [d["offer"].id for d in remaining] == [d["offer"].id for d in page[:3] + page[4:]]
+    assert len(list(deals)) == len(deals) - 1
+    with pytest.raises(LookupError):
+        deals[13]
@@ -0,0 +1,122 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import Base, PageArchive, Product, Price, Daily, SingleCard, SingleCardPrice, SingleCardOffer, SingleCardDaily
+from html_archive import HtmlArchive, replay_sealed, replay_singles
+from page_parser import ParsedPage
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "cardmarket")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, future=True)()
+    yield s
+    s.close()
+
+
+@pytest.mark.parametrize("codec", ["zlib", pytest.param("zstd", marks=pytest.mark.skipif(
+    not __import__("html_archive").zstd_available(), reason="zstandard not installed"))])
+def test_blobs_are_content_addressed_and_round_trip(tmp_path, codec):
+    archive = HtmlArchive(root=str(tmp_path), codec=codec, level=3)
+    html = load("single_japanese.html")
+    sha, used, size = archive.put(html)
+    assert used == codec
+    assert size == len(html.encode("utf-8"))
+    assert archive.put(html) == (sha, codec, size)
+    assert len(list(tmp_path.rglob("*.*"))) == 1
+    assert os.path.getsize(archive.path(sha, codec)) < size / 3
+    assert archive.get(sha, codec) == html
+
+
+def test_replay_rewrites_prices_offers_and_daily(tmp_path, session):
+    archive = HtmlArchive(root=str(tmp_path), codec="zlib")
+    card = SingleCard(id=1, name="Monkey.D.Luffy", url="https://x/1", language="English")
+    session.add(card)
+    ts = datetime(2026, 10, 1, 12, 0)
+    html = load("single_expanded_300.html")
+    # A row written by an older, broken parser, plus a stale offer.
+    session.add(SingleCardPrice(card_id=1, ts=ts, low=999.0, avg5=999.0, n_seen=1))
+    session.add(SingleCardOffer(card_id=1, seller_name="old", price=1.0, ts=ts))
+    archive.record(session, "single", 1, card.url, html, ts)
+    # A page whose price row was never written at all.
+    later = ts + timedelta(hours=4)
+    archive.record(session, "single", 1, card.url, html, later)
+    session.commit()
+
+    dry = replay_singles(session, archive, dry_run=True)
+    assert dry == {"pages": 2, "updated": 1, "inserted": 1, "cards": 1}
+    assert session.query(SingleCardPrice).count() == 1
+
+    replay_singles(session, archive)
+    offers = ParsedPage(html).offers("English")
+    prices = session.query(SingleCardPrice).order_by(SingleCardPrice.ts).all()
+    assert [p.ts for p in prices] == [ts, later]
+    assert all(p.low == min(o["price"] for o in offers) for p in prices)
+    stored = session.query(SingleCardOffer).all()
+    assert sorted(o.seller_name for o in stored) == sorted(o["seller"] for o in offers)
+    assert {o.ts for o in stored} == {later}
+    daily = session.query(SingleCardDaily).one()
+    assert daily.day == ts.date() and daily.low == prices[0].low
+
+
+def test_replay_sealed(tmp_path, session):
+    archive = HtmlArchive(root=str(tmp_path), codec="zlib")
+    session.add(Product(id=7, name="OP-01 Booster Box", url="https://x/7", country="Germany"))
+    ts = datetime(2026, 10, 2, 8, 30)
+    html = load("sealed_booster_box.html")
+    archive.record(session, "sealed", 7, "https://x/7", html, ts)
+    session.commit()
+
+    assert replay_sealed(session, archive) == {"pages": 1, "updated": 0, "inserted": 1, "products": 1}
+    prices = ParsedPage(html).country_prices("Germany")
+    row = session.query(Price).one()
+    assert (row.ts, row.low, row.n_seen) == (ts, min(prices), len(prices))
+    assert session.query(Daily).one().low == min(prices)
+
+
+def test_prune_keeps_newest_page_and_referenced_blobs(tmp_path, session):
+    archive = HtmlArchive(root=str(tmp_path), codec="zlib")
+    old = datetime.utcnow() - timedelta(days=90)
+    archive.record(session, "single", 1, "u1", "<html>a</html>", old)
+    archive.record(session, "single", 1, "u1", "<html>b</html>", old + timedelta(days=1))
+    archive.record(session, "single", 2, "u2", "<html>only</html>", old)
+    archive.record(session, "single", 1, "u1", "<html>c</html>", datetime.utcnow())
+    session.commit()
+    for blob in tmp_path.rglob("*.zz"):
+        os.utime(blob, (old.timestamp(), old.timestamp()))
+    # Written by a scraper whose index row is not committed yet.
+    pending, codec, _ = archive.put("<html>pending</html>")
+
+    rows, blobs = archive.prune(session, keep_days=30)
+    assert (rows, blobs) == (2, 2)
+    remaining = {(r.ref_id, archive.get(r.sha256, r.codec)) for r in session.query(PageArchive)}
+    assert remaining == {(1, "<html>c</html>"), (2, "<html>only</html>")}
+    assert len(list(tmp_path.rglob("*.zz"))) == 3
+    assert archive.get(pending, codec) == "<html>pending</html>"
+
+
+def test_replay_keeps_offers_when_newest_page_has_no_prices(tmp_path, session):
+    archive = HtmlArchive(root=str(tmp_path), codec="zlib")
+    session.add(SingleCard(id=1, name="Monkey.D.Luffy", url="https://x/1", language="English"))
+    ts = datetime(2026, 10, 1, 12, 0)
+    html = load("single_expanded_300.html")
+    archive.record(session, "single", 1, "https://x/1", html, ts)
+    archive.record(session, "single", 1, "https://x/1", "<html><body>Cloudflare</body></html>",
+                   ts + timedelta(hours=4))
+    session.commit()
+
+    replay_singles(session, archive)
+    stored = session.query(SingleCardOffer).all()
+    assert len(stored) == len(ParsedPage(html).offers("English")) and {o.ts for o in stored} == {ts}
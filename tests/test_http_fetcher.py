@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+import scraper
+from http_fetcher import is_challenge
+from scrape_metrics import FetchStats
+from scrape_pool import HostRateLimiter
+
+PRODUCT_HTML = "<html><head><title>Monkey.D.Luffy | Cardmarket</title></head><body></body></html>"
+
+
+@pytest.mark.parametrize("status, headers, text, expected", [
+    (200, {}, PRODUCT_HTML, False),
+    (403, {}, PRODUCT_HTML, True),
+    (503, {}, "", True),
+    (200, {"cf-mitigated": "challenge"}, PRODUCT_HTML, True),
+    (200, {}, "<html><head><title>Just a moment...</title>", True),
+    (200, {}, "<html><head><title>www.cardmarket.com</title>", True),
+    (200, {}, "<title>Queue</title><h1>You are now in line</h1>", True),
+])
+def test_is_challenge(status, headers, text, expected):
+    assert is_challenge(status, headers, text) is expected
+
+
+class FakeFetcher:
+    def __init__(self, html):
+        self.html = html
+        self.calls = 0
+        self.synced = 0
+
+    async def fetch(self, context, url, card_name=None):
+        self.calls += 1
+        return self.html
+
+    async def sync_cookies(self, context):
+        self.synced += 1
+
+
+@pytest.fixture
+def fetch_env(monkeypatch):
+    browser_calls = []
+
+    async def fake_fetch_page(context, url, expand_results=False, card_name=None, page=None, run=None):
+        browser_calls.append((url, expand_results))
+        return "<html>browser</html>"
+
+    run = scraper.ScrapeRun("Single-card")
+    run.fetch_stats = stats = FetchStats(cpu_clock=lambda: 0.0)
+    monkeypatch.setattr(scraper, "fetch_page", fake_fetch_page)
+    monkeypatch.setattr(scraper, "HOST_LIMITER", HostRateLimiter(60_000, burst=100))
+    monkeypatch.setattr(scraper, "update_scraper_status", lambda *a: None)
+    return browser_calls, run
+
+
+def test_http_mode_serves_page_without_browser(fetch_env, monkeypatch):
+    browser_calls, run = fetch_env
+    stats = run.fetch_stats
+    fetcher = FakeFetcher(PRODUCT_HTML)
+    monkeypatch.setattr(scraper, "HTTP_FETCHER", fetcher)
+
+    html = asyncio.run(scraper.fetch_html(None, "https://www.cardmarket.com/x", run=run))
+    assert html == PRODUCT_HTML
+    assert browser_calls == []
+    assert stats.modes["http"][0] == 1
+
+
+def test_http_mode_falls_back_on_challenge(fetch_env, monkeypatch):
+    browser_calls, run = fetch_env
+    stats = run.fetch_stats
+    fetcher = FakeFetcher(None)
+    monkeypatch.setattr(scraper, "HTTP_FETCHER", fetcher)
+
+    html = asyncio.run(scraper.fetch_html(None, "https://www.cardmarket.com/x", run=run))
+    assert html == "<html>browser</html>"
+    assert browser_calls == [("https://www.cardmarket.com/x", False)]
+    assert fetcher.synced == 1
+    assert stats.modes["fallback"][0] == 1
+
+
+def test_expand_results_always_uses_browser(fetch_env, monkeypatch):
+    browser_calls, run = fetch_env
+    stats = run.fetch_stats
+    fetcher = FakeFetcher(PRODUCT_HTML)
+    monkeypatch.setattr(scraper, "HTTP_FETCHER", fetcher)
+
+    asyncio.run(scraper.fetch_html(None, "https://www.cardmarket.com/x", expand_results=True, run=run))
+    assert fetcher.calls == 0
+    assert browser_calls == [("https://www.cardmarket.com/x", True)]
+    assert stats.modes["browser"][0] == 1
+
+
+def test_fetch_stats_report():
+    clock = iter([0.0, 0.4, 1.0, 3.0])
+    stats = FetchStats(cpu_clock=lambda: next(clock))
+    stats.record("http", stats.start())
+    stats.record("browser", stats.start())
+    report = stats.report("Single-card")
+    assert "http" in report and "0.40 s CPU/page" in report
+    assert "2.00 s CPU/page" in report
+
+
+def test_fetch_stats_default_clock_does_not_walk_proc(monkeypatch):
+    import scrape_metrics
+
+    monkeypatch.setattr(scrape_metrics.os, "listdir", lambda *a: pytest.fail("walked /proc"))
+    stats = FetchStats()
+    stats.record("browser", stats.start())
+    assert stats.modes["browser"][0] == 1
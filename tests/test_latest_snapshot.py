@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import (
+    Base,
+    CardLatest,
+    Price,
+    Product,
+    ProductLatest,
+    PSA10Price,
+    SingleCard,
+    SingleCardPrice,
+)
+from latest_snapshot import card_snapshot, refresh_card_latest, refresh_product_latest, refresh_stale
+from scrape_writer import write_batch
+
+NOW = datetime(2026, 10, 17, 12)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, future=True)()
+    s.add(SingleCard(id=1, name="c1", url="u1", language="English"))
+    s.add(Product(id=1, name="box", url="p1", country="Germany"))
+    s.commit()
+    yield s
+    s.close()
+
+
+def history(session):
+    session.add_all([
+        SingleCardPrice(card_id=1, ts=NOW - timedelta(days=100), low=None),
+        SingleCardPrice(card_id=1, ts=NOW - timedelta(days=90), low=20.0),
+        SingleCardPrice(card_id=1, ts=NOW - timedelta(days=30), low=15.0),
+        SingleCardPrice(card_id=1, ts=NOW - timedelta(days=7), low=None, supply=100),
+        SingleCardPrice(card_id=1, ts=NOW, low=10.0, supply=80, avg5=20.0, from_price=9.0,
+                        price_trend=11.0, avg7_price=12.0, avg1_price=10.5),
+        PSA10Price(card_id=1, ts=NOW - timedelta(days=1), low=300.0),
+        PSA10Price(card_id=1, ts=NOW, low=250.0),
+    ])
+    session.flush()
+
+
+def test_card_snapshot_holds_latest_first_and_as_of_values(session):
+    history(session)
+    assert refresh_card_latest(session, [1, 2], now=NOW) == 1
+    session.commit()
+    snap = session.get(CardLatest, 1)
+    assert (snap.ts, snap.low, snap.avg5, snap.supply, snap.from_price, snap.avg7_price) == (
+        NOW, 10.0, 20.0, 80, 9.0, 12.0)
+    assert (snap.first_low, snap.low_24h, snap.low_7d, snap.low_30d, snap.low_90d) == (20.0, None, None, 15.0, 20.0)
+    assert snap.supply_7d == 100
+    assert (snap.psa10_low, snap.psa10_ts) == (250.0, NOW)
+    assert session.get(CardLatest, 2) is None
+
+    # A card with PSA10 prices only still gets a row.
+    session.add(SingleCard(id=2, name="c2", url="u2", language="English"))
+    session.add(PSA10Price(card_id=2, ts=NOW, low=99.0))
+    refresh_card_latest(session, [2], now=NOW)
+    assert (session.get(CardLatest, 2).ts, session.get(CardLatest, 2).psa10_low) == (None, 99.0)
+
+    # Refreshing moves the as-of window instead of adding rows.
+    later = NOW + timedelta(days=1, hours=1)
+    session.add(SingleCardPrice(card_id=1, ts=later, low=12.0))
+    refresh_card_latest(session, [1], now=later)
+    session.commit()
+    snap = session.get(CardLatest, 1)
+    assert (snap.low, snap.low_24h, snap.supply) == (12.0, 10.0, None)
+
+
+def test_card_snapshot_falls_back_to_prices_without_storing(session):
+    history(session)
+    snap = card_snapshot(session, 1)
+    assert (snap.low, snap.first_low) == (10.0, 20.0)
+    assert session.query(CardLatest).count() == 0
+
+
+def test_writer_refreshes_snapshots_in_the_batch_transaction(session):
+    stats = {"low": 2.0, "avg5": 3.0, "n_seen": 2, "supply": 9}
+    write_batch(session, [
+        {"kind": "single", "card_id": 1, "ts": NOW, "stats": stats, "offers": [], "psa10": None, "archive": None},
+        {"kind": "sealed", "product_id": 1, "ts": NOW, "stats": stats, "archive": None},
+    ])
+    session.commit()
+    assert (session.get(CardLatest, 1).low, session.get(ProductLatest, 1).supply) == (2.0, 9)
+
+
+def test_product_snapshot(session):
+    session.add_all([Price(product_id=1, ts=NOW - timedelta(hours=30), low=50.0, avg5=55.0, n_seen=5),
+                     Price(product_id=1, ts=NOW, low=45.0, avg5=48.0, n_seen=5, supply=12)])
+    refresh_product_latest(session, [1], now=NOW)
+    snap = session.query(ProductLatest).one()
+    assert (snap.low, snap.first_low, snap.low_24h, snap.low_7d, snap.supply) == (45.0, 50.0, 50.0, None, 12)
+
+
+def test_refresh_stale_ages_snapshots_of_cards_no_longer_scraped(session):
+    history(session)
+    session.add(SingleCard(id=2, name="c2", url="u2", language="English"))
+    session.add(SingleCardPrice(card_id=2, ts=NOW, low=5.0))
+    refresh_card_latest(session, [1, 2], now=NOW)
+    session.commit()
+    assert session.get(CardLatest, 1).low_24h is None
+
+    # Card 2 is scraped again the next day; card 1 is not.
+    later = NOW + timedelta(days=2)
+    session.add(SingleCardPrice(card_id=2, ts=later, low=4.0))
+    refresh_card_latest(session, [2], now=later)
+    session.commit()
+
+    assert refresh_stale(session, now=later) == (1, 0)
+    snap = session.get(CardLatest, 1)
+    assert (snap.low, snap.low_24h, snap.low_30d, snap.updated) == (10.0, 10.0, 15.0, later)
+    assert refresh_stale(session, now=later) == (0, 0)
+
+
+def test_refresh_stale_creates_missing_snapshots(session):
+    history(session)
+    session.add(Price(product_id=1, ts=NOW, low=45.0, avg5=48.0, n_seen=5, supply=12))
+    session.commit()
+    assert session.query(CardLatest).count() == session.query(ProductLatest).count() == 0
+
+    assert refresh_stale(session, now=NOW) == (1, 1)
+    assert (session.get(CardLatest, 1).low, session.get(ProductLatest, 1).low) == (10.0, 45.0)
+    assert refresh_stale(session, now=NOW) == (0, 0)
@@ -0,0 +1,84 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from db import Base, Daily, Price, Product, ProductLatest
+from latest_snapshot import refresh_product_latest
+from scraper import compute_trend, is_heads_up
+from tracker_utils.market_stats import classify_trend, product_index
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, future=True)()
+    s.statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: s.statements.append(a[2]))
+    yield s
+    s.close()
+
+
+def populate(session, n, seed=3):
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow()
+    for pid in range(1, n + 1):
+        session.add(Product(id=pid, name=f"box {pid:05d}", url=f"u{pid}", country="Germany"))
+        for i in range(rng.randint(0, 16)):
+            avg = 100.0 * (1 + rng.uniform(-0.2, 0.2) * (i >= 7))
+            session.add(Daily(product_id=pid, day=today - timedelta(days=i), low=avg, avg=avg))
+        for hours in rng.sample([1, 20, 30, 200, 800, 2000], rng.randint(0, 4)):
+            low = rng.uniform(70, 120)
+            session.add(Price(product_id=pid, ts=now - timedelta(hours=hours), low=low, avg5=low, n_seen=5))
+    session.flush()
+    refresh_product_latest(session, range(1, n + 1))
+    session.commit()
+
+
+def test_classify_trend():
+    assert classify_trend(104, 100) == "up"
+    assert classify_trend(96, 100) == "down"
+    assert classify_trend(102, 100) == "flat"
+    assert classify_trend(None, 100) == classify_trend(5, 0) == "flat"
+
+
+def test_product_index_matches_per_product_helpers(session):
+    populate(session, 40)
+    rows = product_index(session)
+    assert [r["name"] for r in rows] == sorted(r["name"] for r in rows)
+    for row in rows:
+        heads, now_low, avg7 = is_heads_up(session, row["id"])
+        assert row["trend"] == compute_trend(session, row["id"])
+        assert row["heads"] == heads
+        assert row["avg7"] == pytest.approx(avg7)
+        assert row["current_low"] == now_low
+
+
+def test_product_index_query_count_is_flat(session):
+    populate(session, 5)
+    session.statements.clear()
+    product_index(session)
+    few = len(session.statements)
+
+    for pid in range(6, 206):
+        session.add(Product(id=pid, name=f"more {pid}", url=f"m{pid}", country="Spain"))
+    session.commit()
+    session.statements.clear()
+    assert len(product_index(session)) == 205
+    assert len(session.statements) == few == 1
+
+
+def test_product_without_snapshot_falls_back_to_prices(session):
+    now = datetime.utcnow()
+    session.add(Product(id=1, name="box", url="u1", country="Germany"))
+    session.add_all([Price(product_id=1, ts=now - timedelta(days=2), low=50.0, avg5=55.0, n_seen=5, supply=10),
+                     Price(product_id=1, ts=now, low=45.0, avg5=48.0, n_seen=5, supply=12)])
+    session.commit()
+    row, = product_index(session)
+    assert (row["current_low"], row["first_low"], row["supply"]) == (45.0, 50.0, 12)
+    assert row["pct24"] == pytest.approx(-10.0)
+    assert session.query(ProductLatest).count() == 0  # computed, not stored
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import Base, OfferEvent, SingleCard, SingleCardOffer
+from offer_sync import diff_offers, offer_events_since, reconcile_offers
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, future=True)()
+    s.add(SingleCard(id=1, name="Luffy", url="https://x/1", language="English"))
+    s.commit()
+    yield s
+    s.close()
+
+
+def offer(seller, price, country="Germany"):
+    return {"seller": seller, "country": country, "price": price}
+
+
+def test_diff_offers_classifies_changes():
+    class Row:
+        def __init__(self, seller_name, price, country="Germany"):
+            self.seller_name, self.price, self.country = seller_name, price, country
+
+    a, b1, b2, c = Row("a", 10.0), Row("b", 12.0), Row("b", 15.0), Row("c", 20.0)
+    unchanged, repriced, delisted, listed = diff_offers(
+        [a, b1, b2, c],
+        [offer("a", 10.0), offer("b", 12.0), offer("b", 14.0), offer("d", 30.0), offer("c", 20.0, "France")],
+    )
+    assert unchanged == [a, b1]
+    assert [(r.seller_name, r.price, o["price"]) for r, o in repriced] == [("b", 15.0, 14.0)]
+    assert delisted == [c]
+    assert [(o["seller"], o["country"]) for o in listed] == [("d", "Germany"), ("c", "France")]
+
+
+def test_reconcile_keeps_unchanged_rows_and_records_events(session):
+    t0 = datetime(2026, 10, 1, 12)
+    t1 = t0 + timedelta(hours=4)
+    reconcile_offers(session, {1: (t0, [offer("a", 10.0), offer("b", 12.0), offer("c", 20.0)])})
+    session.commit()
+    ids = {o.seller_name: o.id for o in session.query(SingleCardOffer)}
+
+    counts = reconcile_offers(session, {1: (t1, [offer("a", 10.0), offer("b", 11.5), offer("d", 9.0)])})
+    session.commit()
+    assert counts == {"unchanged": 1, "repriced": 1, "delisted": 1, "listed": 1}
+
+    rows = {o.seller_name: o for o in session.query(SingleCardOffer)}
+    assert set(rows) == {"a", "b", "d"}
+    assert rows["a"].id == ids["a"] and (rows["a"].ts, rows["a"].first_seen, rows["a"].last_seen) == (t0, t0, t1)
+    assert rows["b"].id == ids["b"] and (rows["b"].price, rows["b"].ts, rows["b"].first_seen) == (11.5, t1, t0)
+    assert (rows["d"].first_seen, rows["d"].last_seen) == (t1, t1)
+
+    first = offer_events_since(session)
+    assert [e.event for e in first[:3]] == ["listed"] * 3
+    later = offer_events_since(session, after_id=first[2].id)
+    assert sorted((e.event, e.seller_name, e.price, e.old_price) for e in later) == [
+        ("delisted", "c", 20.0, None), ("listed", "d", 9.0, None), ("repriced", "b", 11.5, 12.0)]
+    assert offer_events_since(session, after_id=later[-1].id) == []
+
+
+def test_reconcile_without_events(session):
+    reconcile_offers(session, {1: (datetime(2026, 10, 1), [offer("a", 10.0)])}, record_events=False)
+    session.commit()
+    assert session.query(SingleCardOffer).count() == 1
+    assert session.query(OfferEvent).count() == 0
@@ -0,0 +1,75 @@
+import os
+
+import page_parser
+from page_parser import ParsedPage, as_page
+from scraper import (
+    parse_prices_for_country,
+    parse_single_card_offers,
+    parse_single_card_summary,
+    parse_supply,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "cardmarket")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_parsed_page_builds_a_single_tree(monkeypatch):
+    built = []
+    real = page_parser.BeautifulSoup
+
+    def counting(*args, **kwargs):
+        built.append(args[1:])
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(page_parser, "BeautifulSoup", counting)
+
+    page = ParsedPage(load("single_japanese.html"), backend="bs4")
+    page.offers("Japanese")
+    page.summary()
+    page.supply()
+    page.psa10_offers()
+    page.country_prices("Germany")
+
+    assert len(built) == 1
+
+
+def test_scraper_helpers_accept_parsed_page_or_html():
+    html = load("single_monkey_d_luffy.html")
+    page = ParsedPage(html)
+    assert as_page(page) is page
+    assert parse_supply(page) == parse_supply(html) == 2735
+    assert parse_single_card_summary(page) == parse_single_card_summary(html)
+    assert parse_prices_for_country(page, "Germany") == parse_prices_for_country(html, "Germany")
+    assert parse_single_card_offers(page, "Japanese") == parse_single_card_offers(html, "Japanese")
+
+
+def test_summary_reads_definition_list():
+    summary = ParsedPage(load("single_japanese.html")).summary()
+    assert summary == {"from_price": 18.22, "price_trend": 13.31, "avg7": 36.72, "avg1": 88.13}
+
+
+def test_offers_are_filtered_capped_and_sorted():
+    offers = ParsedPage(load("single_expanded_300.html")).offers("English", is_sealed=True)
+    assert len(offers) == 20
+    assert [o["price"] for o in offers] == sorted(o["price"] for o in offers)
+    assert all(set(o) == {"seller", "price", "country"} for o in offers)
+
+
+def test_psa10_offers_match_comments():
+    offers = ParsedPage(load("sealed_booster_box.html")).psa10_offers()
+    assert offers
+    for o in offers:
+        text = o["comment"].lower()
+        assert "psa10" in text or "psa 10" in text or "psa-10" in text
+
+
+def test_challenge_page_yields_nothing():
+    page = ParsedPage(load("cloudflare_challenge.html"))
+    assert page.offers("English") == []
+    assert page.country_prices("Germany") == []
+    assert page.supply() is None
+    assert page.psa10_offers() == []
@@ -0,0 +1,45 @@
+import asyncio
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from page_ready import READY_SELECTOR, goto_ready
+
+
+class FakePage:
+    def __init__(self, selector_appears=True):
+        self.selector_appears = selector_appears
+        self.calls = []
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        self.calls.append(("goto", wait_until))
+        return "response"
+
+    async def wait_for_selector(self, selector, state=None, timeout=None):
+        self.calls.append(("selector", selector))
+        if not self.selector_appears:
+            raise PlaywrightTimeoutError("selector timeout")
+
+    async def wait_for_load_state(self, state, timeout=None):
+        self.calls.append(("load_state", state))
+
+
+def test_selector_strategy_skips_networkidle():
+    page = FakePage()
+    resp, outcome, seconds = asyncio.run(goto_ready(page, "https://x", strategy="selector"))
+    assert (resp, outcome) == ("response", "selector")
+    assert seconds >= 0
+    assert page.calls == [("goto", "domcontentloaded"), ("selector", READY_SELECTOR)]
+
+
+def test_falls_back_to_networkidle_when_selector_missing():
+    page = FakePage(selector_appears=False)
+    _, outcome, _ = asyncio.run(goto_ready(page, "https://x", strategy="selector", ready_timeout_ms=10))
+    assert outcome == "fallback"
+    assert page.calls[-1] == ("load_state", "networkidle")
+
+
+def test_networkidle_strategy_is_the_old_behaviour():
+    page = FakePage()
+    _, outcome, _ = asyncio.run(goto_ready(page, "https://x", strategy="networkidle"))
+    assert outcome == "networkidle"
+    assert page.calls == [("goto", "networkidle")]
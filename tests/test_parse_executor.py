@@ -0,0 +1,117 @@
+import asyncio
+import os
+
+import pytest
+
+from parse_executor import (
+    ParseExecutor,
+    available_cpus,
+    parse_sealed_html,
+    parse_single_card_html,
+    sealed_stats,
+    single_card_stats,
+)
+from page_parser import ParsedPage
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "cardmarket")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_every_mode_returns_the_same_plain_dicts(mode):
+    html = load("single_japanese.html")
+    executor = ParseExecutor(mode=mode, workers=2)
+    try:
+        result = asyncio.run(
+            executor.run(parse_single_card_html, html, "Japanese", is_sealed=False, with_psa10=True)
+        )
+    finally:
+        executor.shutdown()
+
+    page = ParsedPage(html)
+    expected = {
+        "offers": page.offers("Japanese"),
+        "summary": page.summary(),
+        "supply": page.supply(),
+        "psa10": page.psa10_offers(),
+    }
+    expected["stats"] = single_card_stats(expected)
+    assert result == expected
+
+
+def test_process_workers_are_spawned_not_forked():
+    executor = ParseExecutor(mode="process", workers=1)
+    try:
+        assert executor._executor()._mp_context.get_start_method() == "spawn"
+    finally:
+        executor.shutdown()
+
+
+def test_parse_sealed_html():
+    html = load("sealed_booster_box.html")
+    page = ParsedPage(html)
+    expected = {
+        "prices": page.country_prices("Germany"),
+        "supply": page.supply(),
+    }
+    expected["stats"] = sealed_stats(expected)
+    assert parse_sealed_html(html, "Germany") == expected
+
+
+def test_single_card_stats():
+    parsed = {
+        "offers": [{"price": p} for p in (1.0, 2.0, 3.0, 4.0, 5.0, 60.0)],
+        "summary": {"from_price": 0.9, "price_trend": 2.5, "avg7": None, "avg1": 2.0},
+        "supply": 42,
+    }
+    assert single_card_stats(parsed) == {
+        "low": 1.0, "avg5": 3.0, "n_seen": 6, "supply": 42,
+        "from_price": 0.9, "price_trend": 2.5, "avg7_price": None, "avg1_price": 2.0,
+    }
+    empty = {"offers": [], "summary": {"from_price": None}, "supply": 3}
+    assert single_card_stats(empty) is None
+    assert sealed_stats({"prices": [], "supply": 1}) is None
+
+
+def test_thread_mode_overlaps_with_the_event_loop():
+    html = load("single_expanded_300.html")
+    executor = ParseExecutor(mode="thread", workers=1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(1)
+            await asyncio.sleep(0.001)
+
+    async def main():
+        parse = asyncio.ensure_future(executor.run(parse_single_card_html, html, "English"))
+        await ticker()
+        return await parse
+
+    try:
+        result = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert len(ticks) == 5
+    assert result["offers"]
+
+
+def test_auto_mode_stays_inline_on_one_cpu(monkeypatch):
+    monkeypatch.setattr("parse_executor.available_cpus", lambda: 1)
+    assert ParseExecutor(mode="auto").mode == "inline"
+    monkeypatch.setattr("parse_executor.available_cpus", lambda: 4)
+    executor = ParseExecutor(mode="auto")
+    assert executor.mode == "process"
+    assert executor.workers == 3
+
+
+def test_available_cpus_honours_cgroup_quota(tmp_path):
+    cpu_max = tmp_path / "cpu.max"
+    cpu_max.write_text("100000 100000\n")
+    assert available_cpus(str(cpu_max)) == 1
+    cpu_max.write_text("max 100000\n")
+    assert available_cpus(str(cpu_max)) >= 1
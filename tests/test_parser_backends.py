@@ -0,0 +1,77 @@
+"""Differential test: every parser backend must match the BeautifulSoup
+reference on the saved Cardmarket corpus."""
+import glob
+import os
+
+import pytest
+
+from page_parser import ParsedPage, available_backends, resolve_backend
+from scraper import (
+    parse_prices_for_country,
+    parse_single_card_offers,
+    parse_single_card_summary,
+    parse_supply,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "cardmarket")
+CORPUS = sorted(glob.glob(os.path.join(FIXTURES, "*.html")))
+FAST_BACKENDS = [b for b in available_backends() if b != "bs4"]
+
+
+def extract_all(html, backend):
+    page = ParsedPage(html, backend=backend)
+    assert page.backend == backend
+    return {
+        "prices": {c: parse_prices_for_country(page, c) for c in ("Germany", "Japan", "Spain", "Nowhere")},
+        "offers": {
+            (lang, sealed): parse_single_card_offers(page, lang, is_sealed=sealed)
+            for lang in ("English", "Japanese", "french")
+            for sealed in (False, True)
+        },
+        "summary": parse_single_card_summary(page),
+        "supply": parse_supply(page),
+        "psa10": page.psa10_offers(),
+    }
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_backend_matches_reference(path, backend):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    assert extract_all(html, backend) == extract_all(html, "bs4")
+
+
+def test_corpus_exercises_every_extractor():
+    seen = {"offers": False, "prices": False, "summary": False, "supply": False, "psa10": False}
+    for path in CORPUS:
+        with open(path, encoding="utf-8") as f:
+            result = extract_all(f.read(), "bs4")
+        seen["offers"] |= any(result["offers"].values())
+        seen["prices"] |= any(result["prices"].values())
+        seen["summary"] |= any(v is not None for v in result["summary"].values())
+        seen["supply"] |= result["supply"] is not None
+        seen["psa10"] |= bool(result["psa10"])
+    assert all(seen.values()), seen
+
+
+def test_edge_case_page_values():
+    with open(os.path.join(FIXTURES, "edge_cases.html"), encoding="utf-8") as f:
+        result = extract_all(f.read(), "bs4")
+    assert result["supply"] == 1204
+    # Reference quirks the fast backends must reproduce: a <dt> with a comment
+    # has no single .string, "2,<b>50</b>" reads as "2, 50", and a <dt> with
+    # no <dd> of its own borrows the next one.
+    assert result["summary"] == {"from_price": None, "price_trend": 50.0, "avg7": 3.1, "avg1": 3.1}
+
+
+def test_empty_document_is_handled_by_every_backend():
+    for backend in available_backends():
+        page = ParsedPage("", backend=backend)
+        assert page.offers("English") == []
+        assert page.supply() is None
+
+
+def test_unknown_backend_falls_back_to_reference():
+    assert resolve_backend("no-such-engine").name == "bs4"
+    assert resolve_backend("auto").name in ("lxml", "selectolax")
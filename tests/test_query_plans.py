@@ -0,0 +1,76 @@
+"""EXPLAIN QUERY PLAN checks for the hot per-entity reads in app.py."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from db import (
+    Base,
+    CardLatest,
+    Daily,
+    Price,
+    PSA10Price,
+    SingleCardDaily,
+    SingleCardOffer,
+    SingleCardPrice,
+)
+
+NOW = datetime(2026, 10, 17)
+
+
+@pytest.fixture(scope="module")
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, future=True)()
+    yield s
+    s.close()
+
+
+def hot_queries(s):
+    return {
+        "latest price": s.query(Price).filter_by(product_id=1).order_by(Price.ts.desc()).limit(1),
+        "first price": s.query(Price).filter_by(product_id=1).order_by(Price.ts.asc()).limit(1),
+        "price as of": s.query(Price).filter(Price.product_id == 1, Price.ts <= NOW - timedelta(days=7))
+                        .order_by(Price.ts.desc()).limit(1),
+        "price series": s.query(Price.ts, Price.low, Price.avg5).filter_by(product_id=1).order_by(Price.ts),
+        "latest single": s.query(SingleCardPrice).filter_by(card_id=1).order_by(SingleCardPrice.ts.desc()).limit(1),
+        "single as of": s.query(SingleCardPrice).filter(SingleCardPrice.card_id == 1, SingleCardPrice.ts <= NOW)
+                         .order_by(SingleCardPrice.ts.desc()).limit(1),
+        "single sparkline": s.query(SingleCardPrice.low)
+                             .filter(SingleCardPrice.card_id == 1, SingleCardPrice.ts >= NOW - timedelta(days=30),
+                                     SingleCardPrice.low.isnot(None))
+                             .order_by(SingleCardPrice.ts.asc()),
+        "latest supply": s.query(SingleCardPrice.supply).filter(SingleCardPrice.card_id == 1)
+                          .order_by(SingleCardPrice.ts.desc()).limit(1),
+        "latest psa10": s.query(PSA10Price).filter_by(card_id=1).order_by(PSA10Price.ts.desc()).limit(1),
+        "psa10 history": s.query(PSA10Price.low).filter_by(card_id=1).order_by(PSA10Price.ts.desc()).limit(30),
+        "daily series": s.query(Daily.day, Daily.low, Daily.avg).filter_by(product_id=1).order_by(Daily.day),
+        "single daily series": s.query(SingleCardDaily.day, SingleCardDaily.low, SingleCardDaily.avg)
+                                .filter_by(card_id=1).order_by(SingleCardDaily.day),
+        "cheapest offer": s.query(SingleCardOffer.card_id, func.min(SingleCardOffer.price))
+                           .filter(SingleCardOffer.card_id.in_([1, 2, 3])).group_by(SingleCardOffer.card_id),
+        "offers by price": s.query(SingleCardOffer).filter_by(card_id=1).order_by(SingleCardOffer.price),
+        "snapshot watermark": s.query(func.max(CardLatest.updated)),
+        "snapshots changed since": s.query(CardLatest.card_id, CardLatest.updated).filter(CardLatest.updated > NOW),
+    }
+
+
+def plan(session, query):
+    compiled = query.statement.compile(dialect=session.bind.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with session.bind.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled.string}", params)]
+
+
+@pytest.mark.parametrize("name", [
+    "latest price", "first price", "price as of", "price series", "latest single", "single as of",
+    "single sparkline", "latest supply", "latest psa10", "psa10 history", "daily series",
+    "single daily series", "cheapest offer", "offers by price", "snapshot watermark", "snapshots changed since",
+])
+def test_hot_query_uses_an_index(session, name):
+    steps = plan(session, hot_queries(session)[name])
+    assert any("USING" in s and "INDEX" in s for s in steps), steps
+    assert not any(s.startswith("SCAN") and "INDEX" not in s for s in steps), steps
+    assert not any("TEMP B-TREE" in s for s in steps), steps
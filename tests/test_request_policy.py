@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+import pytest
+
+from config import Config
+from request_policy import RequestPolicy
+
+CARD_URL = "https://www.cardmarket.com/en/OnePiece/Products/Singles/Romance-Dawn/Monkey-D-Luffy"
+
+
+class FakeRequest:
+    def __init__(self, resource_type, url):
+        self.resource_type = resource_type
+        self.url = url
+
+
+class FakeRoute:
+    def __init__(self):
+        self.outcome = None
+
+    async def abort(self, reason=None):
+        self.outcome = "abort"
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+
+class FakeContext:
+    def __init__(self):
+        self.routes = []
+        self.listeners = {}
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    def on(self, event, handler):
+        self.listeners[event] = handler
+
+
+@pytest.mark.parametrize("resource_type, url, action", [
+    ("document", CARD_URL, "allow"),
+    ("xhr", "https://www.cardmarket.com/en/OnePiece/AjaxAction", "allow"),
+    ("script", "https://static.cardmarket.com/js/app.js", "allow"),
+    ("stylesheet", "https://static.cardmarket.com/css/main.css", "allow"),
+    ("script", "https://challenges.cloudflare.com/turnstile/v0/api.js", "allow"),
+    ("image", "https://product-images.s3.cardmarket.com/1/OP01/1.jpg", "deny"),
+    ("font", "https://static.cardmarket.com/fonts/x.woff2", "deny"),
+    ("media", "https://static.cardmarket.com/v.mp4", "deny"),
+    ("script", "https://www.googletagmanager.com/gtm.js?id=X", "deny"),
+    ("script", "https://cdn.example-ads.net/tag.js", "deny"),
+])
+def test_default_rules(resource_type, url, action):
+    assert RequestPolicy().decide(resource_type, url) == action
+
+
+def test_first_matching_rule_wins():
+    policy = RequestPolicy(rules=[
+        {"action": "allow", "resource_types": ["image"], "url": r"/logo\.png$"},
+        {"action": "deny", "resource_types": ["image"]},
+    ], default="deny")
+    assert policy.decide("image", "https://www.cardmarket.com/logo.png") == "allow"
+    assert policy.decide("image", "https://www.cardmarket.com/card.jpg") == "deny"
+    assert policy.decide("document", CARD_URL) == "deny"
+
+
+def test_enforce_mode_aborts_denied_requests():
+    policy = RequestPolicy(mode="enforce")
+    context = FakeContext()
+
+    async def main():
+        await policy.install(context)
+        (_, handler), = context.routes
+        blocked, allowed = FakeRoute(), FakeRoute()
+        await handler(blocked, FakeRequest("image", "https://www.cardmarket.com/a.jpg"))
+        await handler(allowed, FakeRequest("document", CARD_URL))
+        return blocked, allowed
+
+    blocked, allowed = asyncio.run(main())
+    assert blocked.outcome == "abort"
+    assert allowed.outcome == "continue"
+    assert policy.blocked == {"image": 1}
+
+
+def test_audit_mode_only_counts():
+    policy = RequestPolicy(mode="audit")
+    context = FakeContext()
+    asyncio.run(policy.install(context))
+    assert context.routes == []
+
+    context.listeners["request"](FakeRequest("font", "https://www.cardmarket.com/f.woff2"))
+    policy.record_page()
+    policy.record_bytes(FakeRequest("document", CARD_URL), 3072)
+    policy.record_bytes(FakeRequest("font", "https://www.cardmarket.com/f.woff2"), 1024)
+
+    assert policy.blocked == {"font": 1}
+    assert policy.bytes_denied == 1024
+    assert "1 KB of 4 KB (25%) would be saved over 1 pages" in policy.summary()
+
+    policy.start_run()
+    assert policy.bytes_total == 0 and not policy.blocked
+
+
+def test_runs_account_separately():
+    policy = RequestPolicy(mode="audit")
+    context = FakeContext()
+    asyncio.run(policy.install(context))
+    context.listeners["request"](FakeRequest("font", "https://www.cardmarket.com/f.woff2"))
+
+    first = policy.new_run()
+    context.listeners["request"](FakeRequest("image", "https://www.cardmarket.com/a.jpg"))
+    second = policy.new_run()
+    for run in (first, second):
+        run.record_page()
+    first.record_bytes(FakeRequest("font", "https://www.cardmarket.com/f.woff2"), 1024)
+
+    assert first.blocked == {"image": 1} and not second.blocked
+    assert (first.pages, first.bytes_denied, second.bytes_total) == (1, 1024, 0)
+    assert "1 requests would be blocked (image 1)" in first.summary()
+    assert policy.pages == 0
+
+
+def test_off_mode_installs_nothing():
+    policy = RequestPolicy(mode="off")
+    context = FakeContext()
+    asyncio.run(policy.install(context))
+    assert context.routes == [] and context.listeners == {}
+
+
+def test_from_config_reads_rules_file(tmp_path, monkeypatch):
+    path = tmp_path / "route_policy.json"
+    path.write_text(json.dumps({"default": "deny", "rules": [{"action": "allow", "resource_types": ["document"]}]}))
+    monkeypatch.setattr(Config, "SCRAPER_ROUTE_POLICY", "enforce")
+    monkeypatch.setattr(Config, "SCRAPER_ROUTE_POLICY_FILE", str(path))
+
+    policy = RequestPolicy.from_config()
+    assert policy.mode == "enforce"
+    assert policy.decide("document", CARD_URL) == "allow"
+    assert policy.decide("xhr", CARD_URL) == "deny"
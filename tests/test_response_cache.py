@@ -0,0 +1,179 @@
+from datetime import date, datetime
+
+import pytest
+from flask import Flask, flash, jsonify
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import db
+from response_cache import ResponseCache, cached_response, card_series_version, generation, latest_version
+
+
+@pytest.fixture
+def app():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    db.SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+    db.Base.metadata.create_all(engine)
+    with db.get_db_session() as s:
+        s.add(db.SingleCard(id=1, name="Luffy", url="u1", language="English"))
+        s.add(db.CardLatest(card_id=1, updated=datetime(2024, 1, 1)))
+        s.commit()
+
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.cache = ResponseCache(max_bytes=10_000)
+    app.calls = []
+
+    @app.route("/series/<int:cid>")
+    @cached_response(card_series_version, app.cache)
+    def series(cid):
+        app.calls.append(cid)
+        return jsonify({"cid": cid, "n": len(app.calls)})
+
+    @app.route("/list")
+    @cached_response(latest_version, app.cache)
+    def listing():
+        app.calls.append("list")
+        return jsonify(list(range(len(app.calls))))
+
+    @app.route("/missing")
+    @cached_response(latest_version, app.cache)
+    def missing():
+        app.calls.append("missing")
+        return "nope", 404
+
+    @app.route("/flash")
+    def flash_something():
+        flash("saved")
+        return "ok"
+
+    return app
+
+
+def test_etag_304_and_body_cache(app):
+    client = app.test_client()
+    first = client.get("/series/1")
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+
+    revalidated = client.get("/series/1", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.headers["ETag"] == etag
+    again = client.get("/series/1")
+    assert again.get_json() == first.get_json() and again.headers["ETag"] == etag
+    assert again.mimetype == "application/json"
+    assert app.calls == [1]
+    assert client.get("/series/1?x=1").headers["ETag"] != etag
+    assert app.cache.stats() == {"entries": 2, "bytes": app.cache.stats()["bytes"], "hits": 1, "not_modified": 1,
+                                 "misses": 2}
+
+    # A scrape refreshes the card's snapshot: new ETag, recomputed body.
+    with db.get_db_session() as s:
+        s.get(db.CardLatest, 1).updated = datetime(2024, 1, 2)
+        s.commit()
+    fresh = client.get("/series/1", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["ETag"] != etag
+    assert fresh.get_json()["n"] == 3
+
+
+def test_series_version_sees_prices_and_daily_rewrites(app):
+    client = app.test_client()
+    with db.get_db_session() as s:
+        s.add(db.SingleCard(id=2, name="Zoro", url="u2", language="English"))
+        s.commit()
+    etag = client.get("/series/2").headers["ETag"]
+
+    # No snapshot yet: a new price still changes the version.
+    with db.get_db_session() as s:
+        s.connection().execute(insert(db.SingleCardPrice.__table__).values(card_id=2, ts=datetime(2024, 1, 1),
+                                                                           low=5.0))
+        s.commit()
+    fresh = client.get("/series/2", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    etag = fresh.headers["ETag"]
+
+    # backfill_daily.py rewrites daily rows from another process.
+    with db.get_db_session() as s:
+        s.connection().execute(insert(db.SingleCardDaily.__table__).values(card_id=2, day=date(2024, 1, 1),
+                                                                           low=5.0, avg=5.0))
+        s.commit()
+    fresh = client.get("/series/2", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    etag = fresh.headers["ETag"]
+    with db.get_db_session() as s:
+        s.connection().execute(db.SingleCardDaily.__table__.update().values(avg=6.0))
+        s.commit()
+    assert client.get("/series/2", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_commits_bump_generation(app):
+    client = app.test_client()
+    etag = client.get("/list").headers["ETag"]
+    start = generation()
+
+    with db.get_db_session() as s:
+        s.execute(insert(db.SingleCard).values(id=2, name="Zoro", url="u2", language="English"))
+        s.rollback()
+        s.query(db.SingleCard).all()
+        s.commit()
+    assert generation() == start
+    assert client.get("/list", headers={"If-None-Match": etag}).status_code == 304
+
+    with db.get_db_session() as s:
+        s.execute(insert(db.SingleCard).values(id=2, name="Zoro", url="u2", language="English"))
+        s.commit()
+    assert generation() == start + 1
+    assert client.get("/list", headers={"If-None-Match": etag}).status_code == 200
+
+    with db.get_db_session() as s:
+        s.get(db.SingleCard, 2).category = "Liked"
+        s.commit()
+    assert generation() == start + 2
+
+
+def test_list_version_sees_other_processes_and_expires(app, monkeypatch):
+    import response_cache
+
+    clock = [1_000_000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: clock[0])
+    monkeypatch.setattr(response_cache.Config, "RESPONSE_CACHE_TTL_S", 300)
+    client = app.test_client()
+    etag = client.get("/list").headers["ETag"]
+
+    # Another process adds a card: no session events fire here.
+    start = generation()
+    with db.get_db_session() as s:
+        s.connection().execute(insert(db.SingleCard.__table__).values(id=2, name="Zoro", url="u2",
+                                                                       language="English"))
+        s.commit()
+    assert generation() == start
+    fresh = client.get("/list", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    etag = fresh.headers["ETag"]
+
+    assert client.get("/list", headers={"If-None-Match": etag}).status_code == 304
+    clock[0] += 300
+    assert client.get("/list", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_errors_and_flashes_bypass_cache(app):
+    client = app.test_client()
+    assert client.get("/missing").status_code == 404
+    assert "ETag" not in client.get("/missing").headers
+    assert app.calls == ["missing", "missing"]
+
+    client.get("/flash")
+    resp = client.get("/list")
+    assert "ETag" not in resp.headers and app.cache.stats()["entries"] == 0
+
+
+def test_lru_bounded_by_bytes():
+    cache = ResponseCache(max_bytes=100)
+    for i in range(5):
+        cache.put(f"e{i}", b"x" * 30, 200, [])
+    cache.get("e2")
+    cache.put("e5", b"x" * 30, 200, [])
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["bytes"] == 90
+    assert cache.get("e2") is not None and cache.get("e3") is None
+    cache.put("big", b"x" * 101, 200, [])
+    assert cache.get("big") is None
@@ -0,0 +1,128 @@
+import asyncio
+
+from scrape_metrics import Histogram, UsageMeter, url_class
+
+
+class FakeRequest:
+    def __init__(self, resource_type, url, body_size=0):
+        self.resource_type = resource_type
+        self.url = url
+        self.body_size = body_size
+        self.sizes_calls = 0
+
+    async def sizes(self):
+        self.sizes_calls += 1
+        return {"responseBodySize": self.body_size, "responseHeadersSize": 300}
+
+    async def body(self):
+        raise AssertionError("usage accounting must not fetch response bodies")
+
+
+class FakeResponse:
+    def __init__(self, request, headers):
+        self.request = request
+        self.headers = headers
+
+
+class FakePage:
+    def __init__(self):
+        self.listeners = {}
+
+    def on(self, event, handler):
+        self.listeners.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners[event].remove(handler)
+
+
+async def _deliver(page, request, headers):
+    for handler in page.listeners.get("response", []):
+        handler(FakeResponse(request, headers))
+    for handler in page.listeners.get("requestfinished", []):
+        await handler(request)
+
+
+def test_content_length_is_used_without_sizes_call():
+    meter = UsageMeter(mode="sizes")
+    page = FakePage()
+    usage = meter.page()
+    usage.attach(page)
+    req = FakeRequest("document", "https://www.cardmarket.com/en/OnePiece", body_size=999)
+    asyncio.run(_deliver(page, req, {"content-length": "2048"}))
+
+    assert usage.bytes == 2048
+    assert req.sizes_calls == 0
+    usage.detach(page)
+    assert page.listeners == {"response": [], "requestfinished": []}
+
+
+def test_chunked_responses_are_measured_with_sizes():
+    meter = UsageMeter(mode="sizes")
+    page = FakePage()
+    seen = []
+    usage = meter.page(on_bytes=lambda request, n: seen.append(n))
+    usage.attach(page)
+    req = FakeRequest("script", "https://static.cardmarket.com/app.js", body_size=5000)
+    asyncio.run(_deliver(page, req, {"transfer-encoding": "chunked"}))
+
+    assert usage.bytes == 5000
+    assert seen == [5000]
+    assert dict(meter.classes) == {"script static.cardmarket.com": [5000, 1]}
+
+
+def test_sampled_mode_measures_one_in_n_and_scales():
+    meter = UsageMeter(mode="sampled", sample_every=4)
+    page = FakePage()
+    usage = meter.page()
+    usage.attach(page)
+    requests = [FakeRequest("xhr", "https://www.cardmarket.com/ajax", body_size=100) for _ in range(8)]
+
+    async def main():
+        for req in requests:
+            await _deliver(page, req, {})
+
+    asyncio.run(main())
+    assert sum(r.sizes_calls for r in requests) == 2
+    assert usage.bytes == 800
+
+
+def test_headers_mode_never_calls_sizes():
+    meter = UsageMeter(mode="headers")
+    page = FakePage()
+    meter.page().attach(page)
+    assert "requestfinished" not in page.listeners
+
+
+def test_report_ranks_url_classes():
+    meter = UsageMeter(mode="sizes")
+    meter.page()
+    meter.page()
+    meter.record(FakeRequest("document", "https://www.cardmarket.com/a"), 300 * 1024)
+    meter.record(FakeRequest("document", "https://www.cardmarket.com/b"), 300 * 1024)
+    meter.record(FakeRequest("image", "https://product-images.s3.cardmarket.com/x.jpg"), 200 * 1024)
+
+    report = meter.report("Single-card")
+    lines = report.splitlines()
+    assert lines[0] == "Single-card data usage (sizes): 800 KB over 2 pages (400 KB/page)"
+    assert lines[1].split()[:2] == ["document", "www.cardmarket.com"]
+    assert "2 req" in lines[1]
+    assert url_class(FakeRequest("image", "https://product-images.s3.cardmarket.com/x.jpg")) in lines[2]
+
+    meter.start_run()
+    assert meter.total_bytes == 0 and meter.pages == 0
+
+
+def test_histogram_buckets_and_percentiles():
+    hist = Histogram("Time to ready", buckets=(1, 2, 5))
+    for seconds, label in [(0.4, "selector"), (0.8, "selector"), (1.5, "selector"), (4.0, "fallback"), (9.0, "fallback")]:
+        hist.observe(seconds, label)
+
+    assert hist.counts() == [2, 1, 1, 1]
+    assert hist.percentile(50) == 1.5
+    report = hist.report()
+    assert report.startswith("Time to ready: n=5 p50=1.50s")
+    assert "(fallback 2, selector 3)" in report
+    assert ">5s" in report
+
+    hist.start_run()
+    assert hist.report().startswith("Time to ready: n=0")
@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+from scrape_pool import TokenBucket, HostRateLimiter, PagePool, RunStats, run_workers, SKIPPED
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+
+    async def new_page(self):
+        page = FakePage()
+        self.pages.append(page)
+        return page
+
+
+def test_token_bucket_spaces_out_requests_after_burst():
+    bucket = TokenBucket(rate_per_min=60, burst=2)  # one token per second
+    assert bucket._reserve() == 0.0
+    assert bucket._reserve() == 0.0
+    wait = bucket._reserve()
+    assert 0.9 < wait <= 1.0
+    # A fourth caller queues behind the third one.
+    assert 1.9 < bucket._reserve() <= 2.0
+
+
+def test_host_rate_limiter_keeps_one_bucket_per_host():
+    limiter = HostRateLimiter(rate_per_min=60)
+    a = limiter.bucket("https://www.cardmarket.com/en/OnePiece/Products/Singles/1")
+    b = limiter.bucket("https://www.cardmarket.com/en/OnePiece/Products/Singles/2")
+    c = limiter.bucket("https://example.com/x")
+    assert a is b
+    assert a is not c
+
+
+def test_run_workers_processes_every_item_concurrently():
+    seen = []
+    active = {"now": 0, "max": 0}
+
+    async def handler(worker_id, index, item):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        seen.append((index, item))
+        active["now"] -= 1
+
+    asyncio.run(run_workers(["a", "b", "c", "d", "e"], handler, workers=3, jitter=None))
+
+    assert sorted(seen) == [(1, "a"), (2, "b"), (3, "c"), (4, "d"), (5, "e")]
+    assert active["max"] == 3
+
+
+def test_run_workers_does_not_pace_skipped_items():
+    async def handler(worker_id, index, item):
+        return SKIPPED
+
+    start = time.monotonic()
+    asyncio.run(run_workers(range(5), handler, workers=1, jitter=(5, 6)))
+    assert time.monotonic() - start < 1
+
+
+def test_page_pool_reuses_pages_and_caps_size():
+    context = FakeContext()
+    pool = PagePool(context, size=2)
+
+    async def use(n):
+        async with pool.page():
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(use(n) for n in range(6)))
+        await pool.close()
+
+    asyncio.run(main())
+    assert len(context.pages) == 2
+    assert all(p.closed for p in context.pages)
+
+
+def test_page_pool_replaces_page_after_error():
+    context = FakeContext()
+    pool = PagePool(context, size=1)
+
+    async def main():
+        try:
+            async with pool.page():
+                raise RuntimeError("navigation failed")
+        except RuntimeError:
+            pass
+        async with pool.page() as page:
+            return page
+
+    page = asyncio.run(main())
+    assert len(context.pages) == 2
+    assert context.pages[0].closed
+    assert page is context.pages[1]
+
+
+def test_page_pool_cancelled_use_frees_its_slot():
+    context = FakeContext()
+    pool = PagePool(context, size=1)
+
+    async def use():
+        async with pool.page() as page:
+            return page
+
+    async def main():
+        entered = asyncio.Event()
+
+        async def stuck():
+            async with pool.page():
+                entered.set()
+                await asyncio.sleep(3600)
+
+        task = asyncio.create_task(stuck())
+        await entered.wait()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return await asyncio.wait_for(use(), timeout=1)
+
+    page = asyncio.run(main())
+    assert context.pages[0].closed and page is context.pages[1]
+
+
+def test_run_stats_reports_throughput():
+    stats = RunStats("Single-card", total=4, workers=2)
+    stats.started -= 3600
+    stats.record(True)
+    stats.record(True)
+    stats.record(False)
+    stats.skip()
+    assert round(stats.per_hour()) == 3
+    assert "2 ok, 1 failed, 1 skipped of 4" in stats.summary()
@@ -0,0 +1,159 @@
+import asyncio
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from db import (
+    Base,
+    PageArchive,
+    Price,
+    Daily,
+    Product,
+    PSA10Offer,
+    PSA10Price,
+    SingleCard,
+    SingleCardDaily,
+    SingleCardOffer,
+    SingleCardPrice,
+)
+from scrape_writer import ScrapeWriter
+from scraper_status import ScraperStatus
+
+STATS = {"low": 2.0, "avg5": 3.0, "n_seen": 2, "supply": 9,
+         "from_price": 1.5, "price_trend": 2.5, "avg7_price": None, "avg1_price": 2.2}
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'w.db'}", future=True)
+    Base.metadata.create_all(engine)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    Session = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+    with Session() as s:
+        s.add_all([SingleCard(id=i, name=f"c{i}", url=f"u{i}", language="English") for i in (1, 2, 3)])
+        s.add(Product(id=1, name="box", url="p1", country="Germany"))
+        s.add(SingleCardOffer(card_id=1, seller_name="stale", price=9.0))
+        s.add(PSA10Offer(card_id=2, seller_name="stale", price=99.0))
+        s.commit()
+    commits.clear()
+    Session.commits = commits
+    return Session
+
+
+def single(card_id, offers, psa10=None, archive=None):
+    return {"kind": "single", "card_id": card_id, "ts": datetime.utcnow(), "stats": dict(STATS),
+            "offers": [{"seller": s, "price": p, "country": "DE"} for s, p in offers],
+            "psa10": psa10, "archive": archive}
+
+
+def test_batch_is_one_transaction(db):
+    archived = {"kind": "single", "ref_id": 3, "url": "u3", "ts": datetime.utcnow(),
+                "sha256": "ab" * 32, "codec": "zlib", "size": 10}
+
+    async def main():
+        async with ScrapeWriter(batch_size=10, flush_interval=60, session_factory=db) as writer:
+            writer.put(single(1, [("a", 2.0), ("b", 4.0)]))
+            writer.put(single(2, [("c", 2.0)], psa10=[{"seller": "g", "price": 150.0, "comment": "PSA 10"}]))
+            writer.put({"kind": "archive", "archive": archived})
+            writer.put({"kind": "sealed", "product_id": 1, "ts": datetime.utcnow(),
+                        "stats": {"low": 80.0, "avg5": 85.0, "n_seen": 3, "supply": 40}, "archive": None})
+        return writer
+
+    writer = asyncio.run(main())
+    assert (writer.flushes, writer.written, writer.lost) == (1, 4, 0)
+    assert len(db.commits) == 1
+
+    with db() as s:
+        assert s.query(SingleCardPrice).count() == 2
+        assert sorted(o.seller_name for o in s.query(SingleCardOffer)) == ["a", "b", "c"]
+        assert [(o.seller_name, o.comment) for o in s.query(PSA10Offer)] == [("g", "PSA 10")]
+        assert s.query(PSA10Price).one().low == 150.0
+        assert {(d.card_id, d.day, d.low) for d in s.query(SingleCardDaily)} == {
+            (1, date.today(), 2.0), (2, date.today(), 2.0)}
+        assert s.query(Price).one().low == 80.0
+        assert s.query(Daily).one().low == 80.0
+        assert s.query(PageArchive).one().ref_id == 3
+
+
+async def wait_for_flushes(writer, n, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while writer.flushes < n and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+    return writer.flushes
+
+
+def test_flushes_on_size_and_on_time(db):
+    async def main():
+        async with ScrapeWriter(batch_size=2, flush_interval=0.2, session_factory=db) as writer:
+            writer.put(single(1, [("a", 2.0)]))
+            writer.put(single(2, [("b", 2.0)]))
+            assert await wait_for_flushes(writer, 1) == 1  # size trigger
+            writer.put(single(3, [("c", 2.0)]))
+            await asyncio.sleep(0.05)
+            assert writer.flushes == 1
+            assert await wait_for_flushes(writer, 2) == 2  # time trigger, before close
+        return writer
+
+    writer = asyncio.run(main())
+    assert writer.written == 3
+    assert len(db.commits) == 2
+
+
+def test_failed_batch_is_counted_and_later_batches_still_write(db):
+    async def main():
+        async with ScrapeWriter(batch_size=1, flush_interval=60, session_factory=db) as writer:
+            writer.put(single(None, [("a", 2.0)]))  # card_id is NOT NULL
+            writer.put(single(2, [("b", 2.0)]))
+        return writer
+
+    writer = asyncio.run(main())
+    assert (writer.written, writer.lost) == (1, 1)
+    with db() as s:
+        assert [p.card_id for p in s.query(SingleCardPrice)] == [2]
+
+
+def test_failed_batch_is_retried_result_by_result_and_loss_reported(db, tmp_path):
+    progress = ScraperStatus(str(tmp_path / "status.json")).start_run("Single-card", 2)
+
+    async def main():
+        async with ScrapeWriter(batch_size=2, flush_interval=60, session_factory=db,
+                                progress=progress, retry_delay=0) as writer:
+            writer.put(single(None, [("a", 2.0)]))  # fails again on its own
+            writer.put(single(2, [("b", 2.0)]))
+        return writer
+
+    writer = asyncio.run(main())
+    assert (writer.flushes, writer.written, writer.lost) == (1, 1, 1)
+    assert progress.snapshot()["lost"] == 1
+    with db() as s:
+        assert [p.card_id for p in s.query(SingleCardPrice)] == [2]
+
+
+def test_transient_failure_is_retried(db):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return db()
+
+    async def main():
+        async with ScrapeWriter(batch_size=2, flush_interval=60, session_factory=flaky, retry_delay=0) as writer:
+            writer.put(single(1, [("a", 2.0)]))
+            writer.put(single(2, [("b", 2.0)]))
+        return writer
+
+    writer = asyncio.run(main())
+    assert (writer.written, writer.lost) == (2, 0)
+    with db() as s:
+        assert s.query(SingleCardPrice).count() == 2
+
+
+def test_put_outside_context_raises():
+    with pytest.raises(RuntimeError):
+        ScrapeWriter(session_factory=None).put({})
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+import scraper_status
+from scraper_status import ScraperStatus
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "scraper_status.json")
+
+
+def test_health_written_only_on_change(path, monkeypatch):
+    status = ScraperStatus(path)
+    assert status.health() == {"version": 0}
+    assert status.set("ok", "running") is True
+    written = json.load(open(path))
+    assert written["status"] == "ok" and written["version"] == 1
+
+    writes = []
+    monkeypatch.setattr(status, "_write", lambda: writes.append(1))
+    for _ in range(100):
+        assert status.set("ok", "running") is False
+    assert writes == []
+    assert status.set("error", "blocked") is True and writes == [1]
+    assert status.health()["version"] == 2
+
+
+def test_other_process_changes_are_picked_up(path, monkeypatch):
+    with open(path, "w") as f:
+        json.dump({"status": "error", "message": "old format", "timestamp": "2026-01-28T18:33:12"}, f)
+    web, scraper = ScraperStatus(path), ScraperStatus(path)
+    assert web.health()["message"] == "old format"
+
+    reads = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda *a, **kw: reads.append(a) or real_open(*a, **kw))
+    for _ in range(10):
+        web.health()
+    assert reads == []
+
+    scraper.set("ok", "running")
+    health = web.health()
+    assert (health["status"], health["version"]) == ("ok", 1)
+
+    web.set("ok", "Cookie updated by user.")
+    assert scraper.health()["message"] == "Cookie updated by user."
+
+
+def test_progress_stays_in_memory(path, monkeypatch):
+    status = ScraperStatus(path)
+    writes = []
+    monkeypatch.setattr(status, "_write", lambda: writes.append(1))
+    run = status.start_run("Single-card", 100)
+    for _ in range(100):
+        run.advance(ok=True)
+    run.finish()
+    assert writes == [] and status.progress()["done"] == 100
+    assert ScraperStatus(path).progress() is None
+
+
+def test_progress(path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(scraper_status.time, "time", lambda: clock[0])
+    status = ScraperStatus(path)
+    assert status.progress() is None
+
+    sealed = status.start_run("Sealed", 10)
+    clock[0] += 60
+    for ok in (True, True, False):
+        sealed.advance(ok)
+    sealed.advance(skipped=True)
+    run = status.progress()
+    assert (run["i"], run["total"], run["done"], run["failed"], run["skipped"]) == (4, 10, 2, 1, 1)
+    assert run["running"] and run["pages_per_min"] == 3.0
+    assert run["eta_s"] == 120.0
+
+    clock[0] += 60
+    sealed.finish()
+    run = status.progress()
+    assert not run["running"] and run["eta_s"] == 0.0 and run["elapsed_s"] == 120.0
+
+
+def test_overlapping_runs_count_separately(path):
+    status = ScraperStatus(path)
+    scheduled = status.start_run("Single-card", 500)
+    scheduled.advance(ok=True)
+    manual = status.start_run("Single-card", 1)
+    manual.advance(ok=True)
+    manual.finish()
+    scheduled.advance(ok=False)
+
+    assert status.progress()["total"] == 500 and status.progress()["i"] == 2
+    assert [(r["total"], r["running"]) for r in status.runs()] == [(1, False), (500, True)]
+    scheduled.finish()
+    assert [r["total"] for r in status.runs()] == [500]
@@ -0,0 +1,118 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from db import Base, SingleCard, SingleCardOffer
+from tracker_utils.seller_bundles import cached, top_sellers, wishlist_cover
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, future=True)()
+    yield s
+    s.close()
+
+
+def populate(session, seed=2):
+    rng = random.Random(seed)
+    for cid in range(1, 61):
+        session.add(SingleCard(id=cid, name=f"card {cid}", url=f"u{cid}", is_enabled=int(cid % 9 != 0),
+                               language=rng.choice(["English", "Japanese"])))
+        base = rng.uniform(1, 30)
+        for seller in rng.sample(range(25), rng.randint(1, 8)):
+            session.add(SingleCardOffer(card_id=cid, seller_name=f"seller{seller}",
+                                        country=None if seller == 7 else ("DE" if seller % 2 else "FR"),
+                                        price=round(base * rng.uniform(1, 1.4), 2)))
+    session.commit()
+
+
+def old_sellers(session, language="All", country="All", min_cards=0):
+    """The Python grouping seller_bundles used to do."""
+    query = session.query(SingleCardOffer).join(SingleCard).filter(SingleCard.is_enabled == 1)
+    if language != "All":
+        query = query.filter(SingleCard.language == language)
+    if country != "All":
+        query = query.filter(SingleCardOffer.country == country)
+    offers = query.order_by(SingleCardOffer.id).all()
+    cheapest = dict(session.query(SingleCardOffer.card_id, func.min(SingleCardOffer.price))
+                    .group_by(SingleCardOffer.card_id).all())
+    seller_map = {}
+    for offer in offers:
+        baseline = cheapest[offer.card_id]
+        if offer.price > baseline * 1.2:
+            continue
+        entry = seller_map.setdefault((offer.seller_name, offer.country), {
+            "seller": offer.seller_name, "country": offer.country, "cards": [],
+            "total_upcharge": 0.0, "bundle_total": 0.0, "cheapest_total": 0.0})
+        entry["cards"].append((offer.card_id, offer.price, baseline))
+        entry["total_upcharge"] += offer.price - baseline
+        entry["bundle_total"] += offer.price
+        entry["cheapest_total"] += baseline
+    sellers = [s for s in seller_map.values() if s["total_upcharge"] <= 20.0 and len(s["cards"]) >= min_cards]
+    sellers.sort(key=lambda s: (-len(s["cards"]), round(s["total_upcharge"], 6), round(s["bundle_total"], 6),
+                                s["seller"], s["country"] or ""))
+    return sellers
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"language": "English"},
+    {"country": "DE", "min_cards": 3},
+])
+def test_top_sellers_match_python_grouping(session, filters):
+    populate(session)
+    expected = old_sellers(session, **filters)
+    got = top_sellers(session, **filters, top_k=1000)
+    assert len(got) == len(expected) > 0
+    for g, e in zip(got, expected):
+        assert (g["seller"], g["country"]) == (e["seller"], e["country"])
+        assert [(c["card"]["id"], c["price"], c["baseline"]) for c in g["cards"]] == e["cards"]
+        for field in ("total_upcharge", "bundle_total", "cheapest_total"):
+            assert g[field] == pytest.approx(e[field])
+
+    assert top_sellers(session, **filters, top_k=5) == got[:5]
+
+
+def test_wishlist_cover(session):
+    session.add_all([SingleCard(id=i, name=f"c{i}", url=f"u{i}", language="English") for i in (1, 2, 3, 4)])
+    session.add_all([
+        SingleCardOffer(card_id=1, seller_name="cheap", country="DE", price=10.0),
+        SingleCardOffer(card_id=2, seller_name="cheap2", country="DE", price=10.0),
+        # One seller with both cards slightly dearer beats two shipments.
+        SingleCardOffer(card_id=1, seller_name="both", country="DE", price=10.5),
+        SingleCardOffer(card_id=2, seller_name="both", country="DE", price=10.5),
+        SingleCardOffer(card_id=3, seller_name="cheap", country="DE", price=5.0),
+        SingleCardOffer(card_id=3, seller_name="both", country="DE", price=5.9),
+    ])
+    session.commit()
+
+    cover = wishlist_cover(session, [1, 2, 3, 4], shipping=2.0)
+    assert [s["seller"] for s in cover["sellers"]] == ["both"]
+    assert cover["total"] == pytest.approx(10.5 + 10.5 + 5.9 + 2.0)
+    assert cover["uncovered"] == [4]
+
+    # Free shipping: every card from its cheapest seller.
+    cover = wishlist_cover(session, [1, 2, 3], shipping=0.0)
+    assert {s["seller"]: [c["card"]["id"] for c in s["cards"]] for s in cover["sellers"]} == {
+        "cheap": [1, 3], "cheap2": [2]}
+    assert cover["total"] == pytest.approx(25.0)
+
+
+def test_results_cached_until_data_changes(session):
+    populate(session)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return top_sellers(session)
+
+    first = cached(session, ("test", id(session)), compute)
+    assert cached(session, ("test", id(session)), compute) is first
+    session.get(SingleCard, 1).name = "renamed"
+    session.commit()
+    cached(session, ("test", id(session)), compute)
+    assert len(calls) == 2
@@ -0,0 +1,79 @@
+import math
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import Base, SingleCard, SingleCardDaily, SingleCardPrice, backfill_single_daily
+from tracker_utils.series import minmax_indices, price_series
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    s = sessionmaker(bind=engine, future=True)()
+    s.add(SingleCard(id=1, name="card", url="u", language="English"))
+    s.commit()
+    yield s
+    s.close()
+
+
+def add_prices(session, start, step, n):
+    session.add_all([
+        SingleCardPrice(card_id=1, ts=start + i * step, low=10 + 5 * math.sin(i / 7), avg5=12 + 5 * math.cos(i / 5))
+        for i in range(n)
+    ])
+    session.commit()
+    backfill_single_daily(session)
+    session.commit()
+
+
+def series(session, **kw):
+    return price_series(session, SingleCardPrice, SingleCardDaily, "card_id", 1, **kw)
+
+
+def test_minmax_keeps_extremes_and_bound():
+    rng = np.random.default_rng(3)
+    low, avg = rng.normal(size=5000), rng.normal(size=5000)
+    low[1234], avg[4321] = -50, 50
+    avg[77] = np.nan
+    idx = minmax_indices([low, avg], 200)
+    assert len(idx) <= 200
+    assert {0, 1234, 4321, 4999} <= set(idx)
+    assert list(idx) == sorted(set(idx))
+    assert len(minmax_indices([low[:50], avg[:50]], 200)) == 50
+    assert len(minmax_indices([low, avg], 5)) == 5
+
+
+def test_short_history_is_raw(session):
+    add_prices(session, datetime(2024, 1, 1), timedelta(hours=4), 100)
+    resolution, rows = series(session)
+    assert resolution == "raw" and len(rows) == 100
+
+
+@pytest.mark.parametrize("step, n, max_points, expected", [
+    (timedelta(minutes=15), 2000, 200, "hour"),
+    (timedelta(hours=4), 6 * 365 * 3, 300, "day"),
+    (timedelta(hours=4), 6 * 365 * 3, 100, "week"),
+])
+def test_wide_ranges_use_rollups(session, step, n, max_points, expected):
+    add_prices(session, datetime(2020, 1, 1), step, n)
+    resolution, rows = series(session, max_points=max_points)
+    assert resolution == expected
+    assert 0 < len(rows) <= max_points
+    assert [r[0] for r in rows] == sorted(r[0] for r in rows)
+    assert min(r[1] for r in rows) == pytest.approx(5, abs=0.05)
+
+
+def test_from_to_window(session):
+    add_prices(session, datetime(2024, 1, 1), timedelta(hours=4), 6 * 60)
+    resolution, rows = series(session, start=datetime(2024, 1, 10), end=datetime(2024, 1, 12))
+    assert resolution == "raw" and len(rows) == 12
+    assert rows[0][0] == datetime(2024, 1, 10) and rows[-1][0] < datetime(2024, 1, 12)
+
+    resolution, rows = series(session, start=datetime(2024, 1, 10), end=datetime(2024, 1, 20), max_points=5)
+    assert resolution == "day" and len(rows) <= 5
+    assert date(2024, 1, 10) <= rows[0][0].date() and rows[-1][0].date() < date(2024, 1, 20)
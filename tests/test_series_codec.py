@@ -0,0 +1,71 @@
+import calendar
+import gzip
+import json
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from werkzeug.datastructures import LanguageAccept, MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from tracker_utils.series_codec import (
+    MEDIA_TYPES,
+    compress,
+    decode_binary,
+    encode_binary,
+    encode_columns,
+    negotiate,
+)
+
+NAMES = ("t", "low", "avg5")
+START = datetime(2024, 3, 1, 12)
+POINTS = [(START + timedelta(hours=4 * i), 10 + i * 0.37 if i % 5 else None, 1234.56 + i) for i in range(500)]
+
+
+def test_columns_json():
+    cols = json.loads(encode_columns(NAMES, POINTS))
+    assert list(cols) == list(NAMES)
+    assert cols["t"][0] == calendar.timegm(START.timetuple())
+    assert np.diff(cols["t"]).tolist() == [4 * 3600] * 499
+    assert cols["low"][0] is None and cols["low"][1] == pytest.approx(10.37, rel=1e-6)
+    assert cols["avg5"] == pytest.approx([p[2] for p in POINTS], rel=1e-6)
+    assert json.loads(encode_columns(NAMES, [])) == {"t": [], "low": [], "avg5": []}
+
+
+def test_binary_round_trip():
+    body = encode_binary(NAMES, POINTS)
+    assert len(body) == 4 + 6 + len("t,low,avg5") + 500 * 12
+    cols = decode_binary(body)
+    assert cols["t"].tolist() == json.loads(encode_columns(NAMES, POINTS))["t"]
+    assert np.isnan(cols["low"][0]) and cols["low"][1] == pytest.approx(10.37, rel=1e-6)
+    assert cols["avg5"] == pytest.approx([p[2] for p in POINTS], rel=1e-6)
+
+    days = decode_binary(encode_binary(("d", "low", "avg"), [(date(1970, 1, 2), 1.0, 2.0)]))
+    assert days["d"].tolist() == [86400]
+    with pytest.raises(ValueError):
+        decode_binary(b"nope")
+
+
+@pytest.mark.parametrize("fmt, accept, expected", [
+    (None, "", "json"),
+    (None, "*/*", "json"),
+    (None, "application/json, */*;q=0.8", "json"),
+    (None, MEDIA_TYPES["binary"], "binary"),
+    (None, f"{MEDIA_TYPES['columns']}, application/json;q=0.5", "columns"),
+    ("columns", "application/json", "columns"),
+])
+def test_negotiate(fmt, accept, expected):
+    assert negotiate(fmt, parse_accept_header(accept, MIMEAccept)) == expected
+
+
+def test_negotiate_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        negotiate("xml", MIMEAccept())
+
+
+def test_compress():
+    body = encode_binary(NAMES, POINTS)
+    packed, encoding = compress(body, LanguageAccept([("gzip", 1)]))
+    assert encoding == "gzip" and gzip.decompress(packed) == body
+    assert compress(body, LanguageAccept([("identity", 1)])) == (body, None)
+    assert compress(b"tiny", LanguageAccept([("gzip", 1)])) == (b"tiny", None)
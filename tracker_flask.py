@@ -19,7 +19,7 @@ from flask import (
 )
 from werkzeug.utils import secure_filename
 
-from db import get_db_session, Item, SingleCard, SingleCardPrice, func
+from db import get_db_session, Item, SingleCard, CardLatest
 from tracker_utils.pricecharting import fetch_pricecharting_prices
 from tracker_utils.utils import (
     get_reference_usd,
@@ -161,26 +161,12 @@ def get_charting_prices(items):
 
 
 def get_latest_card_prices(session, card_ids):
-    """Fetch the latest SingleCardPrice for a list of card IDs.
+    """Fetch the latest SingleCardPrice low for a list of card IDs.
     Returns a dict {card_id: low_price_eur}."""
     if not card_ids:
         return {}
-    
-    latest_subq = (
-        session.query(SingleCardPrice.card_id, func.max(SingleCardPrice.ts).label('max_ts'))
-        .filter(SingleCardPrice.card_id.in_(card_ids))
-        .group_by(SingleCardPrice.card_id)
-        .subquery()
-    )
-    
-    latest_prices = (
-        session.query(SingleCardPrice.card_id, SingleCardPrice.low)
-        .join(latest_subq, 
-              (SingleCardPrice.card_id == latest_subq.c.card_id) & 
-              (SingleCardPrice.ts == latest_subq.c.max_ts))
-        .all()
-    )
-    return {r[0]: r[1] for r in latest_prices}
+    rows = session.query(CardLatest.card_id, CardLatest.low).filter(CardLatest.card_id.in_(card_ids))
+    return {r[0]: r[1] for r in rows}
 
 def calculate_fx_dict(items, charting_prices, fx_chf):
     fx_dict = {}
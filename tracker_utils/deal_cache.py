@@ -0,0 +1,125 @@
+"""Materialized deal rankings, refreshed from what changed since they were built.
+
+Every scrape batch refreshes the ``card_latest`` rows of the cards it wrote
+(prices, offers and dailies land in the same transaction), so
+``card_latest.updated`` is a watermark of what changed. A cached ranking
+(one per filter combination) remembers its watermark; on the next request,
+the cards updated since are re-scored and merged in, and a request with
+nothing new is served from memory. Stamps are taken before the writer
+commits, so a slow transaction (another process) can land below the
+watermark: the change check looks back ``DEALS_CACHE_OVERLAP_S`` further
+and skips the stamps it has already applied. Card edits (enable, category, language,
+delete) are caught by a flush listener and force a full rebuild, as does
+``DEALS_CACHE_MAX_AGE_S``.
+"""
+import time
+from datetime import datetime, timedelta
+from itertools import chain
+from threading import Lock
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from config import Config
+from db import CardLatest, SingleCard
+from tracker_utils.deal_engine import RankedDeals, load_deal_inputs, merge_deals, score_deals, sort_deals
+
+FILTERS = ("include_promos", "english_only", "include_packs", "language")
+
+_card_edits = 0  # flushes that added, changed or deleted a SingleCard
+
+
+@event.listens_for(Session, "after_flush")
+def _track_card_edits(session, flush_context):
+    global _card_edits
+    if any(isinstance(o, SingleCard) for o in chain(session.new, session.dirty, session.deleted)):
+        _card_edits += 1
+
+
+def watermark(session):
+    """Newest ``card_latest.updated`` (``datetime.min`` while there is none)."""
+    return session.execute(select(func.max(CardLatest.updated))).scalar() or datetime.min
+
+
+def data_version(session):
+    """Changes whenever a scrape batch lands or a card is edited."""
+    return _card_edits, watermark(session)
+
+
+def _recent(session, mark, overlap):
+    """``{card_id: updated}`` of the cards stamped after ``mark - overlap``."""
+    since = mark - timedelta(seconds=overlap) if mark != datetime.min else mark
+    return dict(session.execute(select(CardLatest.card_id, CardLatest.updated).where(CardLatest.updated > since)).all())
+
+
+class _Entry:
+    def __init__(self, columns, mark, seen):
+        self.columns = columns
+        self.mark = mark
+        self.seen = seen  # stamps in the overlap window already merged in
+        self.edits = _card_edits
+        self.built = self.refreshed = time.monotonic()
+
+
+class DealCache:
+    """Ranked deals per ``(include_promos, english_only, include_packs,
+    language)``; ``ranked`` returns a ``RankedDeals`` over the cached columns."""
+
+    def __init__(self, max_age: float = None, overlap: float = None):
+        self.max_age = Config.DEALS_CACHE_MAX_AGE_S if max_age is None else max_age
+        self.overlap = Config.DEALS_CACHE_OVERLAP_S if overlap is None else overlap
+        self._entries = {}
+        self._lock = Lock()
+        self.hits = self.patches = self.misses = 0
+
+    def ranked(self, session, include_promos=False, english_only=True, include_packs=False, language=None):
+        key = (include_promos, english_only, include_packs, language)
+        filters = dict(zip(FILTERS, key))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.edits != _card_edits or time.monotonic() - entry.built > self.max_age:
+                # Watermark first: anything written while loading is patched in next time.
+                mark = watermark(session)
+                seen = _recent(session, mark, self.overlap)
+                entry = self._entries[key] = _Entry(sort_deals(score_deals(load_deal_inputs(session, **filters))),
+                                                    mark, seen)
+                self.misses += 1
+            else:
+                recent = _recent(session, entry.mark, self.overlap)
+                ids = [card_id for card_id, updated in recent.items() if entry.seen.get(card_id) != updated]
+                if ids:
+                    patch = score_deals(load_deal_inputs(session, card_ids=ids, **filters))
+                    entry.columns = merge_deals(entry.columns, patch, ids)
+                    entry.mark = max(entry.mark, *(recent[card_id] for card_id in ids))
+                    entry.refreshed = time.monotonic()
+                    self.patches += 1
+                else:
+                    self.hits += 1
+                entry.seen = recent
+            return RankedDeals(session, entry.columns)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Lookup counters, hit ratio and per-ranking size and age (seconds)."""
+        with self._lock:
+            lookups = self.hits + self.patches + self.misses
+            now = time.monotonic()
+            return {
+                "hits": self.hits,
+                "patches": self.patches,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "rankings": [
+                    {"filters": dict(zip(FILTERS, key)),
+                     "deals": len(entry.columns["score"]),
+                     "age_s": round(now - entry.built, 1),
+                     "refreshed_s": round(now - entry.refreshed, 1)}
+                    for key, entry in self._entries.items()
+                ],
+            }
+
+
+DEAL_CACHE = DealCache()
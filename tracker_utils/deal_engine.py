@@ -0,0 +1,294 @@
+"""Vectorized deal scoring for ``calculate_deals``.
+
+``load_deal_inputs`` reads everything the scoring needs in four set-based
+queries (cards, snapshots, daily windows, offers) into NumPy columns, and
+``rank_deals`` scores every offer at once. The rules are unchanged:
+
+* MV = 0.5 * internal 7-day average (non-zero daily avgs, else avg5)
+  + 0.5 * Cardmarket 7-day average (else the internal one)
+* trend x1.1 up / x0.9 down, +0.05 when rising on thin supply (< 50),
+  -0.05 when falling on deep supply (> 100)
+* supply x1.15 (< 10), x1.05 (< 50), x0.95 (> 200)
+* score = discount % * trend multiplier * supply multiplier, for offers
+  priced at most 5000 and at most 10% over MV
+"""
+from bisect import bisect_right
+from collections.abc import Sequence
+from itertools import chain
+
+import numpy as np
+from sqlalchemy import and_, case, func, select
+
+from db import CardLatest, SingleCard, SingleCardDaily, SingleCardOffer
+from tracker_utils.market_stats import TREND_DELTA
+
+LOOKBACK_DAYS = 7
+MAX_PRICE = 5000
+MIN_DISCOUNT = -10.0
+PROMO_WORDS = ("championship", "serial", "treasure cup", "regional", "prize")
+TRENDS = ("flat", "up", "down")
+ITER_CHUNK = 500  # deals loaded per query when iterating
+
+
+def _float(values):
+    """``values`` as a float array, ``None`` as NaN."""
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _positions(card_ids, refs):
+    """Index of each of ``refs`` in the sorted ``card_ids`` and a hit mask."""
+    refs = np.asarray(refs, dtype=np.int64)
+    if not len(card_ids):
+        return np.zeros(len(refs), dtype=np.int64), np.zeros(len(refs), dtype=bool)
+    pos = np.minimum(np.searchsorted(card_ids, refs), len(card_ids) - 1)
+    return pos, card_ids[pos] == refs
+
+
+def _matrix(conn, stmt, width):
+    """Rows of ``stmt`` (numeric, non-null columns) as a float array.
+
+    Runs on the DBAPI cursor: building a result row per offer costs about as
+    much as the query itself.
+    """
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    args = [params[k] for k in compiled.positiontup] if compiled.positional else params
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(str(compiled), args)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return np.fromiter(chain.from_iterable(rows), dtype=float, count=width * len(rows)).reshape(-1, width)
+
+
+def _is_promo(name, url):
+    return ("special-tournaments-promos" in url.lower()
+            or any(x in name.lower() for x in PROMO_WORDS))
+
+
+def load_deal_inputs(session, include_promos=False, english_only=True, include_packs=False, language=None,
+                     card_ids=None):
+    """Cards and offers to score (only ``card_ids`` if given), as a dict of columns.
+
+    Per-card arrays follow ``card_id`` (ascending); per-offer arrays follow
+    ``offer_id`` (by card, then price). Only ids and numbers are loaded,
+    ``RankedDeals`` fetches the rows of the deals that are shown.
+    """
+    cond = [SingleCard.is_enabled == 1]
+    if language and language != "All":
+        cond.append(SingleCard.language == language)
+    elif english_only:  # Legacy fallback if language param not used
+        cond.append(SingleCard.language == 'English')
+    if card_ids is not None:
+        cond.append(SingleCard.id.in_(list(card_ids)))
+    ids = select(SingleCard.id).where(*cond)
+    # Core rows: the ORM result layer costs more than the scoring here.
+    conn = session.connection()
+
+    rows = conn.execute(
+        select(SingleCard.id, SingleCard.name, SingleCard.url, SingleCard.category)
+        .where(*cond).order_by(SingleCard.id)
+    )
+    card_ids = np.array([
+        cid for cid, name, url, category in rows
+        if (include_packs or not (category and "pack" in category.lower()))
+        and (include_promos or not _is_promo(name, url))
+    ], dtype=np.int64)
+    n = len(card_ids)
+
+    snap = {"has": np.zeros(n, dtype=bool), "avg5": np.full(n, np.nan),
+            "avg7_price": np.full(n, np.nan), "supply": np.full(n, np.nan)}
+    rows = conn.execute(
+        select(CardLatest.card_id, CardLatest.avg5, CardLatest.avg7_price, CardLatest.supply)
+        .where(CardLatest.card_id.in_(ids), CardLatest.ts.isnot(None))
+    ).all()
+    pos, hit = _positions(card_ids, [r[0] for r in rows])
+    snap["has"][pos[hit]] = True
+    for i, name in enumerate(("avg5", "avg7_price", "supply"), start=1):
+        snap[name][pos[hit]] = _float([r[i] for r in rows])[hit]
+
+    # Newest 2 * LOOKBACK_DAYS daily rows per card: row count and window
+    # means for the trend, mean of the non-zero avgs of the newest week.
+    rn = func.row_number().over(partition_by=SingleCardDaily.card_id, order_by=SingleCardDaily.day.desc())
+    ranked = (
+        select(SingleCardDaily.card_id, SingleCardDaily.avg, rn.label("rn"))
+        .where(SingleCardDaily.card_id.in_(ids))
+        .subquery()
+    )
+    recent = ranked.c.rn <= LOOKBACK_DAYS
+    daily = {"n": np.zeros(n), "recent": np.full(n, np.nan), "prev": np.full(n, np.nan),
+             "internal_avg7": np.full(n, np.nan)}
+    rows = conn.execute(
+        select(
+            ranked.c.card_id,
+            func.count(),
+            func.avg(case((recent, ranked.c.avg))),
+            func.avg(case((~recent, ranked.c.avg))),
+            func.avg(case((and_(recent, ranked.c.avg != 0), ranked.c.avg))),
+        )
+        .where(ranked.c.rn <= 2 * LOOKBACK_DAYS)
+        .group_by(ranked.c.card_id)
+    ).all()
+    pos, hit = _positions(card_ids, [r[0] for r in rows])
+    for i, name in enumerate(("n", "recent", "prev", "internal_avg7"), start=1):
+        daily[name][pos[hit]] = _float([r[i] for r in rows])[hit]
+
+    # Offers over MAX_PRICE never score; the rest come back as three flat columns.
+    flat = _matrix(conn, (
+        select(SingleCardOffer.card_id, SingleCardOffer.id, SingleCardOffer.price)
+        .where(SingleCardOffer.card_id.in_(ids), SingleCardOffer.price <= MAX_PRICE)
+        .order_by(SingleCardOffer.card_id, SingleCardOffer.price, SingleCardOffer.id)
+    ), 3)
+    pos, hit = _positions(card_ids, flat[:, 0])
+
+    return {
+        "card_id": card_ids,
+        **snap,
+        **daily,
+        "offer_id": flat[hit, 1].astype(np.int64),
+        "offer_card": pos[hit],
+        "offer_price": flat[hit, 2],
+    }
+
+
+def classify_trends(n, recent, prev, lookback_days=LOOKBACK_DAYS):
+    """``market_stats.classify_trend`` over arrays: 0 flat, 1 up, 2 down.
+
+    Cards with fewer than ``lookback_days + 3`` daily rows are flat, as in
+    ``compute_single_trend``.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = np.where(prev != 0, (recent - prev) / prev, 0.0)
+    known = (n >= lookback_days + 3) & ~np.isnan(recent) & ~np.isnan(prev)
+    return np.select([known & (delta > TREND_DELTA), known & (delta < -TREND_DELTA)], [1, 2], 0)
+
+
+def score_deals(inputs):
+    """Score every offer in ``inputs``; returns the deal columns, unsorted."""
+    avg5 = np.nan_to_num(inputs["avg5"])
+    internal = np.where(np.isnan(inputs["internal_avg7"]), avg5, inputs["internal_avg7"])
+    avg7_price = np.nan_to_num(inputs["avg7_price"])
+    website = np.where(avg7_price != 0, avg7_price, internal)
+    mv = 0.5 * internal + 0.5 * website
+
+    trend = classify_trends(inputs["n"], inputs["recent"], inputs["prev"])
+    supply = np.nan_to_num(inputs["supply"])
+    supply_mult = np.select([supply < 10, supply < 50, supply > 200], [1.15, 1.05, 0.95], 1.0)
+    trend_mult = np.select([trend == 1, trend == 2], [1.1, 0.9], 1.0)
+    # Sentinel: rising on thin supply / falling on deep supply.
+    trend_mult = trend_mult + np.where((trend == 1) & (supply < 50), 0.05, 0.0)
+    trend_mult = trend_mult - np.where((trend == 2) & (supply > 100), 0.05, 0.0)
+
+    card_ok = inputs["has"] & (avg5 <= MAX_PRICE) & ~((internal == 0) & (website == 0)) & (mv > 0)
+
+    c = inputs["offer_card"]
+    price = inputs["offer_price"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        discount = (mv[c] - price) / mv[c] * 100.0
+    idx = np.flatnonzero(card_ok[c] & (discount >= MIN_DISCOUNT) & (price <= MAX_PRICE))
+    c = c[idx]
+    return {
+        "card_id": inputs["card_id"][c],
+        "offer_id": inputs["offer_id"][idx],
+        "price": price[idx],
+        "mv": mv[c],
+        "discount_pct": discount[idx],
+        "score": discount[idx] * trend_mult[c] * supply_mult[c],
+        "trend": trend[c],
+        "supply": supply[c],
+    }
+
+
+def sort_deals(columns):
+    """``columns`` ordered best first; ties keep card, then price order, like
+    the old list sort did."""
+    order = np.lexsort((columns["offer_id"], columns["price"], columns["card_id"], -columns["score"]))
+    return {name: col[order] for name, col in columns.items()}
+
+
+def merge_deals(columns, patch, card_ids):
+    """``columns`` with the deals of ``card_ids`` replaced by ``patch`` (sorted)."""
+    keep = ~np.isin(columns["card_id"], np.asarray(list(card_ids), dtype=np.int64))
+    return sort_deals({name: np.concatenate([col[keep], patch[name]]) for name, col in columns.items()})
+
+
+def rank_deals(session, inputs):
+    """Score every offer in ``inputs``; returns ``RankedDeals``, best first."""
+    return RankedDeals(session, sort_deals(score_deals(inputs)))
+
+
+class RankedDeals(Sequence):
+    """Ranked deals as columns. Items are the dicts ``calculate_deals`` always
+    returned (``card``, ``offer``, ``mv``, ``discount_pct``, ``score``,
+    ``trend``, ``supply``); a slice loads its cards and offers in two queries,
+    so only the page that is shown gets ORM objects. Access them while
+    ``session`` is open.
+
+    Deals whose offer was reconciled away after ranking are left out of
+    slices and iteration.
+
+    ``cursor(i)`` is an opaque token for position ``i``; ``after(token)`` is
+    the index right behind it, found by binary search on the sort key, so it
+    stays correct when the ranking is refreshed in between.
+    """
+
+    def __init__(self, session, columns):
+        self.session = session
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["score"])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._items(range(*i.indices(len(self))))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("deal index out of range")
+        items = self._items([i])
+        if not items:
+            raise LookupError(f"deal {i} is no longer available")
+        return items[0]
+
+    def __iter__(self):
+        for start in range(0, len(self), ITER_CHUNK):
+            yield from self[start:start + ITER_CHUNK]
+
+    def _key(self, i):
+        col = self.columns
+        return (-float(col["score"][i]), int(col["card_id"][i]), float(col["price"][i]), int(col["offer_id"][i]))
+
+    def cursor(self, i):
+        score, card_id, price, offer_id = self._key(i)
+        return f"{-score!r}_{card_id}_{price!r}_{offer_id}"
+
+    def after(self, cursor):
+        """Index of the first deal ranked below ``cursor`` (0 if it is malformed)."""
+        try:
+            score, card_id, price, offer_id = cursor.split("_")
+            key = (-float(score), int(card_id), float(price), int(offer_id))
+        except (AttributeError, ValueError):
+            return 0
+        return bisect_right(range(len(self)), key, key=self._key)
+
+    def _items(self, positions):
+        col = self.columns
+        positions = list(positions)
+        if not positions:
+            return []
+        card_ids = {int(col["card_id"][p]) for p in positions}
+        offer_ids = [int(col["offer_id"][p]) for p in positions]
+        cards = {c.id: c for c in self.session.query(SingleCard).filter(SingleCard.id.in_(card_ids))}
+        offers = {o.id: o for o in self.session.query(SingleCardOffer).filter(SingleCardOffer.id.in_(offer_ids))}
+        positions = [p for p in positions if int(col["offer_id"][p]) in offers and int(col["card_id"][p]) in cards]
+        return [{
+            "card": cards[int(col["card_id"][p])],
+            "offer": offers[int(col["offer_id"][p])],
+            "mv": float(col["mv"][p]),
+            "discount_pct": float(col["discount_pct"][p]),
+            "score": float(col["score"][p]),
+            "trend": TRENDS[col["trend"][p]],
+            "supply": int(col["supply"][p]),
+        } for p in positions]
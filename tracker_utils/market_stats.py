@@ -0,0 +1,151 @@
+"""Set-based versions of the per-row stats behind the list pages.
+
+``compute_trend`` / ``compute_single_trend`` / ``is_heads_up`` in scraper.py
+answer for one product or card with a query or two each; the helpers here
+answer for every row of a page in a single statement, using window
+functions over the daily tables and the ``latest_snapshot`` rows.
+"""
+from sqlalchemy import case, func, select
+
+from db import Daily, Price, Product, ProductLatest, PSA10Price, SingleCardDaily, SingleCardPrice
+from latest_snapshot import product_snapshots
+
+TREND_DELTA = 0.03      # +/-3% between the two windows
+HEADS_UP_RATIO = 0.90   # latest low at least 10% under the 7-day average
+
+
+def classify_trend(recent_avg, prev_avg):
+    """'up' | 'down' | 'flat' for the mean of the recent vs. the previous window."""
+    if recent_avg is None or prev_avg is None:
+        return "flat"
+    delta = (recent_avg - prev_avg) / prev_avg if prev_avg else 0.0
+    if delta > TREND_DELTA:
+        return "up"
+    if delta < -TREND_DELTA:
+        return "down"
+    return "flat"
+
+
+def daily_windows(model, key: str, lookback_days: int = 7, ids=None):
+    """Subquery with, per ``key``: ``n`` (rows among the newest
+    ``2 * lookback_days``), ``recent`` and ``prev`` (mean ``avg`` of the newest
+    ``lookback_days`` rows and of the ones before them)."""
+    ref = getattr(model, key)
+    rn = func.row_number().over(partition_by=ref, order_by=model.day.desc()).label("rn")
+    ranked = select(ref.label("ref"), model.avg, rn)
+    if ids is not None:
+        ranked = ranked.where(ref.in_(ids))
+    ranked = ranked.subquery()
+    return (
+        select(
+            ranked.c.ref,
+            func.count().label("n"),
+            func.avg(case((ranked.c.rn <= lookback_days, ranked.c.avg))).label("recent"),
+            func.avg(case((ranked.c.rn > lookback_days, ranked.c.avg))).label("prev"),
+        )
+        .where(ranked.c.rn <= 2 * lookback_days)
+        .group_by(ranked.c.ref)
+        .subquery()
+    )
+
+
+def single_trends(session, card_ids, lookback_days: int = 7):
+    """``compute_single_trend`` for many cards in one query: ``{card_id: trend}``."""
+    if not card_ids:
+        return {}
+    windows = daily_windows(SingleCardDaily, "card_id", lookback_days, ids=card_ids)
+    trends = {cid: "flat" for cid in card_ids}
+    for ref, n, recent, prev in session.execute(select(windows)):
+        if n >= lookback_days + 3:
+            trends[ref] = classify_trend(recent, prev)
+    return trends
+
+
+def card_histories(session, card_ids, since):
+    """Non-null lows since ``since`` per card, oldest first, in one query."""
+    histories = {}
+    if not card_ids:
+        return histories
+    rows = (
+        session.query(SingleCardPrice.card_id, SingleCardPrice.low)
+        .filter(SingleCardPrice.card_id.in_(card_ids), SingleCardPrice.ts >= since,
+                SingleCardPrice.low.isnot(None))
+        .order_by(SingleCardPrice.card_id, SingleCardPrice.ts)
+    )
+    for card_id, low in rows:
+        histories.setdefault(card_id, []).append(low)
+    return histories
+
+
+def psa10_histories(session, card_ids, points: int = 30):
+    """The newest ``points`` PSA10 lows per card, oldest first, in one query."""
+    histories = {}
+    if not card_ids:
+        return histories
+    rn = func.row_number().over(partition_by=PSA10Price.card_id, order_by=PSA10Price.ts.desc()).label("rn")
+    ranked = (
+        select(PSA10Price.card_id, PSA10Price.ts, PSA10Price.low, rn)
+        .where(PSA10Price.card_id.in_(card_ids))
+        .subquery()
+    )
+    rows = session.execute(
+        select(ranked.c.card_id, ranked.c.low)
+        .where(ranked.c.rn <= points)
+        .order_by(ranked.c.card_id, ranked.c.ts)
+    )
+    for card_id, low in rows:
+        histories.setdefault(card_id, []).append(low)
+    return histories
+
+
+def product_index(session):
+    """Rows for the /cardwatch product table, in one query.
+
+    Same values as running ``compute_trend``, ``is_heads_up`` and the
+    latest/first/as-of price lookups for each product. Products with prices
+    but no stored snapshot yet get one computed from their prices.
+    """
+    windows = daily_windows(Daily, "product_id")
+    unsnapped = case(
+        (ProductLatest.product_id.is_(None), select(Price.id).where(Price.product_id == Product.id).exists()),
+        else_=False,
+    )
+    rows = session.execute(
+        select(Product, ProductLatest, windows.c.n, windows.c.recent, windows.c.prev, unsnapped)
+        .outerjoin(ProductLatest, ProductLatest.product_id == Product.id)
+        .outerjoin(windows, windows.c.ref == Product.id)
+        .order_by(Product.name)
+    ).all()
+    filled = product_snapshots(session, [row[0].id for row in rows if row[-1]], fill=True)
+
+    def pct(cur, prev):
+        if cur is None or prev is None or prev == 0:
+            return None
+        return (cur - prev) / prev * 100.0
+
+    model = []
+    for p, latest, n, recent, prev, _ in rows:
+        latest = latest or filled.get(p.id)
+        current_low = latest.low if latest else None
+        avg7 = float(recent) if recent is not None else None
+        model.append({
+            "id": p.id,
+            "name": p.name,
+            "country": p.country,
+            "url": p.url,
+            "enabled": bool(p.is_enabled),
+
+            "trend": classify_trend(recent, prev) if (n or 0) >= 10 else "flat",
+            "heads": current_low is not None and avg7 is not None and current_low <= HEADS_UP_RATIO * avg7,
+            "avg7": avg7 if current_low is not None else None,
+
+            "current_low": current_low,
+            "first_low": latest.first_low if latest else None,
+            "pct24": pct(current_low, latest.low_24h if latest else None),
+            "pct7":  pct(current_low, latest.low_7d if latest else None),
+            "pct30": pct(current_low, latest.low_30d if latest else None),
+            "supply": latest.supply if latest else None,
+
+            "last_ts": latest.ts.strftime("%Y-%m-%d %H:%M") if latest else None,
+        })
+    return model
@@ -0,0 +1,204 @@
+"""Seller bundles for /cardwatch/seller-bundles, aggregated in SQL.
+
+A seller "covers" a card when one of their offers is within ``BAND`` of the
+card's cheapest offer (across all sellers). ``top_sellers`` groups those
+offers per (seller, country) in the database and returns only the best
+``top_k`` sellers with their cards; ``wishlist_cover`` picks a cheap set of
+sellers that together cover a list of cards, counting a fixed shipping cost
+per seller (greedy weighted set cover).
+
+Results are cached per filter combination until scrape data or cards change
+(``deal_cache.data_version``).
+"""
+from collections import OrderedDict
+from threading import Lock
+
+from sqlalchemy import func, select
+
+from db import SingleCard, SingleCardOffer
+from tracker_utils.deal_cache import data_version
+
+BAND = 1.2             # offers up to 20% over the card's cheapest
+MAX_UPCHARGE = 20.0    # per seller, summed over their cards
+TOP_K = 100
+SHIPPING = 1.5         # assumed cost per seller for wishlist_cover
+RESTARTS = 10          # wishlist_cover also starts greedy from this many best-covering sellers
+CACHE_SIZE = 32
+
+_cache = OrderedDict()
+_cache_lock = Lock()
+
+
+def cached(session, key, compute):
+    """``compute()``, reused while ``data_version`` is unchanged (LRU of ``CACHE_SIZE``)."""
+    version = data_version(session)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == version:
+            _cache.move_to_end(key)
+            return hit[1]
+    value = compute()
+    with _cache_lock:
+        _cache[key] = (version, value)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return value
+
+
+def matching_offers(language="All", country="All"):
+    """Subquery of offers within ``BAND`` of their card's cheapest offer, on
+    enabled cards: ``id, seller_name, country, card_id, price, baseline``."""
+    cheapest = (
+        select(SingleCardOffer.card_id, func.min(SingleCardOffer.price).label("baseline"))
+        .group_by(SingleCardOffer.card_id)
+        .subquery()
+    )
+    q = (
+        select(SingleCardOffer.id, SingleCardOffer.seller_name, SingleCardOffer.country,
+               SingleCardOffer.card_id, SingleCardOffer.price, cheapest.c.baseline)
+        .join(SingleCard, SingleCard.id == SingleCardOffer.card_id)
+        .join(cheapest, cheapest.c.card_id == SingleCardOffer.card_id)
+        .where(SingleCard.is_enabled == 1, SingleCardOffer.price <= cheapest.c.baseline * BAND)
+    )
+    if language != "All":
+        q = q.where(SingleCard.language == language)
+    if country != "All":
+        q = q.where(SingleCardOffer.country == country)
+    return q.subquery()
+
+
+def top_sellers(session, language="All", country="All", min_cards=0, top_k=TOP_K):
+    """Sellers covering the most cards (then least upcharge, then cheapest),
+    at most ``MAX_UPCHARGE`` over the cheapest offers, in two queries."""
+    m = matching_offers(language, country)
+    n = func.count().label("n")
+    upcharge = func.sum(m.c.price - m.c.baseline).label("upcharge")
+    total = func.sum(m.c.price).label("total")
+    top = (
+        select(m.c.seller_name, m.c.country, n, upcharge, total, func.sum(m.c.baseline).label("cheapest"))
+        .group_by(m.c.seller_name, m.c.country)
+        .having(upcharge <= MAX_UPCHARGE, n >= min_cards)
+        .order_by(n.desc(), upcharge, total, m.c.seller_name, m.c.country)
+        .limit(top_k)
+        .subquery()
+    )
+    sellers = {}
+    for row in session.execute(select(top).order_by(top.c.n.desc(), top.c.upcharge, top.c.total,
+                                                    top.c.seller_name, top.c.country)):
+        sellers[(row.seller_name, row.country)] = {
+            "seller": row.seller_name,
+            "country": row.country,
+            "cards": [],
+            "total_upcharge": row.upcharge,
+            "bundle_total": row.total,
+            "cheapest_total": row.cheapest,
+        }
+    if not sellers:
+        return []
+
+    rows = session.execute(
+        select(m.c.seller_name, m.c.country, m.c.card_id, SingleCard.name, m.c.price, m.c.baseline)
+        .join(top, (top.c.seller_name == m.c.seller_name) & top.c.country.is_not_distinct_from(m.c.country))
+        .join(SingleCard, SingleCard.id == m.c.card_id)
+        .order_by(m.c.id)
+    )
+    for seller, country_, card_id, name, price, baseline in rows:
+        sellers[(seller, country_)]["cards"].append({
+            "card": {"id": card_id, "name": name},
+            "price": price,
+            "baseline": baseline,
+            "upcharge": price - baseline,
+        })
+    return list(sellers.values())
+
+
+def wishlist_cover(session, card_ids, language="All", country="All", shipping=SHIPPING):
+    """A cheap set of sellers that together sell every card of ``card_ids``
+    that has a matching offer: greedy by cost per newly covered card
+    (``shipping`` + prices), also started from each of the ``RESTARTS``
+    sellers covering the most cards, each result then pruned by dropping
+    sellers the others can replace more cheaply; the cheapest result wins.
+    Every card goes to the cheapest chosen seller.
+
+    Returns ``{"sellers": [...], "total", "shipping", "uncovered": [card ids]}``.
+    """
+    card_ids = set(card_ids)
+    m = matching_offers(language, country)
+    rows = session.execute(
+        select(m.c.seller_name, m.c.country, m.c.card_id, func.min(m.c.price))
+        .where(m.c.card_id.in_(card_ids))
+        .group_by(m.c.seller_name, m.c.country, m.c.card_id)
+    )
+    offers = {}
+    for seller, country_, card_id, price in rows:
+        offers.setdefault((seller, country_), {})[card_id] = price
+
+    wanted = set().union(*offers.values())
+    candidates = sorted(offers, key=lambda k: (k[0], k[1] or ""))  # deterministic ties
+
+    def greedy(chosen):
+        uncovered = wanted.difference(*(offers[k] for k in chosen))
+        while uncovered:
+            def cost(key):
+                new = uncovered.intersection(offers[key])
+                return (shipping + sum(offers[key][c] for c in new)) / len(new) if new else float("inf")
+
+            best = min(candidates, key=cost)
+            chosen.append(best)
+            uncovered -= offers[best].keys()
+        return chosen
+
+    def assign(keys):
+        assigned = {}
+        for card_id in wanted:
+            key = min(keys, key=lambda k: offers[k].get(card_id, float("inf")))
+            assigned.setdefault(key, []).append(card_id)
+        return assigned
+
+    def total(assigned):
+        return sum(offers[k][c] for k, cards in assigned.items() for c in cards) + shipping * len(assigned)
+
+    def prune(assigned):
+        # Drop the seller whose cards the others sell cheapest overall, while that saves money.
+        while len(assigned) > 1:
+            options = []
+            for key in assigned:
+                rest = [k for k in assigned if k != key]
+                if all(any(c in offers[k] for k in rest) for c in assigned[key]):
+                    options.append(assign(rest))
+            best = min(options, key=total, default=None)
+            if best is None or total(best) >= total(assigned):
+                return assigned
+            assigned = best
+        return assigned
+
+    # Plain greedy, and greedy started from the sellers covering the most
+    # cards (catches one seller with everything slightly dearer beating
+    # several cheap ones).
+    starts = sorted(candidates, key=lambda k: (-len(offers[k]), sum(offers[k].values())))[:RESTARTS]
+    options = [prune(assign(greedy(chosen))) for chosen in [[]] + [[key] for key in starts]] if wanted else [{}]
+    assigned = min(options, key=total)
+
+    names = dict(session.execute(select(SingleCard.id, SingleCard.name).where(SingleCard.id.in_(card_ids)))
+                 .all()) if assigned else {}
+    sellers = []
+    for key in sorted(assigned, key=candidates.index):
+        cards = [{"card": {"id": c, "name": names.get(c)}, "price": offers[key][c]} for c in sorted(assigned[key])]
+        sellers.append({"seller": key[0], "country": key[1], "cards": cards,
+                        "subtotal": sum(c["price"] for c in cards)})
+    return {
+        "sellers": sellers,
+        "total": sum(s["subtotal"] for s in sellers) + shipping * len(sellers),
+        "shipping": shipping,
+        "uncovered": sorted(card_ids - wanted),
+    }
+
+
+def filter_options(session):
+    """Languages and offer countries for the filter dropdowns."""
+    languages = [r for (r,) in session.execute(select(SingleCard.language).distinct().order_by(SingleCard.language))
+                 if r]
+    countries = [r for (r,) in session.execute(
+        select(SingleCardOffer.country).distinct().order_by(SingleCardOffer.country)) if r]
+    return languages, countries
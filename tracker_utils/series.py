@@ -0,0 +1,108 @@
+"""Bounded price series for the product and single-card chart endpoints.
+
+``price_series`` reads the finest resolution that keeps the number of rows
+within ``OVERSAMPLE * max_points`` — raw prices, hourly buckets of them,
+the ``daily`` rollup or weekly buckets of it — and then thins that to at
+most ``max_points`` with min/max buckets, so the lows and highs of both
+lines survive the thinning.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+
+from config import Config
+
+MAX_POINTS = Config.SERIES_MAX_POINTS
+POINTS_CAP = 5000      # largest max_points a caller may ask for
+OVERSAMPLE = 4         # rows read per returned point, at most
+HOUR, DAY = timedelta(hours=1), timedelta(days=1)
+
+
+def _dt(d):
+    return d if isinstance(d, datetime) else datetime.combine(d, time.min)
+
+
+def _raw(session, price_model, ref, where):
+    return session.execute(
+        select(price_model.ts, price_model.low, price_model.avg5).where(ref, *where).order_by(price_model.ts)
+    ).all()
+
+
+def _hourly(session, price_model, ref, where):
+    hour = func.strftime("%Y-%m-%d %H", price_model.ts)
+    return session.execute(
+        select(func.min(price_model.ts), func.min(price_model.low), func.avg(price_model.avg5))
+        .where(ref, *where)
+        .group_by(hour)
+        .order_by(hour)
+    ).all()
+
+
+def _daily(session, daily_model, ref, where, bucket=None):
+    if bucket is None:
+        q = select(daily_model.day, daily_model.low, daily_model.avg)
+    else:
+        q = select(func.min(daily_model.day), func.min(daily_model.low), func.avg(daily_model.avg)).group_by(bucket)
+    return [(_dt(d), low, avg) for d, low, avg in session.execute(q.where(ref, *where).order_by(daily_model.day))]
+
+
+def minmax_indices(columns, max_points):
+    """Row indices keeping at most ``max_points`` rows: the first and last,
+    plus per equal-sized bucket the rows with each column's min and max.
+    ``columns`` are float arrays of equal length (NaN for missing)."""
+    n = len(columns[0]) if columns else 0
+    if n <= max_points:
+        return np.arange(n)
+    buckets = (max_points - 2) // (2 * len(columns))
+    if buckets < 1:
+        return np.unique(np.linspace(0, n - 1, max_points).astype(int))
+    edges = np.linspace(1, n - 1, buckets + 1).astype(int)
+    keep = {0, n - 1}
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        for col in columns:
+            chunk = col[lo:hi]
+            if np.isnan(chunk).all():
+                continue
+            keep.add(lo + int(np.nanargmin(chunk)))
+            keep.add(lo + int(np.nanargmax(chunk)))
+    return np.array(sorted(keep))
+
+
+def price_series(session, price_model, daily_model, key, ref_id, start=None, end=None, max_points=MAX_POINTS):
+    """``(resolution, [(ts, low, avg5), ...])`` for ``[start, end)``, at most
+    ``max_points`` long. ``resolution`` is ``raw``, ``hour``, ``day`` or
+    ``week``; bucketed rows carry the bucket's first timestamp, lowest low
+    and average avg5."""
+    max_points = min(max(2, max_points), POINTS_CAP)
+    where, day_where = [], []
+    if start is not None:
+        where.append(price_model.ts >= start)
+        day_where.append(daily_model.day >= start.date())
+    if end is not None:
+        where.append(price_model.ts < end)
+        day_where.append(daily_model.day < (end - timedelta(microseconds=1)).date() + DAY)
+    ref = getattr(price_model, key) == ref_id
+    n, first, last = session.execute(
+        select(func.count(), func.min(price_model.ts), func.max(price_model.ts)).where(ref, *where)
+    ).one()
+
+    budget = OVERSAMPLE * max_points
+    span = (last - first) if n else timedelta(0)
+    day_ref = getattr(daily_model, key) == ref_id
+    if n <= budget:
+        resolution, rows = "raw", _raw(session, price_model, ref, where)
+    elif span / HOUR < budget:
+        resolution, rows = "hour", _hourly(session, price_model, ref, where)
+    elif span / DAY < budget:
+        resolution, rows = "day", _daily(session, daily_model, day_ref, day_where)
+    else:
+        week = func.strftime("%Y-%W", daily_model.day)
+        resolution, rows = "week", _daily(session, daily_model, day_ref, day_where, week)
+
+    if len(rows) > max_points:
+        columns = [np.array([r[i] for r in rows], dtype=float) for i in (1, 2)]
+        rows = [rows[i] for i in minmax_indices(columns, max_points)]
+    return resolution, rows
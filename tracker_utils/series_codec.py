@@ -0,0 +1,121 @@
+"""Columnar encodings for the chart APIs.
+
+The chart endpoints answer with a list of ``{"t": iso, "low": ..., ...}``
+objects by default. Clients that ask for it (``?format=`` or ``Accept``)
+get the same points as parallel arrays instead:
+
+``columns``
+    ``{"t": [epoch seconds...], "low": [...], ...}`` — compact JSON, values
+    at float32 precision, ``null`` where missing.
+``binary``
+    Packed little-endian: ``b"CWC1"``, ``uint32`` point count, ``uint16``
+    length + comma-separated UTF-8 column names, then the ``uint32`` epoch
+    seconds and one ``float32`` array per value column (NaN where missing).
+    See ``decode_binary``.
+
+Both are compressed with brotli (when installed) or gzip if the client
+accepts it.
+"""
+import gzip
+import struct
+from datetime import datetime, timedelta
+
+import numpy as np
+
+FORMATS = ("json", "columns", "binary")
+MEDIA_TYPES = {
+    "columns": "application/vnd.cardwatch.columns+json",
+    "binary": "application/vnd.cardwatch.columns",
+}
+MAGIC = b"CWC1"
+MIN_COMPRESS = 1024    # bytes; smaller bodies go out as they are
+EPOCH, SECOND = datetime(1970, 1, 1), timedelta(seconds=1)
+
+
+def brotli_available() -> bool:
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def negotiate(fmt, accept):
+    """The format to answer with: ``fmt`` (``?format=``) if given, else the
+    best columnar media type in ``accept`` (a werkzeug ``MIMEAccept``), else
+    ``json``. Raises ``ValueError`` for an unknown ``fmt``."""
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+        return fmt
+    best = accept.best_match(list(MEDIA_TYPES.values())) if accept else None
+    if best and accept[best] > accept["application/json"]:
+        return next(f for f, media in MEDIA_TYPES.items() if media == best)
+    return "json"
+
+
+def to_columns(points, width):
+    """``(epoch seconds uint32, [float32 value arrays])`` for rows of
+    ``(datetime or date, value, ...)`` with ``width`` values; naive
+    timestamps are UTC."""
+    epoch = EPOCH if not points or isinstance(points[0][0], datetime) else EPOCH.date()
+    t = np.fromiter(((p[0] - epoch) // SECOND for p in points), np.uint32, len(points))
+    values = [np.array([p[i] for p in points], dtype=float).astype(np.float32) for i in range(1, width + 1)]
+    return t, values
+
+
+def _json_array(values):
+    return "[" + ",".join("null" if v != v else format(v, ".7g") for v in values.tolist()) + "]"
+
+
+def encode_columns(names, points):
+    """The ``columns`` JSON body (bytes) for ``points``, keyed by ``names``."""
+    t, values = to_columns(points, len(names) - 1)
+    parts = [f'"{names[0]}":[{",".join(map(str, t.tolist()))}]']
+    parts += [f'"{name}":{_json_array(col)}' for name, col in zip(names[1:], values)]
+    return ("{" + ",".join(parts) + "}").encode()
+
+
+def encode_binary(names, points):
+    """The ``binary`` body for ``points``, columns named ``names``."""
+    t, values = to_columns(points, len(names) - 1)
+    header = ",".join(names).encode()
+    return b"".join([
+        MAGIC, struct.pack("<IH", len(t), len(header)), header,
+        t.astype("<u4").tobytes(), *(col.astype("<f4").tobytes() for col in values),
+    ])
+
+
+def decode_binary(data):
+    """``{name: numpy array}`` from an ``encode_binary`` body."""
+    if data[:4] != MAGIC:
+        raise ValueError("not a CWC1 body")
+    n, size = struct.unpack_from("<IH", data, 4)
+    offset = 10 + size
+    names = data[10:offset].decode().split(",")
+    out = {names[0]: np.frombuffer(data, "<u4", n, offset)}
+    offset += 4 * n
+    for name in names[1:]:
+        out[name] = np.frombuffer(data, "<f4", n, offset)
+        offset += 4 * n
+    return out
+
+
+def compress(body, accept_encoding):
+    """``(body, content-encoding or None)``: brotli if accepted and
+    installed, else gzip if accepted."""
+    if len(body) < MIN_COMPRESS or not accept_encoding:
+        return body, None
+    if accept_encoding["br"] and brotli_available():
+        import brotli
+        return brotli.compress(body, quality=5), "br"
+    if accept_encoding["gzip"]:
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
+
+def encode(fmt, names, points, accept_encoding=None):
+    """``(body, media type, content-encoding or None)`` for a columnar ``fmt``."""
+    body = encode_columns(names, points) if fmt == "columns" else encode_binary(names, points)
+    body, encoding = compress(body, accept_encoding)
+    return body, MEDIA_TYPES[fmt], encoding